@@ -0,0 +1,106 @@
+"""
+Benchmark `clean_json(..., sort_lists=True)` on deeply nested `config` payloads.
+
+Compare the bottom-up canonical sort keys of `clean_json` against the previous approach,
+which sorted every list by `json.dumps(item, sort_keys=True)` and so re-serialized each
+subtree once for every list above it. Run with::
+
+    python benchmarks/bench_sort_lists.py --depth 40 --width 8
+"""
+
+import argparse
+import contextlib
+import json
+import re
+import timeit
+
+from pbip_tools import clean_json
+from pbip_tools.json_encoder import dumps_indented
+from pbip_tools.type_aliases import JSONType
+
+
+def nested_config(depth: int, width: int) -> str:
+    """
+    Return a `config` JSON string with lists of objects nested `depth` levels deep.
+
+    Every level holds a list of `width` small objects plus the next level. Every tenth
+    level is embedded as a JSON string, like Power BI's nested configs. (Escaping
+    doubles the backslashes of each level of embedded strings, so keep it to a few.)
+    """
+    node: JSONType = {"name": "leaf", "values": list(range(width, 0, -1))}
+    for level in range(depth):
+        items: list[JSONType] = [
+            {"name": f"item {level}.{i}", "order": width - i} for i in range(width)
+        ]
+        items.insert(width // 2, node if (level + 1) % 10 else json.dumps(node))
+        node = {"level": level, "items": items}
+    return json.dumps(node)
+
+
+def report(depth: int, width: int, visuals: int) -> str:
+    """Return the text of a `report.json` with `visuals` deeply nested configs."""
+    containers = [{"config": nested_config(depth, width)} for _ in range(visuals)]
+    return json.dumps({"sections": [{"visualContainers": containers}]})
+
+
+def clean_json_before(json_data: JSONType, indent: int = 2) -> str:
+    """Clean with sorted lists the way `clean_json` did before bottom-up sort keys."""
+
+    def format_nested_json_strings(json_data_subset: JSONType) -> JSONType:
+        if not isinstance(json_data_subset, dict | list):
+            return json_data_subset
+        index = (
+            range(len(json_data_subset))
+            if isinstance(json_data_subset, list)
+            else json_data_subset.keys()
+        )
+        for key in index:
+            value = json_data_subset[key]  # type: ignore[index]
+            if isinstance(value, dict | list):
+                json_data_subset[key] = format_nested_json_strings(value)  # type: ignore[index]
+            elif isinstance(value, str):
+                if re.match(
+                    r"^-?\d+(?:\.\d+)?$|true|false", value, flags=re.IGNORECASE
+                ):
+                    continue
+                with contextlib.suppress(json.JSONDecodeError):
+                    parsed_value = json.loads(value, parse_constant=str)
+                    json_data_subset[key] = format_nested_json_strings(parsed_value)  # type: ignore[index]
+        if isinstance(json_data_subset, list):
+            json_data_subset.sort(
+                key=lambda item: json.dumps(item, ensure_ascii=False, sort_keys=True)
+            )
+        return json_data_subset
+
+    return dumps_indented(format_nested_json_strings(json_data), indent=indent)
+
+
+def main() -> None:
+    """Time both implementations and check that they agree."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--depth", type=int, default=40)
+    parser.add_argument("--width", type=int, default=8)
+    parser.add_argument("--visuals", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    text = report(args.depth, args.width, args.visuals)
+    assert clean_json_before(json.loads(text)) == clean_json(  # noqa: S101
+        json.loads(text), sort_lists=True
+    )
+
+    timings = {
+        "clean_json": lambda: clean_json(json.loads(text)),
+        "clean_json(sort_lists=True)": lambda: clean_json(
+            json.loads(text), sort_lists=True
+        ),
+        "before (json.dumps sort keys)": lambda: clean_json_before(json.loads(text)),
+    }
+    print(f"{len(text):,} bytes, depth {args.depth}, width {args.width}")
+    for name, function in timings.items():
+        best = min(timeit.repeat(function, number=1, repeat=args.repeat))
+        print(f"{name:>32}: {best * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
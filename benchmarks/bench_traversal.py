@@ -0,0 +1,71 @@
+"""
+Benchmark the traversal speed of `clean_json` and `smudge_json`, in nodes per second.
+
+Every `dict`, `list` and scalar of the cleaned sample reports counts as a node, so both
+filters are measured against the same amount of work. Run with::
+
+    python benchmarks/bench_traversal.py --repeat 20
+"""
+
+import argparse
+import json
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+from pbip_tools import clean_json, smudge_json
+from pbip_tools.type_aliases import JSONType
+
+SAMPLES_DIR = Path(__file__).parents[1] / "tests" / "Sample PBIP Reports"
+
+
+def count_nodes(json_data: JSONType) -> int:
+    """Count every `dict`, `list` and scalar in `json_data`."""
+    nodes, pending = 0, [json_data]
+    while pending:
+        value = pending.pop()
+        nodes += 1
+        if isinstance(value, dict):
+            pending.extend(value.values())
+        elif isinstance(value, list):
+            pending.extend(value)
+    return nodes
+
+
+def best_time(
+    filter_function: Callable[[JSONType], str], texts: list[str], repeat: int
+) -> float:
+    """Return the fastest of `repeat` runs of `filter_function` over parsed `texts`."""
+    times = []
+    for _ in range(repeat):
+        # Parse fresh copies outside of the timing, so every run does the same work.
+        json_data = [json.loads(text) for text in texts]
+        start = time.perf_counter()
+        for document in json_data:
+            filter_function(document)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main() -> None:
+    """Time both filters over all sample reports and print nodes per second."""
+    parser = argparse.ArgumentParser(description="Benchmark clean and smudge.")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    texts = [file.read_text("UTF-8") for file in sorted(SAMPLES_DIR.glob("**/*.json"))]
+    cleaned_texts = [clean_json(json.loads(text)) for text in texts]
+    nodes = sum(count_nodes(json.loads(text)) for text in cleaned_texts)
+
+    print(f"{len(texts)} files, {nodes:,} nodes")
+    filters: list[tuple[str, Callable[[JSONType], str], list[str]]] = [
+        ("clean", clean_json, texts),
+        ("smudge", smudge_json, cleaned_texts),
+    ]
+    for name, filter_function, inputs in filters:
+        seconds = best_time(filter_function, inputs, args.repeat)
+        print(f"{name:>6}: {seconds * 1000:7.1f} ms, {nodes / seconds:12,.0f} nodes/s")
+
+
+if __name__ == "__main__":
+    main()
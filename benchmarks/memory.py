@@ -0,0 +1,98 @@
+"""
+Peak-memory benchmark for the clean and smudge filters on a synthetic PBIP project.
+
+Every file of a project from `synthetic.py` is loaded and filtered like the CLI does it,
+once by default and once with `--low-memory`, while `tracemalloc` traces the peak of the
+memory allocated by Python. The output is discarded as it is written, as the CLI
+streams it to disk. Run with::
+
+    python benchmarks/memory.py --scale large
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Callable
+from functools import partial
+from pathlib import Path
+
+from suite import SCALES
+from synthetic import write_project
+
+from pbip_tools import clean_json, clean_json_to, smudge_json_to
+from pbip_tools.interning import loads_interned
+from pbip_tools.type_aliases import JSONType, SupportsWrite
+
+
+class _NullWriter:
+    """Text stream that discards everything written to it."""
+
+    def write(self, text: str) -> int:
+        """Discard `text`."""
+        return len(text)
+
+
+def measure(
+    text: str,
+    loads: Callable[..., JSONType],
+    filter_function: Callable[[JSONType, SupportsWrite[str]], None],
+) -> tuple[int, float]:
+    """Return the peak memory (in bytes) and time of loading and filtering `text`."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    filter_function(loads(text, parse_constant=str), _NullWriter())
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak, seconds
+
+
+def main() -> int:
+    """Measure and print the peak memory of cleaning and smudging each file."""
+    parser = argparse.ArgumentParser(description="Measure peak memory use.")
+    parser.add_argument("--scale", choices=SCALES, default="large")
+    parser.add_argument("--output", type=Path, help="file to write the results to")
+    args = parser.parse_args()
+
+    variants: dict[
+        str,
+        tuple[Callable[..., JSONType], Callable[[JSONType, SupportsWrite[str]], None]],
+    ] = {
+        "clean": (json.loads, clean_json_to),
+        "clean --low-memory": (loads_interned, partial(clean_json_to, low_memory=True)),
+        # Sorting lists parses every nested JSON string before any output is written.
+        "clean --sort-lists": (json.loads, partial(clean_json_to, sort_lists=True)),
+        "clean --sort-lists --low-memory": (
+            loads_interned,
+            partial(clean_json_to, sort_lists=True, low_memory=True),
+        ),
+        "smudge": (json.loads, smudge_json_to),
+        "smudge --low-memory": (loads_interned, smudge_json_to),
+    }
+    results: dict[str, dict[str, dict[str, float]]] = {}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        files = write_project(Path(temp_dir), **SCALES[args.scale])
+        print(f"{'file':<12} {'variant':<32} {'bytes':>12} {'peak MiB':>9} {'ms':>8}")
+        for file in files:
+            smudged = file.read_text(encoding="UTF-8")
+            cleaned = clean_json(json.loads(smudged, parse_constant=str))
+            results[file.name] = {}
+            for name, (loads, filter_function) in variants.items():
+                text = cleaned if name.startswith("smudge") else smudged
+                peak, seconds = measure(text, loads, filter_function)
+                results[file.name][name] = {"peak": peak, "seconds": seconds}
+                print(
+                    f"{file.name:<12} {name:<32} {len(text):>12,}"
+                    f" {peak / 2**20:>9.1f} {seconds * 1000:>8.0f}"
+                )
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2) + "\n", encoding="UTF-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+"""
+Startup-latency benchmark of `pbip-tools` against `pbip-tools-client`.
+
+A small synthetic `report.json` is cleaned from stdin many times, like pre-commit hooks
+and editor integrations do, with each of:
+
+- `pbip-tools`, which imports the filters and the CLI on every call;
+- `pbip-tools-client` with no daemon running, which runs the command in-process;
+- `pbip-tools-client` with a `pbip-tools daemon` running, which forwards the command;
+- a bare interpreter, which does nothing at all, as the floor of all of them.
+
+The result cache is off, so that every call does the same work. Run with::
+
+    python benchmarks/startup.py --repeat 50
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from statistics import median
+
+from synthetic import synthetic_report
+
+
+def time_calls(
+    command: list[str], stdin: bytes, env: dict[str, str], repeat: int
+) -> list[float]:
+    """Time `repeat` calls of `command`, each with `stdin` as its stdin."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(  # noqa: S603
+            command, input=stdin, stdout=subprocess.DEVNULL, env=env, check=True
+        )
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def main() -> int:
+    """Measure and print the latency of each way of cleaning stdin."""
+    parser = argparse.ArgumentParser(description="Measure startup latency.")
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--output", type=Path, help="file to write the results to")
+    args = parser.parse_args()
+
+    scripts = Path(sys.executable).parent
+    pbip_tools = [str(scripts / "pbip-tools"), "clean", "-", "--no-cache"]
+    client = [str(scripts / "pbip-tools-client"), "clean", "-", "--no-cache"]
+    report = synthetic_report(pages=1, visuals_per_page=5, depth=1)
+    stdin = json.dumps(report).encode("UTF-8")
+    results = {}
+
+    def run(name: str, command: list[str], env: dict[str, str]) -> None:
+        times = time_calls(command, stdin, env, args.repeat)
+        results[name] = {"median": median(times), "min": min(times)}
+        print(f"{name:<32} {median(times) * 1000:>10.1f} {min(times) * 1000:>8.1f}")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        socket = str(Path(temp_dir, "pbip-tools.sock"))
+        env = {**os.environ, "PBIP_TOOLS_SOCKET": socket}
+        print(f"{'command':<32} {'median ms':>10} {'min ms':>8}")
+        run("python -c pass", [sys.executable, "-c", "pass"], env)
+        run("pbip-tools", pbip_tools, env)
+        run("pbip-tools-client (no daemon)", client, env)
+
+        with subprocess.Popen(  # noqa: S603
+            [str(scripts / "pbip-tools"), "daemon", "--socket", socket],
+            stderr=subprocess.PIPE,
+        ) as daemon:
+            assert daemon.stderr is not None  # noqa: S101
+            daemon.stderr.readline()  # Wait until it's listening.
+            try:
+                run("pbip-tools-client (daemon)", client, env)
+            finally:
+                daemon.terminate()
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2) + "\n", encoding="UTF-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,215 @@
+"""
+Benchmark suite for the clean and smudge filters on synthetic PBIP projects.
+
+Every benchmark runs on a project from `synthetic.py` of the chosen scale, and the
+results are written as JSON. A run can be compared against the results of an earlier
+one (e.g. from the main branch), which flags every benchmark that got slower by more
+than a threshold, and exits with status 1 if any did. Run with::
+
+    python benchmarks/suite.py --scale medium --output baseline.json
+    python benchmarks/suite.py --scale medium --compare baseline.json
+"""
+
+import argparse
+import io
+import json
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+from statistics import median
+from typing import Any
+
+from synthetic import write_project
+
+from pbip_tools import clean_json, clean_json_to, smudge_json
+from pbip_tools.type_aliases import JSONType
+
+# The arguments of `write_project` for each scale.
+SCALES = {
+    "small": {
+        "pages": 5,
+        "visuals_per_page": 10,
+        "depth": 2,
+        "tables": 5,
+        "columns_per_table": 10,
+    },
+    "medium": {
+        "pages": 30,
+        "visuals_per_page": 30,
+        "depth": 4,
+        "tables": 30,
+        "columns_per_table": 30,
+    },
+    "large": {
+        "pages": 100,
+        "visuals_per_page": 60,
+        "depth": 8,
+        "tables": 100,
+        "columns_per_table": 60,
+    },
+}
+
+PBIP_TOOLS = Path(sys.executable).parent / "pbip-tools"
+
+
+def time_runs(prepare: Callable[[], Callable[[], object]], repeat: int) -> list[float]:
+    """Time `repeat` calls of the function returned by `prepare`, which isn't timed."""
+    times = []
+    for _ in range(repeat):
+        function = prepare()
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def clean_split(json_data: JSONType, executor: Executor) -> str:
+    """Clean `json_data` like `clean_json`, with its parts cleaned in `executor`."""
+    output = io.StringIO()
+    clean_json_to(json_data, output, executor=executor)
+    return output.getvalue()
+
+
+def run_benchmarks(
+    project: Path, files: list[Path], repeat: int, executor: Executor
+) -> dict[str, dict[str, float]]:
+    """Run every benchmark on the synthetic project, and return their timings."""
+    texts = [file.read_text(encoding="UTF-8") for file in files]
+    cleaned_texts = [clean_json(json.loads(text)) for text in texts]
+    pristine = project.with_name(project.name + " (pristine)")
+    shutil.copytree(project, pristine)
+
+    def filter_all(
+        filter_function: Callable[[JSONType], str], inputs: list[str]
+    ) -> Callable[[], Callable[[], object]]:
+        def prepare() -> Callable[[], object]:
+            # Parse outside of the timing, since `--sort-lists` modifies its input.
+            json_data = [json.loads(text) for text in inputs]
+            return lambda: [filter_function(document) for document in json_data]
+
+        return prepare
+
+    def roundtrip() -> None:
+        for text in texts:
+            smudged = smudge_json(json.loads(clean_json(json.loads(text))))
+            clean_json(json.loads(smudged))
+
+    def cli(*args: str, restore: bool = True) -> Callable[[], Callable[[], object]]:
+        command = [str(PBIP_TOOLS), *args, "--no-cache", *map(str, files)]
+
+        def prepare() -> Callable[[], object]:
+            if restore:  # Start from the smudged files, as Power BI saved them.
+                shutil.rmtree(project)
+                shutil.copytree(pristine, project)
+            return partial(subprocess.run, command, check=True, capture_output=True)
+
+        return prepare
+
+    benchmarks = {
+        "clean_json": filter_all(clean_json, texts),
+        "clean_json(sort_lists=True)": filter_all(
+            partial(clean_json, sort_lists=True), texts
+        ),
+        "clean_json(schema_aware=True)": filter_all(
+            partial(clean_json, schema_aware=True), texts
+        ),
+        # Every file is split across all CPU cores, as `--jobs` does for large files.
+        "clean_json (split)": filter_all(
+            partial(clean_split, executor=executor), texts
+        ),
+        "smudge_json": filter_all(smudge_json, cleaned_texts),
+        "roundtrip": lambda: roundtrip,
+        "cli clean": cli("clean"),
+        "cli clean --jobs 0": cli("clean", "--jobs", "0"),
+        # The files are left cleaned by the runs above.
+        "cli smudge": cli("smudge", restore=False),
+    }
+    results = {}
+    for name, prepare in benchmarks.items():
+        times = time_runs(prepare, repeat)
+        results[name] = {"best": min(times), "median": median(times), "repeat": repeat}
+    return results
+
+
+def compare(
+    results: dict[str, Any], baseline: dict[str, Any], threshold: float
+) -> bool:
+    """
+    Print how `results` compare to `baseline`, and return whether any regressed.
+
+    A benchmark regressed if its best time is more than `threshold` (e.g. 0.1 for 10%)
+    slower than in the baseline.
+    """
+    if results["scale"] != baseline["scale"]:
+        print("Warning: the baseline was run at a different scale.", file=sys.stderr)
+    regressed = False
+    print(f"{'benchmark':<32} {'baseline':>10} {'current':>10} {'change':>8}")
+    for name, timing in results["benchmarks"].items():
+        if name not in baseline["benchmarks"]:
+            print(f"{name:<32} {'-':>10} {timing['best'] * 1000:>8.1f}ms")
+            continue
+        before, after = baseline["benchmarks"][name]["best"], timing["best"]
+        change = after / before - 1
+        flag = "  REGRESSION" if change > threshold else ""
+        regressed |= bool(flag)
+        print(
+            f"{name:<32} {before * 1000:>8.1f}ms {after * 1000:>8.1f}ms"
+            f" {change:>+8.1%}{flag}"
+        )
+    return regressed
+
+
+def main() -> int:
+    """Run the benchmark suite, then save and/or compare the results."""
+    parser = argparse.ArgumentParser(description="Benchmark clean and smudge.")
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", type=Path, help="file to write the results to")
+    parser.add_argument("--compare", type=Path, help="results of an earlier run")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="slowdown from the baseline to flag as a regression (default: 0.1)",
+    )
+    args = parser.parse_args()
+
+    with (
+        tempfile.TemporaryDirectory() as temp_dir,
+        ProcessPoolExecutor() as executor,
+    ):
+        project = Path(temp_dir) / "project"
+        files = write_project(project, **SCALES[args.scale])
+        size = sum(file.stat().st_size for file in files)
+        print(f"Scale {args.scale!r}: {len(files)} files, {size:,} bytes")
+        benchmarks = run_benchmarks(project, files, args.repeat, executor)
+
+    results = {
+        "scale": {"name": args.scale, **SCALES[args.scale], "bytes": size},
+        "environment": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+        },
+        "benchmarks": benchmarks,
+    }
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2) + "\n", encoding="UTF-8")
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text(encoding="UTF-8"))
+        return int(compare(results, baseline, args.threshold))
+    for name, timing in benchmarks.items():
+        print(f"{name:<32} {timing['best'] * 1000:>8.1f}ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,295 @@
+"""
+Generate synthetic PBIP projects at a configurable scale, for benchmarking.
+
+The generated files follow the layout of the sample reports in `tests/Sample PBIP
+Reports`: a `report.json` whose pages (sections) hold visual containers with nested
+JSON strings in `config` and `filters`, and a `model.bim` with tables, columns and
+measures. The same arguments always give the same files. Run with::
+
+    python benchmarks/synthetic.py --pages 50 --visuals 40 out/
+"""
+
+import argparse
+import json
+import random
+import uuid
+from pathlib import Path
+
+from pbip_tools.type_aliases import JSONType
+
+
+def _literal(value: str) -> JSONType:
+    """Return a Power BI literal expression, whose value is a string like `'Sales'`."""
+    return {"expr": {"Literal": {"Value": value}}}
+
+
+def _column(entity: str, column: str) -> dict[str | int, JSONType]:
+    """Return a Power BI column reference."""
+    return {
+        "Column": {"Expression": {"SourceRef": {"Entity": entity}}, "Property": column}
+    }
+
+
+def _nested(payload: JSONType, depth: int, rng: random.Random) -> JSONType:
+    """Wrap `payload` in `depth` more levels of Power BI-like objects and lists."""
+    for level in range(depth):
+        if level % 2:
+            payload = [payload, _literal(f"{rng.randint(0, 99)}L")]
+        else:
+            payload = {"properties": {f"property{level}": payload}}
+    return payload
+
+
+def visual_config(name: str, depth: int, rng: random.Random) -> JSONType:
+    """Return the parsed `config` of a visual container, nested `depth` levels deep."""
+    entity, column = f"Table{rng.randint(0, 9)}", f"Column{rng.randint(0, 29)}"
+    return {
+        "name": name,
+        "layouts": [
+            {
+                "id": 0,
+                "position": {
+                    "x": rng.uniform(0, 1280),
+                    "y": rng.uniform(0, 720),
+                    "z": rng.randint(0, 20000),
+                    "width": rng.uniform(50, 600),
+                    "height": rng.uniform(50, 400),
+                },
+            }
+        ],
+        "singleVisual": {
+            "visualType": rng.choice(["barChart", "card", "tableEx", "slicer"]),
+            "projections": {"Values": [{"queryRef": f"{entity}.{column}"}]},
+            "prototypeQuery": {
+                "Version": 2,
+                "From": [{"Name": entity[0].lower(), "Entity": entity, "Type": 0}],
+                "Select": [{**_column(entity, column), "Name": f"{entity}.{column}"}],
+            },
+            "objects": {
+                "general": [_nested(_literal("'rectangle'"), depth, rng)],
+                "labels": [{"properties": {"show": _literal("true")}}],
+                "dataPoint": [{"properties": {"fill": _literal("null")}}],
+            },
+        },
+    }
+
+
+def visual_filters(depth: int, rng: random.Random) -> list[JSONType]:
+    """Return the parsed `filters` of a visual container, nested `depth` levels deep."""
+    entity, column = f"Table{rng.randint(0, 9)}", f"Column{rng.randint(0, 29)}"
+    return [
+        {
+            "name": f"Filter{i}",
+            "expression": _column(entity, column),
+            "filter": _nested(
+                {"Where": [{"Condition": {"In": {"Values": [[_literal("'A'")]]}}}]},
+                depth,
+                rng,
+            ),
+            "type": "Categorical",
+            "howCreated": 1,
+        }
+        for i in range(rng.randint(0, 3))
+    ]
+
+
+def synthetic_report(
+    pages: int, visuals_per_page: int, depth: int, seed: int = 0
+) -> JSONType:
+    """
+    Return the JSON data of a `report.json`, with nested JSON strings like Power BI's.
+
+    Parameters
+    ----------
+    pages : int
+        The number of pages (sections) of the report.
+    visuals_per_page : int
+        The number of visual containers on each page.
+    depth : int
+        How many extra levels of objects and lists to nest inside of the JSON of each
+        `config` and `filters` string.
+    seed : int, default 0
+        The seed of the random values.
+
+    Returns
+    -------
+    JSONType
+        The JSON data, as Power BI stores it (i.e. smudged).
+    """
+    rng = random.Random(seed)  # noqa: S311 (reproducible, not secret)
+
+    def dumps(json_data: JSONType) -> str:
+        return json.dumps(json_data, separators=(",", ":"))
+
+    sections: list[JSONType] = []
+    for page in range(pages):
+        containers: list[JSONType] = [
+            {
+                "config": dumps(visual_config(f"{page:04}{visual:04}", depth, rng)),
+                "filters": dumps(visual_filters(depth, rng)),
+                "height": f"{rng.uniform(50, 400):.2f}",
+                "width": f"{rng.uniform(50, 600):.2f}",
+                "x": f"{rng.uniform(0, 1280):.2f}",
+                "y": f"{rng.uniform(0, 720):.2f}",
+                "z": f"{rng.randint(0, 20000)}.0",
+            }
+            for visual in range(visuals_per_page)
+        ]
+        sections.append(
+            {
+                "config": dumps({"objects": {}, "visibility": page % 2}),
+                "displayName": f"Page {page}",
+                "displayOption": 1,
+                "filters": dumps(visual_filters(depth, rng)),
+                "height": 720.0,
+                "name": f"ReportSection{page:020x}",
+                "ordinal": page,
+                "visualContainers": containers,
+                "width": 1280.0,
+            }
+        )
+    return {
+        "config": dumps({"version": "5.55", "activeSectionIndex": 0}),
+        "filters": "[]",
+        "layoutOptimization": 0,
+        "resourcePackages": [],
+        "sections": sections,
+    }
+
+
+def synthetic_model(tables: int, columns_per_table: int, seed: int = 0) -> JSONType:
+    """
+    Return the JSON data of a `model.bim` with `tables` tables of `columns_per_table`.
+
+    Every table also has a measure, and the model has a relationship between each pair
+    of consecutive tables.
+    """
+    rng = random.Random(seed)  # noqa: S311 (reproducible, not secret)
+
+    def lineage_tag() -> str:
+        return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+    model_tables: list[JSONType] = [
+        {
+            "name": f"Table{table}",
+            "columns": [
+                {
+                    "name": f"Column{column}",
+                    "annotations": [
+                        {"name": "SummarizationSetBy", "value": "Automatic"},
+                        {"name": "PBI_FormatHint", "value": '{"isGeneralNumber":true}'},
+                    ],
+                    "dataType": rng.choice(["string", "int64", "double", "dateTime"]),
+                    "lineageTag": lineage_tag(),
+                    "sourceColumn": f"Column{column}",
+                    "summarizeBy": "none",
+                }
+                for column in range(columns_per_table)
+            ],
+            "measures": [
+                {
+                    "name": f"Total {table}",
+                    "expression": f"SUM('Table{table}'[Column0])",
+                    "lineageTag": lineage_tag(),
+                }
+            ],
+            "lineageTag": lineage_tag(),
+            "partitions": [
+                {
+                    "name": f"Table{table}",
+                    "mode": "import",
+                    "source": {"type": "m", "expression": ["let", "in", "Source"]},
+                }
+            ],
+        }
+        for table in range(tables)
+    ]
+    relationships: list[JSONType] = [
+        {
+            "name": lineage_tag(),
+            "fromTable": f"Table{table}",
+            "fromColumn": "Column0",
+            "toTable": f"Table{table + 1}",
+            "toColumn": "Column0",
+        }
+        for table in range(tables - 1)
+    ]
+    return {
+        "compatibilityLevel": 1550,
+        "model": {
+            "culture": "en-US",
+            "tables": model_tables,
+            "relationships": relationships,
+        },
+    }
+
+
+def write_project(  # noqa: PLR0913
+    directory: Path,
+    *,
+    pages: int,
+    visuals_per_page: int,
+    depth: int,
+    tables: int,
+    columns_per_table: int,
+    seed: int = 0,
+) -> list[Path]:
+    """
+    Write a synthetic PBIP project named "Synthetic" to `directory`.
+
+    Returns
+    -------
+    list of Path
+        The JSON files of the project (i.e. those that the filters process).
+    """
+    report_dir = directory / "Synthetic.Report"
+    model_dir = directory / "Synthetic.SemanticModel"
+    files: dict[Path, JSONType] = {
+        directory / "Synthetic.pbip": {
+            "version": "1.0",
+            "artifacts": [{"report": {"path": report_dir.name}}],
+        },
+        report_dir / "definition.pbir": {
+            "version": "4.0",
+            "datasetReference": {"byPath": {"path": f"../{model_dir.name}"}},
+        },
+        report_dir / "report.json": synthetic_report(
+            pages, visuals_per_page, depth, seed
+        ),
+        model_dir / "definition.pbism": {"version": "4.0", "settings": {}},
+        model_dir / "model.bim": synthetic_model(tables, columns_per_table, seed),
+    }
+    for file, json_data in files.items():
+        file.parent.mkdir(parents=True, exist_ok=True)
+        with file.open("w", encoding="UTF-8", newline="\n") as f:
+            json.dump(json_data, f, indent=2, ensure_ascii=False)
+    return [file for file in files if file.suffix in {".json", ".bim"}]
+
+
+def main() -> None:
+    """Write a synthetic PBIP project to the given directory."""
+    parser = argparse.ArgumentParser(description="Generate a synthetic PBIP project.")
+    parser.add_argument("directory", type=Path)
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--visuals", type=int, default=20, help="visuals per page")
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--tables", type=int, default=10)
+    parser.add_argument("--columns", type=int, default=20, help="columns per table")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    files = write_project(
+        args.directory,
+        pages=args.pages,
+        visuals_per_page=args.visuals,
+        depth=args.depth,
+        tables=args.tables,
+        columns_per_table=args.columns,
+        seed=args.seed,
+    )
+    for file in files:
+        print(f"{file.stat().st_size:>12,} bytes  {file}")
+
+
+if __name__ == "__main__":
+    main()
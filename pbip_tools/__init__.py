@@ -1,9 +1,43 @@
-"""Main package namespace."""
+"""
+Main package namespace.
 
-from .clean.clean_JSON import clean_json
-from .smudge.smudge_JSON import smudge_json
+The filters are imported on first use, so that importing a module of the package (e.g.
+`pbip_tools.client`) doesn't import both of them.
+"""
+
+import importlib
+
+TYPE_CHECKING = False  # Rather than importing `typing`, which takes a few ms.
+if TYPE_CHECKING:
+    from .clean.clean_JSON import clean_json, clean_json_to
+    from .smudge.smudge_JSON import smudge_json, smudge_json_to
 
 __all__ = [
     "clean_json",
+    "clean_json_to",
     "smudge_json",
+    "smudge_json_to",
 ]
+
+# The module that defines each of the names in `__all__`.
+_MODULES = {
+    "clean_json": ".clean.clean_JSON",
+    "clean_json_to": ".clean.clean_JSON",
+    "smudge_json": ".smudge.smudge_JSON",
+    "smudge_json_to": ".smudge.smudge_JSON",
+}
+
+
+def __getattr__(name: str) -> object:
+    """Import the filter `name` on first use."""
+    if name not in _MODULES:
+        msg = f"module {__name__!r} has no attribute {name!r}"
+        raise AttributeError(msg)
+    value = getattr(importlib.import_module(_MODULES[name], __name__), name)
+    globals()[name] = value  # Later lookups don't go through `__getattr__`.
+    return value
+
+
+def __dir__() -> list[str]:
+    """List the filters along with the attributes that were already imported."""
+    return sorted(globals().keys() | _MODULES.keys())
@@ -0,0 +1,305 @@
+"""
+Persistent, content-addressed cache of clean and smudge results.
+
+Most files that are run through the filters haven't changed since the previous run. The
+result cache stores each filter output under a hash of the input bytes, the filter name,
+its options and the `pbip-tools` version, so that an unchanged file is served straight
+from the cache without being parsed.
+
+The cache is a single SQLite database, which each process (and thread) connects to once.
+Its total size is capped, and kept up to date by triggers, so that the least recently
+used entries are only looked up and evicted once the cap is exceeded. Entries are marked
+as used at most once an hour, so that cache hits seldom write to the database, which
+would make the `--jobs` workers wait for each other.
+
+When `pbip-tools` runs from a source checkout or an editable install, its version alone
+doesn't change with its code, so the cache is also keyed by a hash of the source files.
+Installed packages are only keyed by their version, which is cheaper to find.
+
+Attributes
+----------
+CACHE_DIR_ENV_VAR : str
+    The environment variable that overrides the default cache directory.
+DEFAULT_MAX_SIZE : int
+    The default cap on the total size of all cached outputs, in bytes.
+"""
+
+import atexit
+import functools
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import warnings
+from collections.abc import Mapping
+from contextlib import closing
+from importlib.metadata import PackageNotFoundError, distribution
+from pathlib import Path
+
+from pbip_tools.type_aliases import JSONPrimitive, PathLike
+
+CACHE_DIR_ENV_VAR = "PBIP_TOOLS_CACHE_DIR"
+DEFAULT_MAX_SIZE = 256 * 1024**2  # 256 MiB
+
+_DATABASE_NAME = "results.sqlite3"
+# How many seconds pass before a cache hit marks its entry as used again.
+_TOUCH_INTERVAL = 60 * 60
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    output BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used);
+CREATE TABLE IF NOT EXISTS total_size (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    size INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO total_size SELECT 0, COALESCE(SUM(size), 0) FROM results;
+CREATE TRIGGER IF NOT EXISTS results_insert AFTER INSERT ON results BEGIN
+    UPDATE total_size SET size = size + new.size;
+END;
+CREATE TRIGGER IF NOT EXISTS results_update AFTER UPDATE OF size ON results BEGIN
+    UPDATE total_size SET size = size - old.size + new.size;
+END;
+CREATE TRIGGER IF NOT EXISTS results_delete AFTER DELETE ON results BEGIN
+    UPDATE total_size SET size = size - old.size;
+END;
+"""
+
+# The open connection of each process and thread to each cache database.
+_connections: dict[tuple[int, int, Path], sqlite3.Connection] = {}
+
+
+def default_cache_dir() -> Path:
+    """
+    Return the directory used for the result cache when none is given.
+
+    The `PBIP_TOOLS_CACHE_DIR` environment variable takes precedence. Otherwise, the
+    platform's usual cache location is used: `%LOCALAPPDATA%` on Windows,
+    `~/Library/Caches` on macOS, and `$XDG_CACHE_HOME` (or `~/.cache`) elsewhere.
+
+    Returns
+    -------
+    Path
+        The default cache directory.
+    """
+    if env_dir := os.environ.get(CACHE_DIR_ENV_VAR):
+        return Path(env_dir)
+    if sys.platform == "win32" and (local_app_data := os.environ.get("LOCALAPPDATA")):
+        return Path(local_app_data) / "pbip-tools" / "Cache"
+    if sys.platform == "darwin":
+        return Path.home() / "Library" / "Caches" / "pbip-tools"
+    xdg_cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(xdg_cache_home) / "pbip-tools"
+
+
+def _source_digest(package_directory: Path) -> str:
+    """Return a hash of the Python source files in `package_directory`."""
+    hasher = hashlib.sha256()
+    for file in sorted(package_directory.rglob("*.py")):
+        hasher.update(file.relative_to(package_directory).as_posix().encode("UTF-8"))
+        hasher.update(b"\0")
+        hasher.update(file.read_bytes())
+        hasher.update(b"\0")
+    return hasher.hexdigest()[:16]
+
+
+@functools.cache
+def _package_version() -> str:
+    """
+    Return the version of `pbip-tools`, with a hash of its source files if needed.
+
+    The hash tells apart the code of a source checkout or an editable install, whose
+    version doesn't change with it, i.e. whenever the code that the process imported
+    isn't that of the installed distribution. It is computed once per process.
+    """
+    try:
+        package = distribution("pbip-tools")
+    except PackageNotFoundError:
+        package_version = "unknown"
+    else:
+        package_version = package.version
+        installed_file = Path(str(package.locate_file(f"{__package__}/cache.py")))
+        if installed_file.resolve() == Path(__file__).resolve():
+            return package_version
+    return f"{package_version}+{_source_digest(Path(__file__).parent)}"
+
+
+def _connect(directory: Path) -> sqlite3.Connection:
+    """
+    Return the connection to the cache database in `directory`, creating it if needed.
+
+    Each process and thread opens its connection once, and keeps it until it exits.
+    """
+    key = (os.getpid(), threading.get_ident(), directory.resolve())
+    if (connection := _connections.get(key)) is None:
+        directory.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(directory / _DATABASE_NAME, timeout=30)
+        try:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(_SCHEMA)
+        except sqlite3.Error:
+            connection.close()
+            raise
+        _connections[key] = connection
+    return connection
+
+
+@atexit.register
+def _close_connections() -> None:
+    """Close the connections of this process, which checkpoints their WAL files."""
+    for (pid, _, _), connection in list(_connections.items()):
+        if pid == os.getpid():
+            connection.close()
+    _connections.clear()
+
+
+def clear_cache(directory: PathLike | None = None) -> None:
+    """
+    Remove every entry from the result cache, for all filters and options.
+
+    Parameters
+    ----------
+    directory : PathLike, optional
+        The directory holding the cache database. Defaults to `default_cache_dir()`.
+    """
+    directory = Path(directory) if directory else default_cache_dir()
+    connection = _connect(directory)
+    with connection:
+        connection.execute("DELETE FROM results")
+    connection.execute("VACUUM")
+
+
+class ResultCache:
+    """
+    On-disk cache of the outputs of one filter with one set of options.
+
+    Parameters
+    ----------
+    filter_name : str
+        The name of the filter whose results are cached, e.g. `"clean"`.
+    options : Mapping[str, JSONPrimitive], optional
+        The options passed to the filter, e.g. `{"indent": 2, "sort_lists": False}`.
+    directory : PathLike, optional
+        The directory holding the cache database. Defaults to `default_cache_dir()`.
+    max_size : int, default DEFAULT_MAX_SIZE
+        The cap on the total size of all cached outputs, in bytes.
+
+    Notes
+    -----
+    The cache never fails a run: if the database can't be opened or written, a warning
+    is issued and the filter simply runs as if nothing was cached. A `ResultCache` only
+    holds its settings, so it can be pickled and shared with worker processes.
+    """
+
+    def __init__(
+        self,
+        filter_name: str,
+        options: Mapping[str, JSONPrimitive] | None = None,
+        directory: PathLike | None = None,
+        max_size: int = DEFAULT_MAX_SIZE,
+    ) -> None:
+        self.directory = Path(directory) if directory else default_cache_dir()
+        self.max_size = max_size
+        self._namespace = json.dumps(
+            {
+                "filter": filter_name,
+                "options": dict(options or {}),
+                "version": _package_version(),
+            },
+            sort_keys=True,
+        ).encode("UTF-8")
+
+    def key(self, input_bytes: bytes) -> str:
+        """Return the cache key of the filter output for `input_bytes`."""
+        hasher = hashlib.sha256(self._namespace)
+        hasher.update(b"\0")
+        hasher.update(input_bytes)
+        return hasher.hexdigest()
+
+    def get(self, key: str) -> str | None:
+        """
+        Look up a cached filter output and mark it as recently used (to the hour).
+
+        Parameters
+        ----------
+        key : str
+            The cache key, as returned by `ResultCache.key`.
+
+        Returns
+        -------
+        str or None
+            The cached output, or `None` on a cache miss.
+        """
+        try:
+            with _connect(self.directory) as connection:
+                # The cursor is closed right away, so that the connection, which stays
+                # open, doesn't keep a read transaction open.
+                with closing(
+                    connection.execute(
+                        "SELECT output, last_used FROM results WHERE key = ?", (key,)
+                    )
+                ) as rows:
+                    row = rows.fetchone()
+                if row is None:
+                    return None
+                if (now := time.time()) - row[1] >= _TOUCH_INTERVAL:
+                    connection.execute(
+                        "UPDATE results SET last_used = ? WHERE key = ?", (now, key)
+                    )
+        except sqlite3.Error as e:
+            warnings.warn(f"Result cache unavailable: {e}", UserWarning, stacklevel=2)
+            return None
+        return bytes(row[0]).decode("UTF-8")
+
+    def put(self, key: str, output: str) -> None:
+        """
+        Store a filter output, evicting the least recently used entries if needed.
+
+        Parameters
+        ----------
+        key : str
+            The cache key, as returned by `ResultCache.key`.
+        output : str
+            The filter output to store.
+        """
+        output_bytes = output.encode("UTF-8")
+        if len(output_bytes) > self.max_size:
+            return
+        try:
+            with _connect(self.directory) as connection:
+                # An upsert, unlike a replace, fires the update trigger on the size.
+                connection.execute(
+                    """
+                    INSERT INTO results VALUES (?, ?, ?, ?) ON CONFLICT (key) DO UPDATE
+                    SET output = excluded.output, size = excluded.size,
+                        last_used = excluded.last_used
+                    """,
+                    (key, output_bytes, len(output_bytes), time.time()),
+                )
+                (total_size,) = connection.execute(
+                    "SELECT size FROM total_size"
+                ).fetchone()
+                if total_size > self.max_size:
+                    self._evict(connection, total_size - self.max_size)
+        except sqlite3.Error as e:
+            warnings.warn(f"Result cache unavailable: {e}", UserWarning, stacklevel=2)
+
+    @staticmethod
+    def _evict(connection: sqlite3.Connection, excess: int) -> None:
+        """Delete the least recently used entries, of at least `excess` bytes in all."""
+        evicted = []
+        with closing(
+            connection.execute("SELECT key, size FROM results ORDER BY last_used, key")
+        ) as rows:
+            for key, size in rows:
+                if excess <= 0:
+                    break
+                evicted.append((key,))
+                excess -= size
+        connection.executemany("DELETE FROM results WHERE key = ?", evicted)
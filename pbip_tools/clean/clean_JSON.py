@@ -7,28 +7,487 @@ cleaned files *must* be smudged with the `json-smudge` filter before they are lo
 in Power BI again.
 """
 
-import contextlib
 import json
+import logging
 import re
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from concurrent.futures import Executor
+from functools import partial
+from json.encoder import encode_basestring
+from typing import TypeAlias, cast
 
-from pbip_tools.type_aliases import JSONType
+from pbip_tools.interning import loads_interned
+from pbip_tools.json_encoder import _keystr, dump_indented, dumps_indented
+from pbip_tools.memo import nested_json_memo
+from pbip_tools.split import dump_split
+from pbip_tools.stats import nested_json, parse_counts
+from pbip_tools.type_aliases import JSONType, SupportsWrite
+
+logger = logging.getLogger(__name__)
+
+# The key paths that Power BI stores as JSON strings in each kind of file with a known
+# layout, where "*" stands for every item of a list. Their last keys are all among the
+# `NESTED_JSON_KEYS` that `smudge_json` turns back into JSON strings.
+NESTED_JSON_PATHS: dict[str, frozenset[tuple[str, ...]]] = {
+    "report.json": frozenset(
+        {
+            ("config",),
+            ("filters",),
+            ("pods", "*", "config"),
+            ("pods", "*", "parameters"),
+            ("sections", "*", "config"),
+            ("sections", "*", "filters"),
+            ("sections", "*", "visualContainers", "*", "config"),
+            ("sections", "*", "visualContainers", "*", "filters"),
+        }
+    ),
+    "definition.pbir": frozenset(),
+    "definition.pbism": frozenset(),
+}
+# A top-level key by which each kind of file in `NESTED_JSON_PATHS` is recognized.
+_FILE_KIND_KEYS = {
+    "sections": "report.json",
+    "datasetReference": "definition.pbir",
+    "settings": "definition.pbism",
+}
+
+
+def _scalar_sort_key(value: JSONType) -> str | None:
+    """
+    Return the canonical sort key of a JSON scalar, i.e. its JSON serialization.
+
+    Examples
+    --------
+    >>> _scalar_sort_key("é"), _scalar_sort_key(1), _scalar_sort_key(None)
+    ('"é"', '1', 'null')
+    """
+    if type(value) is str:
+        return encode_basestring(value)
+    if type(value) is int:
+        return int.__repr__(value)
+    try:
+        return json.dumps(value, ensure_ascii=False)
+    except (TypeError, ValueError):
+        return None
+
+
+def _container_sort_key(
+    list_positions_or_dict_keys: Iterable[int | str], child_sort_keys: list[str | None]
+) -> str | None:
+    """
+    Build the canonical sort key of a list or dictionary from those of its children.
+
+    The canonical sort key of some JSON data is `json.dumps(data, ensure_ascii=False,
+    sort_keys=True)`. Building it from the already computed keys of the children means
+    every subtree is only serialized once, instead of once for every list above it.
+
+    Parameters
+    ----------
+    list_positions_or_dict_keys : Iterable[int | str]
+        The list positions (for a list) or keys (for a dictionary) of the children.
+    child_sort_keys : list of str or None
+        The canonical sort keys of the children, in the same order.
+
+    Returns
+    -------
+    str or None
+        The canonical sort key, or `None` if any child has none.
+
+    Examples
+    --------
+    >>> _container_sort_key(range(2), ["1", '"a"'])
+    '[1, "a"]'
+    >>> _container_sort_key(["z", "a"], ["[]", "null"])
+    '{"a": null, "z": []}'
+    """
+    if None in child_sort_keys:
+        return None
+    if isinstance(list_positions_or_dict_keys, range):
+        return "[" + ", ".join(cast("list[str]", child_sort_keys)) + "]"
+    try:
+        items = sorted(
+            zip(list_positions_or_dict_keys, child_sort_keys, strict=True),
+            key=lambda item: item[0],
+        )
+        members = [
+            f"{encode_basestring(_keystr(key))}: {value}" for key, value in items
+        ]
+    except TypeError:  # e.g. dictionary keys of different types can't be sorted.
+        return None
+    return "{" + ", ".join(members) + "}"
+
+
+def _sort_by_keys(json_list: list[JSONType], sort_keys: list[str]) -> list[str | None]:
+    """
+    Stably sort `json_list` in-place by the given `sort_keys`.
+
+    Returns
+    -------
+    list of str
+        The sort keys, reordered along with `json_list`.
+
+    Examples
+    --------
+    >>> json_list = [{"b": 1}, {"a": 2}, "c"]
+    >>> _sort_by_keys(json_list, ['{"b": 1}', '{"a": 2}', '"c"'])
+    ['"c"', '{"a": 2}', '{"b": 1}']
+    >>> json_list
+    ['c', {'a': 2}, {'b': 1}]
+    """
+    order = sorted(range(len(sort_keys)), key=sort_keys.__getitem__)
+    json_list[:] = [json_list[i] for i in order]
+    return [sort_keys[i] for i in order]
+
+
+# Strings that are (formatted like) numbers or booleans, or start with a boolean.
+_NUMBER_OR_BOOLEAN = re.compile(r"^-?\d+(?:\.\d+)?$|true|false", flags=re.IGNORECASE)
+# Strings that could possibly be JSON, judging by their first and last characters other
+# than JSON whitespace. Anything else would fail to parse.
+_MAYBE_JSON = re.compile(
+    r'[ \t\n\r]*(?:[-{\["0-9tfnNI].*[}\]"0-9elyN]|[0-9])[ \t\n\r]*', flags=re.DOTALL
+)
+
+# Strings that could possibly be a JSON `dict` or `list`.
+_MAYBE_JSON_CONTAINER = re.compile(r"[ \t\n\r]*[{\[]")
+
+
+def _parse_nested_json_string(
+    value: str,
+    loads: Callable[..., JSONType] = json.loads,
+    *,
+    sort_lists: bool = False,
+) -> JSONType:
+    """
+    Parse a string that contains JSON, or return it unchanged if it doesn't.
+
+    Strings that can't be JSON, going by their first and last characters, are returned
+    without trying to parse them, which is most of the strings in a report (names, DAX
+    expressions, GUIDs, ...). The others are parsed with `loads`, e.g. `loads_interned`
+    to save memory, unless they are in `nested_json_memo`. Their JSON data may thus be
+    shared, and must not be changed, unless they are parsed with `sort_lists`.
+
+    Examples
+    --------
+    >>> _parse_nested_json_string('{"a": [1, 2]}')
+    {'a': [1, 2]}
+    >>> _parse_nested_json_string("Sales Amount"), _parse_nested_json_string("3.14")
+    ('Sales Amount', '3.14')
+    """
+    if not _MAYBE_JSON.fullmatch(value):
+        parse_counts["avoided"] += 1
+        return value
+    if _NUMBER_OR_BOOLEAN.match(value):
+        # Do NOT parse raw numbers and booleans. Doing so may change their datatypes
+        # and make cleaning irreversible. Instead, preserve the datatypes as they
+        # appeared in the original JSON, even if that's a number or a boolean formatted
+        # as a string.
+        parse_counts["avoided"] += 1
+        return value
+    try:
+        parsed = nested_json_memo.loads(value, loads, sort_lists=sort_lists)
+    except json.JSONDecodeError:
+        parse_counts["not_json"] += 1
+        return value
+    parse_counts["parsed"] += 1
+    return parsed
+
+
+_Container: TypeAlias = dict[str | int, JSONType] | list[JSONType]
+# The state of `_clean_and_sort_lists` for each `dict` or `list` it is in: the
+# container, its keys (or list positions), an iterator over those, the sort keys of the
+# children done so far, and whether the sort key of the container itself is needed
+# (i.e. whether it is inside of a list).
+_Frame: TypeAlias = tuple[
+    _Container, Sequence[str | int], Iterator[str | int], list[str | None], bool
+]
+
+
+def _clean_and_sort_lists(
+    json_data: JSONType,
+    parse_string: Callable[[str], JSONType] = _parse_nested_json_string,
+) -> JSONType:
+    """
+    De-nest the JSON strings in `json_data` in-place, and sort all of its lists.
+
+    Every string inside of a `dict` or `list` is replaced by `parse_string(string)`.
+
+    The data is walked with an explicit stack rather than by recursion, so there is no
+    limit to how deeply it may be nested. Every list is sorted after its items are
+    cleaned, by canonical sort keys that are built bottom-up from those of the items.
+    """
+    if not isinstance(json_data, dict | list):
+        return json_data
+
+    def new_frame(container: _Container, *, in_list: bool) -> _Frame:
+        index: Sequence[str | int] = (
+            range(len(container)) if isinstance(container, list) else list(container)
+        )
+        return container, index, iter(index), [], in_list
+
+    stack = [new_frame(json_data, in_list=False)]
+    while stack:
+        container, index, keys, child_sort_keys, with_sort_key = stack[-1]
+        # Every item of a list needs a sort key, and so does everything inside of such
+        # an item, since the item's sort key is built from theirs.
+        with_child_sort_keys = with_sort_key or isinstance(container, list)
+        for key in keys:
+            value = container[key]  # type: ignore[index]
+            if isinstance(value, str):
+                value = parse_string(value)
+                container[key] = value  # type: ignore[index]
+            if isinstance(value, dict | list):
+                stack.append(new_frame(value, in_list=with_child_sort_keys))
+                break
+            if with_child_sort_keys:
+                child_sort_keys.append(_scalar_sort_key(value))
+        else:
+            # All children are done: sort a list, and pass the container's sort key on
+            # to the enclosing container.
+            stack.pop()
+            if isinstance(container, list) and None not in child_sort_keys:
+                child_sort_keys = _sort_by_keys(
+                    container, cast("list[str]", child_sort_keys)
+                )
+            if with_sort_key:
+                stack[-1][3].append(_container_sort_key(index, child_sort_keys))
+    return json_data
+
+
+def _parse_nested_json_container(
+    value: str,
+    loads: Callable[..., JSONType] = json.loads,
+    *,
+    sort_lists: bool = False,
+) -> JSONType:
+    """
+    Parse a string that contains a JSON `dict` or `list`, or return it unchanged.
+
+    Examples
+    --------
+    >>> _parse_nested_json_container("[1, 2]"), _parse_nested_json_container("null")
+    ([1, 2], 'null')
+    """
+    if not _MAYBE_JSON_CONTAINER.match(value):
+        parse_counts["avoided"] += 1
+        return value
+    parsed = _parse_nested_json_string(value, loads, sort_lists=sort_lists)
+    return parsed if isinstance(parsed, dict | list) else value
+
+
+def _file_kind(json_data: dict[str | int, JSONType]) -> str | None:
+    """Return the kind of file in `NESTED_JSON_PATHS` that `json_data` is, if any."""
+    for key, kind in _FILE_KIND_KEYS.items():
+        if key in json_data:
+            return kind
+    return None
+
+
+def _paths_below(
+    paths: Iterable[tuple[str, ...]], path: tuple[str | int, ...]
+) -> list[tuple[str, ...]]:
+    """
+    Return the key paths of `paths` that go through `path`, relative to it.
+
+    Examples
+    --------
+    >>> _paths_below([("config",), ("sections", "*", "config")], ("sections", 3))
+    [('config',)]
+    """
+    return [
+        known_path[len(path) :]
+        for known_path in paths
+        if len(known_path) > len(path)
+        and all(
+            key == ("*" if isinstance(step, int) else step)
+            for key, step in zip(known_path, path, strict=False)
+        )
+    ]
+
+
+def _maybe_container_strings(json_data: JSONType) -> dict[int, str]:
+    """
+    Return the strings in `json_data` that could be a JSON `dict` or `list`, by `id`.
+
+    Examples
+    --------
+    >>> list(_maybe_container_strings({"a": ["[1]", "b"], "c": "{}"}).values())
+    ['{}', '[1]']
+    """
+    strings: dict[int, str] = {}
+    stack = [json_data] if isinstance(json_data, dict | list) else []
+    while stack:
+        container = stack.pop()
+        values = container.values() if isinstance(container, dict) else container
+        for value in cast("Iterable[JSONType]", values):
+            if isinstance(value, dict | list):
+                stack.append(value)
+            elif isinstance(value, str) and _MAYBE_JSON_CONTAINER.match(value):
+                strings[id(value)] = value
+    return strings
+
+
+def _known_paths_parser(
+    json_data: JSONType,
+    file_kind: str,
+    loads: Callable[..., JSONType] = json.loads,
+    *,
+    sort_lists: bool = False,
+    path: tuple[str | int, ...] = (),
+) -> Callable[[str], JSONType]:
+    """
+    Return a `parse_string` that only de-nests the JSON strings at known key paths.
+
+    The strings at the `NESTED_JSON_PATHS` of `json_data` are parsed like any string is
+    by default. Any other string is only parsed if it contains a JSON `dict` or `list`.
+    That is logged if the string is one of `json_data` itself, rather than one inside
+    of nested JSON, since it means that the registry is missing a path. If `json_data`
+    is a part of a file, found at `path` in it, the paths are relative to that.
+
+    Notes
+    -----
+    The strings at the known paths are told apart by their identity, so that they are
+    parsed only as they are serialized. (Parsing them all beforehand keeps far more
+    objects alive at once, which makes garbage collection much slower.) `json.loads`
+    never shares a string object between several values, except for strings of at most
+    one character, which are never parsed anyway. (Nor does `loads_interned`, which
+    only shares strings that can't be JSON.) So are the strings of `json_data` that
+    could be a JSON `dict` or `list`, which are few.
+    """
+    # The strings at the known paths, by `id`. Keeping them alive here ensures that no
+    # other string gets the `id` of one of them, even once it is replaced by its JSON.
+    known_strings: dict[int, str] = {}
+    for known_path in _paths_below(NESTED_JSON_PATHS[file_kind], path):
+        # The `dict`s and `list`s along the path, down to those that hold its last key.
+        containers: list[JSONType] = [json_data]
+        for key in known_path[:-1]:
+            if key == "*":
+                containers = [
+                    item
+                    for container in containers
+                    if isinstance(container, list)
+                    for item in container
+                ]
+            else:
+                containers = [
+                    container[key]
+                    for container in containers
+                    if isinstance(container, dict) and key in container
+                ]
+        for container in containers:
+            if isinstance(container, dict):
+                value = container.get(known_path[-1])
+                if isinstance(value, str):
+                    known_strings[id(value)] = value
+    # The other strings of `json_data` are told apart from those inside of nested JSON,
+    # which are parsed the same way, like so, too.
+    file_strings = _maybe_container_strings(json_data)
+
+    logged = False
+
+    def parse_string(value: str) -> JSONType:
+        nonlocal logged
+        if id(value) in known_strings:
+            return _parse_nested_json_string(value, loads, sort_lists=sort_lists)
+        parsed = _parse_nested_json_container(value, loads, sort_lists=sort_lists)
+        if parsed is not value and id(value) in file_strings and not logged:
+            logged = True
+            logger.warning(
+                "Found nested JSON outside of the known paths of %s: %.60s",
+                file_kind,
+                value,
+            )
+        return parsed
+
+    return parse_string
+
+
+def _part_parser(
+    part: JSONType,
+    path: tuple[str | int, ...],
+    *,
+    file_kind: str | None,
+    low_memory: bool,
+) -> Callable[[str], JSONType]:
+    """
+    Return the `parse_string` to clean `part` with, found at `path` in a file.
+
+    This is the `part_parser` of `dump_split`, which calls it in a worker process.
+    `file_kind` is the kind of the whole file, when cleaning `schema_aware`-ly.
+    """
+    loads = loads_interned if low_memory else json.loads
+    if file_kind is not None:
+        return _known_paths_parser(part, file_kind, loads, path=path)
+    if low_memory:
+        return partial(_parse_nested_json_string, loads=loads)
+    return _parse_nested_json_string
+
+
+def _clean_json_data(
+    json_data: JSONType, *, sort_lists: bool, schema_aware: bool, low_memory: bool
+) -> tuple[JSONType, Callable[[str], JSONType] | None]:
+    """
+    Clean `json_data` as far as it needs to be before it is serialized.
+
+    Returns
+    -------
+    JSONType
+        The (partially) cleaned JSON data.
+    Callable[[str], JSONType] or None
+        The `parse_string` to serialize the JSON data with, to finish cleaning it, if
+        any.
+    """
+    loads = loads_interned if low_memory else json.loads
+    parse_string: Callable[[str], JSONType] = (
+        partial(_parse_nested_json_string, loads=loads, sort_lists=sort_lists)
+        if low_memory or sort_lists
+        else _parse_nested_json_string
+    )
+    if schema_aware:
+        if isinstance(json_data, dict) and (file_kind := _file_kind(json_data)):
+            parse_string = _known_paths_parser(
+                json_data, file_kind, loads, sort_lists=sort_lists
+            )
+        else:
+            logger.info("Unknown kind of file; falling back to parsing every string.")
+    if nested_json.enabled:
+        parse_string = nested_json.timed(parse_string)
+    if sort_lists:
+        return _clean_and_sort_lists(json_data, parse_string), None
+    return json_data, parse_string
 
 
 def clean_json(
-    json_data: JSONType, indent: int = 2, *, sort_lists: bool = False
+    json_data: JSONType,
+    indent: int = 2,
+    *,
+    sort_lists: bool = False,
+    schema_aware: bool = False,
+    low_memory: bool = False,
 ) -> str:
     """
     Clean and format nested JSON data for human-readability.
 
-    Recursively process and "clean" JSON data using `format_nested_json_strings`. If a
-    string contains valid JSON, it is also recursively cleaned. This function makes a
-    best-effort to preserve the original JSON datatypes for Power BI compatibility.
+    Every string inside of the JSON data that contains valid JSON is replaced by that
+    (cleaned) JSON, at any depth. This function makes a best-effort to preserve the
+    original JSON datatypes for Power BI compatibility.
 
     Parameters
     ----------
     json_data : JSONType
         The JSON data to be cleaned and formatted. It may be a list, dictionary, or
         `JSONPrimitive`.
+    indent : int, default 2
+        The number of spaces to indent each nesting level with.
+    sort_lists : bool, default False
+        Whether to sort every list, so that the output doesn't depend on list order.
+    schema_aware : bool, default False
+        Whether to only de-nest the strings at the key paths that Power BI is known to
+        store JSON strings at (see `NESTED_JSON_PATHS`), in files of a known kind. This
+        parses far fewer strings, and never turns strings like `"null"` or `"12 "` into
+        other types, which `smudge_json` couldn't undo.
+    low_memory : bool, default False
+        Whether to parse the nested JSON strings with `loads_interned`, which keeps a
+        single copy of each key and short string in memory, at some cost in speed.
 
     Returns
     -------
@@ -44,68 +503,88 @@ def clean_json(
     - This function makes a best-effort attempt to preserve datatypes from the original
       JSON to ensure reversibility.
     - If a string value contains valid JSON, it is also recursively parsed and cleaned.
+    - Strings that repeat, within a file or across the files cleaned by a process, are
+      only parsed once (see `pbip_tools.memo`), unless `sort_lists`.
     """
+    json_data, parse_string = _clean_json_data(
+        json_data,
+        sort_lists=sort_lists,
+        schema_aware=schema_aware,
+        low_memory=low_memory,
+    )
+    return dumps_indented(json_data, indent=indent, parse_string=parse_string)
 
-    def format_nested_json_strings(json_data_subset: JSONType) -> JSONType:
-        """
-        Recursively format nested JSON with nested JSON strings.
-
-        Parameters
-        ----------
-        json_data_subset : JSONType
-            The subset of JSON data to process.
 
-        Returns
-        -------
-        JSONType
-            The cleaned subset of JSON data
-        """
-        if not isinstance(json_data_subset, dict | list):
-            return json_data_subset
+def clean_json_to(  # noqa: PLR0913
+    json_data: JSONType,
+    fp: SupportsWrite[str] | SupportsWrite[bytes],
+    indent: int = 2,
+    *,
+    sort_lists: bool = False,
+    schema_aware: bool = False,
+    low_memory: bool = False,
+    executor: Executor | None = None,
+) -> None:
+    """
+    Clean JSON data like `clean_json`, writing the output to `fp` as it is encoded.
 
-        index = (
-            range(len(json_data_subset))
-            if isinstance(json_data_subset, list)
-            else json_data_subset.keys()
-        )
-        for list_position_or_dict_key in index:
-            value = json_data_subset[list_position_or_dict_key]  # type: ignore[index]
-            if isinstance(value, dict | list):
-                json_data_subset[list_position_or_dict_key] = (  # type:ignore[index]
-                    format_nested_json_strings(value)
-                )
-            elif isinstance(value, str):
-                number_pattern = r"^-?\d+(?:\.\d+)?$"
-                boolean_pattern = r"true|false"
-                num_or_bool_pat = number_pattern + "|" + boolean_pattern
-                if re.match(num_or_bool_pat, value, flags=re.IGNORECASE):
-                    # Do NOT parse raw numbers and booleans. Doing so may change their
-                    # datatypes and make cleaning irreversible. Instead, preserve the
-                    # datatypes as they appeared in the original JSON, even if that's a
-                    # number or a boolean formatted as a string.
-                    continue
-                try:
-                    parsed_value = json.loads(value, parse_constant=str)
-                    formatted_value = format_nested_json_strings(parsed_value)
-                    json_data_subset[list_position_or_dict_key] = (  # type:ignore[index]
-                        formatted_value
-                    )
-                except json.JSONDecodeError:
-                    continue
-
-        # ← sort any lists *after* recursion, so every clean pass is identical
-        if sort_lists and isinstance(json_data_subset, list):
-            with contextlib.suppress(TypeError, ValueError):
-                json_data_subset.sort(
-                    key=lambda item: json.dumps(
-                        item, ensure_ascii=False, sort_keys=True
-                    )
-                )
-        return json_data_subset
+    Parameters
+    ----------
+    json_data : JSONType
+        The JSON data to be cleaned and formatted. It may be a list, dictionary, or
+        `JSONPrimitive`.
+    fp : SupportsWrite[str] or SupportsWrite[bytes]
+        The text or binary file (or stream) to write the cleaned JSON to. Binary
+        streams receive UTF-8.
+    indent : int, default 2
+        The number of spaces to indent each nesting level with.
+    sort_lists : bool, default False
+        Whether to sort every list, so that the output doesn't depend on list order.
+    schema_aware : bool, default False
+        Whether to only de-nest the strings at known key paths, as in `clean_json`.
+    low_memory : bool, default False
+        Whether to parse the nested JSON strings with `loads_interned`, as in
+        `clean_json`.
+    executor : Executor, optional
+        A pool of worker processes to clean the parts of a large file in (e.g. each
+        page of a report), with `pbip_tools.split.dump_split`. The output is the same.
 
-    json_data = format_nested_json_strings(json_data)
+    See Also
+    --------
+    clean_json : Return the cleaned JSON as a `str` instead.
 
-    return json.dumps(json_data, ensure_ascii=False, indent=indent, sort_keys=True)
+    Notes
+    -----
+    The output is never held in memory as a whole (unless it is cleaned with an
+    `executor`), which keeps the peak memory use of cleaning a large file close to the
+    size of its parsed JSON data.
+    """
+    json_data, parse_string = _clean_json_data(
+        json_data,
+        sort_lists=sort_lists,
+        schema_aware=schema_aware,
+        low_memory=low_memory,
+    )
+    if executor is None:
+        dump_indented(json_data, fp, indent=indent, parse_string=parse_string)
+        return
+    # With `sort_lists`, the data is already clean, and so are its parts.
+    part_parser = None
+    if parse_string is not None:
+        file_kind = (
+            _file_kind(json_data)
+            if schema_aware and isinstance(json_data, dict)
+            else None
+        )
+        part_parser = partial(_part_parser, file_kind=file_kind, low_memory=low_memory)
+    dump_split(
+        json_data,
+        fp,
+        executor,
+        indent,
+        parse_string=parse_string,
+        part_parser=part_parser,
+    )
 
 
 def main() -> int:
@@ -115,7 +594,7 @@ def main() -> int:
     return _run_main(
         tool_name="json-clean",
         desc="Clean PowerBI generated nested JSON files.",
-        filter_function=clean_json,
+        filter_function=clean_json_to,
     )
 
 
@@ -1,21 +1,68 @@
 """Shared CLI logic for clean and smudge filters."""
 
 import argparse
-import glob
+import io
 import json
+import mmap
+import os
+import re
+import shutil
+import socket
+import subprocess
 import sys
-from collections.abc import Callable
+import tempfile
+import time
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+from functools import partial
+from itertools import chain
+from pathlib import Path
 
-from pbip_tools import clean_json, smudge_json
+from pbip_tools import clean_json_to, smudge_json_to
+from pbip_tools.cache import ResultCache, clear_cache
+from pbip_tools.client import socket_path
+from pbip_tools.discovery import (
+    filter_files,
+    find_exploded_reports,
+    find_files,
+    git_changed_files,
+)
+from pbip_tools.explode import explode_json_file, implode_json_file
+from pbip_tools.filter_process import run_filter_process
+from pbip_tools.interning import loads_interned
+from pbip_tools.json_encoder import dump_indented
 from pbip_tools.json_utils import (
+    FileStatus,
+    _OutputRecorder,
     _process_and_save_json_files,
     _specified_stdin_instead_of_file,
+    _stream_and_save_json_files,
+    _summarize_file_statuses,
+)
+from pbip_tools.profiler import SORT_KEYS, format_profile, profile_json
+from pbip_tools.split import SPLIT_SIZE
+from pbip_tools.stats import (
+    FileStats,
+    PhaseTimer,
+    TimedWriter,
+    collect_stats,
+    format_stats,
 )
-from pbip_tools.type_aliases import JSONType
+from pbip_tools.streaming import clean_json_stream, smudge_json_stream
+from pbip_tools.type_aliases import JSONType, SupportsWrite
+from pbip_tools.watch import watch_files
+
+# The options of the clean filter, which the results in the cache depend on.
+_CLEAN_OPTIONS = ["indent", "sort_lists", "schema_aware"]
+
+# A newline in the output of a filter, and the indentation that follows it.
+_INDENTATION = re.compile(r"\n *")
 
 
 def _run_main(
-    tool_name: str, desc: str, filter_function: Callable[[JSONType], str]
+    tool_name: str,
+    desc: str,
+    filter_function: Callable[[JSONType, SupportsWrite[str]], None],
 ) -> int:
     """
     Entry point for the `json-clean` and `json-smudge` scripts.
@@ -30,8 +77,9 @@ def _run_main(
     desc : str
         The description of the tool that will be displayed in the CLI help.
     filter_function : Callable
-        The function to filter the data through (e.g. `clean_json` or `smudge_json`).
-        The passed function must accept JSON-like data and return a string.
+        The function to filter the data through (e.g. `clean_json_to` or
+        `smudge_json_to`). The passed function must accept JSON-like data and a text
+        stream, and write its output to the stream.
 
     Returns
     -------
@@ -49,55 +97,467 @@ def _run_main(
         ),
         metavar="filename_or_glob",  # Name shown in CLI help text.
     )
+    _add_stats_arguments(parser)
 
     args = parser.parse_args()
 
     # Read from stdin and print to stdout when `-` is given as the filename.
     if _specified_stdin_instead_of_file(args.filenames):
-        json_data = json.load(sys.stdin)
-        filtered_json = filter_function(json_data)
-        sys.stdout.write(filtered_json)
+        with _stdin_stats(args.stats) as (stats, timer, stdout):
+            json_str = sys.stdin.read()
+            stats.bytes_in = len(json_str.encode("UTF-8"))
+            timer.lap("read")
+            json_data = json.loads(json_str)
+            del json_str
+            timer.lap("parse")
+            filter_function(json_data, stdout)
+            timer.lap("serialize")
         return 0
 
     # Otherwise, we're processing one or more files or glob patterns.
-    files = (
-        file
-        for file_or_glob in args.filenames
-        for file in glob.glob(file_or_glob, recursive=True)
+    return _process_and_save_json_files(
+        find_files(args.filenames),
+        filter_function,
+        stats_format=args.stats,
+        plain_func=dump_indented,
     )
 
-    return _process_and_save_json_files(files, filter_function)
-
 
-def main() -> int:
+def main() -> int:  # noqa: C901, PLR0911
     """Primary entry point for `pbip-tools`."""
     parser = create_argparser()
     args = parser.parse_args()
 
-    if args.command not in ["clean", "smudge"]:
+    commands = [
+        "clean",
+        "smudge",
+        "check",
+        "filter-process",
+        "cache",
+        "profile",
+        "watch",
+        "daemon",
+    ]
+    if args.command not in commands:
         parser.print_help()
         return 1
 
-    filter_function = {
-        "clean": lambda text: clean_json(
-            text, indent=args.indent, sort_lists=args.sort_lists
+    if args.command == "daemon":
+        return _run_daemon(parser, args)
+
+    if args.command == "cache":  # i.e. `pbip-tools cache clear`
+        clear_cache(args.cache_dir)
+        return 0
+
+    if args.command == "profile":
+        return _run_profile(args)
+
+    # A `partial` (unlike a `lambda`) can be pickled and sent to worker processes.
+    filters: dict[str, Callable[[JSONType, SupportsWrite[str]], None]] = {
+        "clean": (
+            partial(
+                clean_json_to,
+                indent=args.indent,
+                sort_lists=args.sort_lists,
+                schema_aware=args.schema_aware,
+                low_memory=getattr(args, "low_memory", False),
+            )
+            if args.command != "smudge"  # `smudge` has no clean options.
+            else clean_json_to
         ),
-        "smudge": smudge_json,
-    }[args.command]
+        "smudge": smudge_json_to,
+    }
+
+    if args.command == "filter-process":
+        return run_filter_process(filters)
+
+    if args.command == "watch":
+        return _run_watch(args, filters["clean"])
+
+    _check_inputs(parser, args)
+    check = args.command == "check"
+
+    if args.stream:
+        return _run_streaming(parser, args)
+
+    # `check` compares each file with its output from `clean`.
+    filter_name = "clean" if check else args.command
+    filter_function = filters[filter_name]
+    filter_options = {
+        option: getattr(args, option)
+        for option in _CLEAN_OPTIONS
+        if hasattr(args, option)
+    }
+
+    if args.ndjson:
+        return _run_ndjson(args, filter_function)
 
     # Read from stdin and print to stdout when `-` is given as the filename.
     if _specified_stdin_instead_of_file(args.filenames):
-        json_data = json.load(sys.stdin)
-        filtered_json = filter_function(json_data)
-        sys.stdout.write(filtered_json)
+        with _stdin_stats(args.stats) as (stats, timer, stdout):
+            json_bytes = sys.stdin.buffer.read()
+            # Unlike files, stdin keeps `NaN` and `Infinity` as numbers, so its results
+            # are cached separately.
+            cache = (
+                None
+                if args.no_cache
+                else ResultCache(
+                    f"{args.command} (stdin)", filter_options, args.cache_dir
+                )
+            )
+            cache_key = cache.key(json_bytes) if cache else ""
+            stats.bytes_in = len(json_bytes)
+            timer.lap("read")
+            if cache and (filtered_json := cache.get(cache_key)) is not None:
+                stdout.write(filtered_json)
+                timer.lap("serialize")
+            else:
+                loads = loads_interned if args.low_memory else json.loads
+                json_data = loads(json_bytes.decode("UTF-8"))
+                del json_bytes
+                timer.lap("parse")
+                # Stream the output, keeping a copy for the cache only if it can be
+                # stored.
+                recorder = _OutputRecorder(stdout, cache.max_size) if cache else None
+                filter_function(json_data, recorder or stdout)
+                timer.lap("serialize")
+                if cache and recorder and (output := recorder.getvalue()) is not None:
+                    cache.put(cache_key, output)
         return 0
 
-    files = (
-        file
-        for file_or_glob in args.filenames
-        for file in glob.glob(file_or_glob, recursive=True)
+    cache = (
+        None
+        if args.no_cache
+        else ResultCache(filter_name, filter_options, args.cache_dir)
+    )
+    return _process_and_save_json_files(
+        _find_files(parser, args),
+        filter_function,
+        jobs=args.jobs,
+        cache=cache,
+        stats_format=args.stats,
+        low_memory=args.low_memory,
+        plain_func=_plain_filter(args),
+        check=check,
+        split_size=SPLIT_SIZE,
+        report_func=_report_func(args, filter_function),
+    )
+
+
+def _check_inputs(parser: argparse.ArgumentParser, args: argparse.Namespace) -> None:
+    """Exit with an error unless `args` say where to read the input from, only once."""
+    args.ndjson = getattr(args, "ndjson", False)  # `check` has no `--ndjson`.
+    stdin = _specified_stdin_instead_of_file(args.filenames)
+    if not args.filenames and args.files_from is None:
+        parser.error(
+            "the following arguments are required: filename_or_glob (or `--files-from`)"
+        )
+    if stdin and args.command == "check":
+        parser.error("`check` only checks files, not stdin.")
+    if stdin and args.files_from is not None:
+        parser.error("`-` can't be combined with `--files-from`.")
+    if args.ndjson and not stdin:
+        parser.error("`--ndjson` only applies to stdin, i.e. `-`.")
+    if args.ndjson and args.stream:
+        parser.error("`--stream` can't be combined with `--ndjson`.")
+    for option in ["explode", "implode"]:
+        if getattr(args, option, False) and (stdin or args.stream):
+            parser.error(f"`--{option}` only applies to files, without `--stream`.")
+    if getattr(args, "implode", False) and (args.changed_since or args.staged):
+        parser.error(
+            "`--implode` can't be combined with `--changed-since` or `--staged`."
+        )
+
+
+def _read_files_from(args: argparse.Namespace) -> list[str]:
+    """
+    Return the names listed in the `--files-from` file, or on stdin for `-`.
+
+    The names are separated by newlines, or by NUL characters with `-0`. Empty names are
+    skipped.
+    """
+    if args.files_from is None:
+        return []
+    if args.files_from == "-":
+        contents = sys.stdin.buffer.read()
+    else:
+        contents = Path(args.files_from).read_bytes()
+    names = contents.split(b"\0") if args.null else contents.splitlines()
+    return [os.fsdecode(name) for name in names if name]
+
+
+def _find_files(
+    parser: argparse.ArgumentParser, args: argparse.Namespace
+) -> Iterable[str]:
+    """
+    Return the files to process for `args.filenames` and `--files-from`.
+
+    The names read from `--files-from` are never expanded as glob patterns. With
+    `--changed-since` or `--staged`, only the files that git says changed are returned,
+    if the arguments would find them.
+    """
+    try:
+        listed_files = _read_files_from(args)
+    except OSError as e:
+        parser.error(f"Can't read `--files-from`: {e}")
+    if getattr(args, "implode", False):
+        return _with_exploded_reports(
+            find_files(args.filenames, listed_files), args.filenames
+        )
+    if args.changed_since is None and not args.staged:
+        return find_files(args.filenames, listed_files)
+    try:
+        changed = git_changed_files(since=args.changed_since, staged=args.staged)
+    except subprocess.CalledProcessError as e:
+        parser.error(f"git failed: {e.stderr.strip()}")
+    except OSError as e:
+        parser.error(f"Can't run git: {e}")
+    return list(filter_files(changed, args.filenames, listed_files))
+
+
+def _report_func(
+    args: argparse.Namespace,
+    filter_function: Callable[[JSONType, SupportsWrite[str]], None],
+) -> Callable[..., FileStatus] | None:
+    """Return what `--explode` or `--implode` do with each `report.json`, if given."""
+    if getattr(args, "explode", False):
+        return partial(
+            explode_json_file,
+            indent=args.indent,
+            sort_lists=args.sort_lists,
+            schema_aware=args.schema_aware,
+            low_memory=args.low_memory,
+        )
+    if getattr(args, "implode", False):
+        return partial(implode_json_file, process_func=filter_function)
+    return None
+
+
+def _with_exploded_reports(files: Iterable[str], filenames: list[str]) -> list[str]:
+    """
+    Return `files` and the reports of the shards directories that `filenames` find.
+
+    With `--implode`, a report is put back together from its shards even if the report
+    file doesn't exist yet. Each file is returned once.
+    """
+    unique_files: dict[str, str] = {}
+    for file in chain(files, find_exploded_reports(filenames)):
+        unique_files.setdefault(os.path.realpath(file), file)
+    return list(unique_files.values())
+
+
+def _one_line(indented_json: str) -> str:
+    r"""
+    Return the JSON output of a filter on a single line, e.g. for NDJSON.
+
+    Every newline in the output of a filter is followed by indentation, and never inside
+    a string, where it would be escaped. Those are dropped, but for a space after each
+    comma, as in the output of `json.dumps`.
+
+    Examples
+    --------
+    >>> _one_line('{\n  "a": [\n    1,\n    "b\\nc"\n  ]\n}')
+    '{"a": [1, "b\\nc"]}'
+    """
+    return _INDENTATION.sub("", indented_json.replace(",\n", ", \n"))
+
+
+def _run_ndjson(
+    args: argparse.Namespace,
+    filter_function: Callable[[JSONType, SupportsWrite[str]], None],
+) -> int:
+    """
+    Run `pbip-tools clean --ndjson -` or `smudge --ndjson -`.
+
+    Each line of stdin is a JSON document, which is filtered and written to stdout on a
+    single line. Blank lines are skipped. The result cache isn't used, since a lookup
+    per line would cost more than it saves.
+    """
+    loads = loads_interned if args.low_memory else json.loads
+    output = io.StringIO()
+    with _stdin_stats(args.stats) as (stats, timer, stdout):
+        for line_number, line in enumerate(sys.stdin.buffer, start=1):
+            stats.bytes_in += len(line)
+            if not line.strip():
+                continue
+            try:
+                json_data = loads(line.decode("UTF-8"))
+            except ValueError as e:
+                msg = f"Error parsing line {line_number} of stdin: {e}"
+                raise ValueError(msg) from e
+            timer.lap("parse")
+            filter_function(json_data, output)
+            stdout.write(_one_line(output.getvalue()) + "\n")
+            output.seek(0)
+            output.truncate()
+            timer.lap("serialize")
+    return 0
+
+
+def _plain_filter(args: argparse.Namespace) -> Callable[..., None]:
+    """
+    Return the filter for the files that Power BI writes as plain JSON.
+
+    Such files (e.g. `.platform` files) have no nested JSON strings, so they are only
+    formatted like the output of `args.command`, and never smudged.
+    """
+    return partial(dump_indented, indent=getattr(args, "indent", 2))
+
+
+def _run_streaming(parser: argparse.ArgumentParser, args: argparse.Namespace) -> int:
+    """Run `pbip-tools clean --stream`, `smudge --stream` or `check --stream`."""
+    if getattr(args, "sort_lists", False):
+        parser.error("`--stream` can't be combined with `--sort-lists`.")
+    if getattr(args, "schema_aware", False):
+        parser.error("`--stream` can't be combined with `--schema-aware`.")
+    if args.low_memory:
+        parser.error("`--stream` can't be combined with `--low-memory`.")
+
+    # Files are filtered with `parse_constant=str`, unlike stdin (see `main`).
+    stream_func: Callable[..., None] = (
+        partial(clean_json_stream, indent=args.indent)
+        if args.command in {"clean", "check"}
+        else smudge_json_stream
+    )
+
+    if not _specified_stdin_instead_of_file(args.filenames):
+        return _stream_and_save_json_files(
+            _find_files(parser, args),
+            partial(stream_func, parse_constant=str),
+            jobs=args.jobs,
+            stats_format=args.stats,
+            plain_func=_plain_filter(args),
+            check=args.command == "check",
+        )
+
+    # Spool stdin to a temporary file, so that it can be memory-mapped.
+    with (
+        _stdin_stats(args.stats) as (stats, timer, stdout),
+        tempfile.TemporaryFile() as spool,
+    ):
+        shutil.copyfileobj(sys.stdin.buffer, spool)
+        spool.flush()
+        stats.bytes_in = spool.tell()
+        timer.lap("read")
+        if not spool.tell():
+            stream_func(b"", stdout)  # An empty file can't be mapped.
+            return 0
+        with mmap.mmap(spool.fileno(), 0, access=mmap.ACCESS_READ) as contents:
+            stream_func(contents, stdout)
+        timer.lap("serialize")
+    return 0
+
+
+def _run_watch(
+    args: argparse.Namespace,
+    filter_function: Callable[[JSONType, SupportsWrite[str]], None],
+) -> int:
+    """Run `pbip-tools watch` until it is interrupted, e.g. with Ctrl+C."""
+    cache = (
+        None
+        if args.no_cache
+        else ResultCache(
+            "clean",
+            {option: getattr(args, option) for option in _CLEAN_OPTIONS},
+            args.cache_dir,
+        )
+    )
+    batches = watch_files(
+        args.directories,
+        filter_function,
+        plain_func=_plain_filter(args),
+        cache=cache,
+        low_memory=args.low_memory,
+        debounce=args.debounce,
+        polling=args.poll,
+        interval=args.interval,
+    )
+    try:
+        for batch in batches:
+            statuses = [status for _, status in batch]
+            print(
+                f"[{time.strftime('%H:%M:%S')}] {_summarize_file_statuses(statuses)}",
+                file=sys.stderr,
+                flush=True,
+            )
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def _run_daemon(parser: argparse.ArgumentParser, args: argparse.Namespace) -> int:
+    """Run `pbip-tools daemon` until it is interrupted, e.g. with Ctrl+C."""
+    if not hasattr(socket, "AF_UNIX"):
+        parser.error("`daemon` needs Unix domain sockets, which this platform lacks.")
+    # Only imported here, since it needs Unix domain sockets.
+    from pbip_tools.daemon import serve
+
+    try:
+        return serve(args.socket or socket_path(), args.workers or None)
+    except FileExistsError as e:
+        parser.error(str(e))
+
+
+def _run_profile(args: argparse.Namespace) -> int:
+    """Run `pbip-tools profile`, printing the profile of each key path to stdout."""
+    with Path(args.filename).open(encoding="UTF-8") as f:
+        # Like the files that `clean` processes, `NaN` and `Infinity` stay strings.
+        json_data = json.load(f, parse_constant=str)
+    profiles = profile_json(json_data, args.indent, schema_aware=args.schema_aware)
+    output_format = "json" if args.json else "human"
+    print(format_profile(profiles, output_format, sort=args.sort, top=args.top or None))
+    return 0
+
+
+@contextmanager
+def _stdin_stats(
+    stats_format: str | None,
+) -> Iterator[tuple[FileStats, PhaseTimer, SupportsWrite[str]]]:
+    """
+    Collect statistics on filtering stdin to stdout, and print them if asked to.
+
+    Yields
+    ------
+    FileStats
+        The statistics of stdin, which are only printed with a `stats_format`.
+    PhaseTimer
+        The timer of the phases of filtering stdin.
+    SupportsWrite[str]
+        The stream to write the output to, i.e. stdout.
+    """
+    stats = FileStats("<stdin>")
+    if not stats_format:
+        yield stats, PhaseTimer(None), sys.stdout
+        return
+
+    start = time.perf_counter()
+    stdout = TimedWriter(sys.stdout)
+    with collect_stats(stats):
+        yield stats, PhaseTimer(stats), stdout
+    stdout.record(stats)
+    seconds = time.perf_counter() - start
+    print(format_stats([stats], seconds, stats_format), file=sys.stderr)
+
+
+def _add_stats_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the `--stats` and `--stats-json` options to `parser`."""
+    parser.add_argument(
+        "--stats",
+        action="store_const",
+        const="human",
+        default=None,
+        help=(
+            "Print the size and phase timings of each file, the throughput, and the"
+            " slowest files to stderr."
+        ),
+    )
+    parser.add_argument(
+        "--stats-json",
+        action="store_const",
+        const="json",
+        dest="stats",
+        help="Like `--stats`, but print the statistics as JSON.",
     )
-    return _process_and_save_json_files(files, filter_function)
 
 
 def create_argparser() -> argparse.ArgumentParser:
@@ -113,25 +573,298 @@ def create_argparser() -> argparse.ArgumentParser:
         subparsers.add_parser("clean", help="Clean JSON files."),
         subparsers.add_parser("smudge", help="Smudge JSON files."),
     )
+    check_parser = subparsers.add_parser(
+        "check",
+        help="Check that JSON files are clean, without writing them.",
+        description=(
+            "Check whether cleaning the given files would change them, without writing"
+            " any. Each file is cleaned in memory only up to the first byte that"
+            " differs from it. The files that `clean` would rewrite are printed to"
+            " stdout, and the exit status is 1 if there are any."
+        ),
+    )
+    filter_process_parser = subparsers.add_parser(
+        "filter-process",
+        help="Run as a git long-running filter process (`filter.<driver>.process`).",
+        description=(
+            "Speak git's long-running filter process protocol on stdin and stdout,"
+            " cleaning and smudging every file in a single process. The `--indent`,"
+            " `--sort-lists` and `--schema-aware` options apply to cleaning."
+        ),
+    )
 
-    for subparser in [clean_parser, smudge_parser]:
+    profile_parser = subparsers.add_parser(
+        "profile",
+        help="Profile cleaning and smudging a JSON file, per key path.",
+        description=(
+            "Clean and smudge a JSON file while accounting for every key path in it,"
+            " with list indices collapsed to `[*]`. For each path, print how many"
+            " values it holds, and the time, nested JSON strings decoded and encoded,"
+            " and output bytes of the path and everything below it."
+        ),
+    )
+    profile_parser.add_argument("filename", help="The JSON file to profile.")
+    profile_parser.add_argument(
+        "--sort",
+        choices=SORT_KEYS,
+        default="time",
+        help="the column to sort the key paths by, from the largest down.",
+    )
+    profile_parser.add_argument(
+        "--top",
+        type=int,
+        default=25,
+        help="number of key paths to print. Pass 0 to print all of them.",
+        metavar="N",
+    )
+    profile_parser.add_argument(
+        "--json",
+        action="store_true",
+        default=False,
+        help="Print the profile as JSON instead of as a table.",
+    )
+
+    for subparser in [clean_parser, smudge_parser, check_parser]:
+        stdin_help = (
+            ""
+            if subparser is check_parser
+            else ", or pass '-' to read from stdin and write to stdout"
+        )
         subparser.add_argument(
             "filenames",
-            nargs="+",  # one or more
+            nargs="*",  # One or more, unless `--files-from` is given.
             help=(
-                "One or more filenames or glob patterns to process, or pass '-' to read"
-                " from stdin and write to stdout."
+                "One or more filenames, glob patterns, directories or `.pbip` projects"
+                f" to process{stdin_help}. The JSON artifacts of directories and"
+                " projects are all found, except for static resources and custom"
+                " visuals."
             ),
             metavar="filename_or_glob",  # Name shown in CLI help text.
         )
+        subparser.add_argument(
+            "--files-from",
+            default=None,
+            help=(
+                "Also process the files, directories and `.pbip` projects listed in"
+                " FILE, one per line, or read the list from stdin for '-'. Unlike the"
+                " arguments, the names aren't glob patterns, and the list isn't limited"
+                " in length."
+            ),
+            metavar="FILE",
+        )
+        subparser.add_argument(
+            "-0",
+            "--null",
+            action="store_true",
+            default=False,
+            help=(
+                "Separate the names in `--files-from` by NUL characters rather than"
+                " newlines, as `git ls-files -z` and `find -print0` do."
+            ),
+        )
+        if subparser is not check_parser:
+            subparser.add_argument(
+                "--ndjson",
+                action="store_true",
+                default=False,
+                help=(
+                    "With '-', read one JSON document per line of stdin, and write each"
+                    " result to stdout on one line. Implies `--no-cache`."
+                ),
+            )
+        subparser.add_argument(
+            "--jobs",
+            "-j",
+            type=int,
+            default=1,
+            help=(
+                "number of files to process in parallel. Pass 0 to use all CPU cores."
+                f" Files of {SPLIT_SIZE // 1024**2} MiB or more are each split across"
+                " all of them, e.g. page by page, unless with `--stream`."
+            ),
+            metavar="N",
+        )
+        subparser.add_argument(
+            "--stream",
+            action="store_true",
+            default=False,
+            help=(
+                "Process each file in bounded memory, for files too large to load at"
+                " once. Implies `--no-cache`."
+            ),
+        )
+        subparser.add_argument(
+            "--changed-since",
+            default=None,
+            help=(
+                "Only process the files that differ between the git revision REF and"
+                " the working tree, or that are untracked, among those that the other"
+                " arguments find."
+            ),
+            metavar="REF",
+        )
+        subparser.add_argument(
+            "--staged",
+            action="store_true",
+            default=False,
+            help=(
+                "Only process the files with changes staged in git, among those that"
+                " the other arguments find. May be combined with `--changed-since`."
+            ),
+        )
+        _add_stats_arguments(subparser)
 
     clean_parser.add_argument(
-        "--indent", type=int, default=2, help="number of spaces to use for indentation."
+        "--explode",
+        action="store_true",
+        default=False,
+        help=(
+            "Write each `report.json` cleaned to a `report.shards` directory next to"
+            " it, one file per page and per visual, and leave the report itself as it"
+            " is. Only the shards that changed are rewritten."
+        ),
     )
-    clean_parser.add_argument(
-        "--sort-lists",
+    smudge_parser.add_argument(
+        "--implode",
         action="store_true",
         default=False,
-        help="Ignore the order of lists when cleaning JSON files.",
+        help=(
+            "Put each `report.json` back together from its `report.shards` directory,"
+            " if it has one, and smudge it. The arguments find shards directories like"
+            " they find files, even where the report doesn't exist yet."
+        ),
+    )
+
+    watch_parser = subparsers.add_parser(
+        "watch",
+        help="Clean the files of a project whenever they change.",
+        description=(
+            "Clean every JSON file of the given directories and `.pbip` projects, and"
+            " then watch them, cleaning the files whose contents changed whenever"
+            " Power BI saves the project. Stop with Ctrl+C."
+        ),
+    )
+    watch_parser.add_argument(
+        "directories",
+        nargs="+",
+        help="One or more directories or `.pbip` projects to watch.",
+        metavar="directory_or_pbip",
+    )
+    watch_parser.add_argument(
+        "--debounce",
+        type=float,
+        default=0.5,
+        help="seconds to wait for more changes before cleaning the changed files.",
+        metavar="SECONDS",
+    )
+    watch_parser.add_argument(
+        "--poll",
+        action="store_true",
+        default=False,
+        help="Poll for changes, even where inotify is available.",
+    )
+    watch_parser.add_argument(
+        "--interval",
+        type=float,
+        default=1.0,
+        help="seconds between two scans for changes, when polling.",
+        metavar="SECONDS",
+    )
+    daemon_parser = subparsers.add_parser(
+        "daemon",
+        help="Serve `pbip-tools-client` from warm worker processes.",
+        description=(
+            "Listen on a Unix domain socket, and run the commands that"
+            " `pbip-tools-client` forwards to it in worker processes that have already"
+            " imported the filters, saving the startup of a new `pbip-tools` process"
+            " per call. Stop with Ctrl+C."
+        ),
+    )
+    daemon_parser.add_argument(
+        "--socket",
+        default=None,
+        help=(
+            "path of the socket to listen on. Defaults to `$PBIP_TOOLS_SOCKET`, which"
+            " `pbip-tools-client` connects to, or else a path of the user's."
+        ),
+        metavar="PATH",
     )
+    daemon_parser.add_argument(
+        "--workers",
+        type=int,
+        default=0,
+        help="number of commands to run in parallel. Pass 0 to use all CPU cores.",
+        metavar="N",
+    )
+    cache_parser = subparsers.add_parser(
+        "cache",
+        help="Manage the result cache.",
+        description=(
+            "Unchanged files are served from a persistent result cache without being"
+            " parsed. The cache lives in `$PBIP_TOOLS_CACHE_DIR` or the platform's"
+            " cache directory."
+        ),
+    )
+    cache_parser.add_argument("action", choices=["clear"], help="`clear` the cache.")
+
+    for subparser in [clean_parser, smudge_parser, check_parser, watch_parser]:
+        subparser.add_argument(
+            "--no-cache",
+            action="store_true",
+            default=False,
+            help="Don't read or write the result cache.",
+        )
+        subparser.add_argument(
+            "--low-memory",
+            action="store_true",
+            default=False,
+            help=(
+                "Keep a single copy of each key and short string in memory, when"
+                " parsing files and nested JSON strings. Slightly slower."
+            ),
+        )
+
+    for subparser in [
+        clean_parser,
+        smudge_parser,
+        check_parser,
+        watch_parser,
+        cache_parser,
+    ]:
+        subparser.add_argument(
+            "--cache-dir",
+            default=None,
+            help="directory of the result cache.",
+            metavar="DIR",
+        )
+
+    for subparser in [
+        clean_parser,
+        check_parser,
+        filter_process_parser,
+        profile_parser,
+        watch_parser,
+    ]:
+        subparser.add_argument(
+            "--indent",
+            type=int,
+            default=2,
+            help="number of spaces to use for indentation.",
+        )
+        if subparser is not profile_parser:  # Sorted lists are cleaned up front.
+            subparser.add_argument(
+                "--sort-lists",
+                action="store_true",
+                default=False,
+                help="Ignore the order of lists when cleaning JSON files.",
+            )
+        subparser.add_argument(
+            "--schema-aware",
+            action="store_true",
+            default=False,
+            help=(
+                "Only de-nest the JSON strings at the key paths where Power BI is known"
+                " to store them, in `report.json`, `.pbir` and `.pbism` files."
+            ),
+        )
     return parser
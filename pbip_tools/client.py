@@ -0,0 +1,172 @@
+"""
+Thin client of `pbip-tools daemon`, for calling `pbip-tools` many times a minute.
+
+`pbip-tools-client` takes the same arguments as `pbip-tools`. Rather than importing the
+filters and running the command itself, it forwards its arguments, working directory
+and stdin to a running `pbip-tools daemon` over a Unix domain socket, and writes out the
+stdout, stderr and exit code that the daemon sends back. Each call then only pays for
+the startup of the interpreter. When no daemon is running, or for the commands that run
+until they are stopped (`watch`, `filter-process` and `daemon`), the command is run
+in-process, just like `pbip-tools` runs it.
+
+This module is imported on every call, so it imports nothing but `io`, `os`,
+`socket`, `struct` and `sys`.
+
+Every message is a sequence of frames, each a one-byte kind, a four-byte length and a
+payload of that length. The client sends its working directory (`c`), each argument
+(`a`), each `PBIP_TOOLS_*` environment variable as `NAME=value` (`v`), and stdin in
+chunks (`i`), ending with an empty `i` frame. The daemon answers with stdout (`o`) and
+stderr (`e`) in chunks, and ends with the exit code (`x`).
+
+Attributes
+----------
+SOCKET_ENV_VAR : str
+    The environment variable that overrides the default path of the socket.
+"""
+
+import io
+import os
+import socket
+import struct
+import sys
+
+SOCKET_ENV_VAR = "PBIP_TOOLS_SOCKET"
+
+# The header of a frame: its kind and the length of its payload.
+FRAME_HEADER = struct.Struct("!cI")
+CHUNK_SIZE = 64 * 1024
+
+# The commands that run until they are stopped, which are never forwarded.
+_IN_PROCESS_COMMANDS = frozenset({"daemon", "filter-process", "watch"})
+
+
+def socket_path() -> str:
+    """
+    Return the path of the socket that the daemon listens on.
+
+    `$PBIP_TOOLS_SOCKET` takes precedence. Otherwise, the socket is in
+    `$XDG_RUNTIME_DIR`, or else in the temporary directory, named after the user.
+    """
+    if env_path := os.environ.get(SOCKET_ENV_VAR):
+        return env_path
+    directory = (
+        os.environ.get("XDG_RUNTIME_DIR") or os.environ.get("TMPDIR") or "/tmp"  # noqa: S108 (The socket is only used if it's ours; see `_connect`.)
+    )
+    return os.path.join(directory, f"pbip-tools-{os.getuid()}.sock")  # noqa: PTH118
+
+
+def send_frame(connection: socket.socket, kind: bytes, payload: bytes = b"") -> None:
+    """Send a frame of `kind` with `payload` over `connection`."""
+    connection.sendall(FRAME_HEADER.pack(kind, len(payload)) + payload)
+
+
+def read_frame(stream: io.BufferedIOBase) -> tuple[bytes, bytes] | None:
+    """
+    Read a frame from `stream`.
+
+    Returns
+    -------
+    tuple of bytes and bytes, or None
+        The kind and the payload of the frame, or `None` if the other side closed the
+        connection before the frame started.
+
+    Raises
+    ------
+    ConnectionError
+        If the connection was closed in the middle of the frame.
+    """
+    header = stream.read(FRAME_HEADER.size)
+    if not header:
+        return None
+    if len(header) == FRAME_HEADER.size:
+        kind, length = FRAME_HEADER.unpack(header)
+        payload = stream.read(length)
+        if len(payload) == length:
+            return kind, payload
+    msg = "The connection was closed in the middle of a frame."
+    raise ConnectionError(msg)
+
+
+def _connect(path: str) -> socket.socket:
+    """
+    Connect to the daemon listening on `path`.
+
+    Raises
+    ------
+    OSError
+        If no daemon is listening on `path`, or if `path` belongs to another user (who
+        could read everything sent to it).
+    """
+    if os.stat(path).st_uid != os.getuid():  # noqa: PTH116 (`pathlib` is slower.)
+        msg = f"{path} belongs to another user."
+        raise PermissionError(msg)
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        connection.connect(path)
+    except OSError:
+        connection.close()
+        raise
+    return connection
+
+
+def _reads_stdin(arguments: list[str]) -> bool:
+    """
+    Return whether any file or option value in `arguments` is `-`, i.e. stdin.
+
+    Examples
+    --------
+    >>> _reads_stdin(["clean", "-0", "--files-from=-"]), _reads_stdin(["clean", "-0"])
+    (True, False)
+    """
+    options = True
+    for argument in arguments:
+        if argument == "-":  # A file, or the value of the option before it.
+            return True
+        if options and argument == "--":
+            options = False
+        elif options and argument.startswith("--") and argument.endswith("=-"):
+            return True
+    return False
+
+
+def _forward(connection: socket.socket, arguments: list[str]) -> int:
+    """Run `pbip-tools` with `arguments` in the daemon, and return its exit code."""
+    send_frame(connection, b"c", os.fsencode(os.getcwd()))  # noqa: PTH109
+    for argument in arguments:
+        send_frame(connection, b"a", os.fsencode(argument))
+    for name, value in os.environ.items():
+        if name.startswith("PBIP_TOOLS_"):
+            send_frame(connection, b"v", os.fsencode(f"{name}={value}"))
+    if _reads_stdin(arguments):
+        while chunk := sys.stdin.buffer.read(CHUNK_SIZE):
+            send_frame(connection, b"i", chunk)
+    send_frame(connection, b"i")
+
+    outputs = {b"o": sys.stdout.buffer, b"e": sys.stderr.buffer}
+    with connection.makefile("rb") as stream:
+        while (frame := read_frame(stream)) is not None:
+            kind, payload = frame
+            if kind == b"x":
+                return int(payload)
+            outputs[kind].write(payload)
+            outputs[kind].flush()
+    print("pbip-tools daemon closed the connection.", file=sys.stderr)
+    return 1
+
+
+def main() -> int:
+    """Entry point for `pbip-tools-client`."""
+    arguments = sys.argv[1:]
+    command = arguments[0] if arguments else ""
+    if hasattr(socket, "AF_UNIX") and command not in _IN_PROCESS_COMMANDS:
+        try:
+            connection = _connect(socket_path())
+        except OSError:
+            pass  # No daemon is running, so the command is run in-process.
+        else:
+            with connection:
+                return _forward(connection, arguments)
+
+    from pbip_tools.cli import main as cli_main
+
+    return cli_main()
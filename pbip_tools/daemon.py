@@ -0,0 +1,273 @@
+"""
+Daemon that runs the commands of `pbip-tools-client` in warm worker processes.
+
+Starting `pbip-tools` costs more than filtering a typical file from stdin: the
+interpreter starts, and then imports the filters, `argparse` and everything else that
+the CLI uses. Pre-commit hooks and editor integrations that call `pbip-tools clean -`
+many times a minute pay that on every call. `pbip-tools daemon` pays it once: it
+listens on a Unix domain socket (see `pbip_tools.client` for its path and protocol),
+and runs every command forwarded to it in a pool of worker processes that have already
+imported the CLI. Commands are run in their client's working directory, with its
+`PBIP_TOOLS_*` environment variables, and the worker sends their output to the client
+as it is written.
+
+Each worker runs one command at a time, so several clients are served in parallel. A
+worker runs every command as if in a process of its own: with an empty nested JSON memo
+(see `pbip_tools.memo`), and showing every warning again.
+"""
+
+import io
+import os
+import signal
+import socket
+import socketserver
+import sys
+import traceback
+import warnings
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from pbip_tools.client import CHUNK_SIZE, read_frame, send_frame
+
+
+def _start_worker() -> None:
+    """Import the CLI in a worker process, before any command is sent to it."""
+    import pbip_tools.cli  # noqa: F401
+
+    # Ctrl+C stops the daemon, which stops its workers once their commands finish.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _exit_code(code: object) -> int:
+    """Return the exit code for the `code` of a `SystemExit`, like the interpreter."""
+    if code is None:
+        return 0
+    if isinstance(code, int):
+        return code
+    print(code, file=sys.stderr)
+    return 1
+
+
+class _FrameWriter(io.RawIOBase):
+    """
+    Binary stream that sends what is written to it to a client, in frames of `kind`.
+
+    Once the client has gone away, the rest of the output is discarded.
+    """
+
+    def __init__(self, connection: socket.socket, kind: bytes) -> None:
+        self._connection: socket.socket | None = connection
+        self._kind = kind
+
+    def writable(self) -> bool:
+        """Return `True`."""
+        return True
+
+    def write(self, data: bytes) -> int:  # type: ignore[override]
+        """Send `data` to the client, in chunks of at most `CHUNK_SIZE` bytes."""
+        data = bytes(data)
+        for start in range(0, len(data), CHUNK_SIZE):
+            if self._connection is None:
+                break
+            try:
+                send_frame(
+                    self._connection, self._kind, data[start : start + CHUNK_SIZE]
+                )
+            except OSError:  # e.g. the client was interrupted.
+                self._connection = None
+        return len(data)
+
+
+def _run_command(
+    arguments: list[str],
+    cwd: str,
+    environment: dict[str, str],
+    stdin: bytes,
+    connection: socket.socket,
+) -> int:
+    """
+    Run `pbip-tools` with `arguments` in a worker, as if in a process of its own.
+
+    Parameters
+    ----------
+    arguments : list of str
+        The command-line arguments, e.g. `["clean", "-"]`.
+    cwd : str
+        The working directory of the client, which relative paths are relative to.
+    environment : dict of str to str
+        The `PBIP_TOOLS_*` environment variables of the client.
+    stdin : bytes
+        Everything that the client read from its stdin.
+    connection : socket.socket
+        The connection to the client, to send what the command writes to stdout and
+        stderr to, as it is written. It is closed (in the worker) once it's done.
+
+    Returns
+    -------
+    int
+        The exit code of the command.
+    """
+    from pbip_tools.cli import main  # The CLI imports this module.
+    from pbip_tools.memo import nested_json_memo
+
+    saved = sys.argv, sys.stdin, sys.stdout, sys.stderr, os.getcwd()  # noqa: PTH109
+    saved_environment = {
+        name: value
+        for name, value in os.environ.items()
+        if name.startswith("PBIP_TOOLS_")
+    }
+    sys.argv = ["pbip-tools", *arguments]
+    sys.stdin = io.TextIOWrapper(io.BytesIO(stdin), encoding="UTF-8")
+    sys.stdout = io.TextIOWrapper(
+        io.BufferedWriter(_FrameWriter(connection, b"o"), CHUNK_SIZE),
+        encoding="UTF-8",
+    )
+    sys.stderr = io.TextIOWrapper(
+        io.BufferedWriter(_FrameWriter(connection, b"e"), CHUNK_SIZE),
+        encoding="UTF-8",
+        line_buffering=True,
+    )
+    nested_json_memo.clear()
+    try:
+        os.chdir(cwd)
+        for name in saved_environment:
+            del os.environ[name]
+        os.environ.update(environment)
+        # Changing the filters clears the record of the warnings that were shown, so
+        # the command shows them even if an earlier command in this worker did.
+        with warnings.catch_warnings():
+            warnings.simplefilter("default", UserWarning)
+            try:
+                code = main()
+            except SystemExit as e:  # e.g. from `argparse`.
+                code = _exit_code(e.code)
+            except Exception:  # noqa: BLE001 (Reported like the interpreter reports it.)
+                traceback.print_exc()
+                code = 1
+        sys.stdout.flush()
+        sys.stderr.flush()
+        return code
+    finally:
+        connection.close()
+        sys.argv, sys.stdin, sys.stdout, sys.stderr, cwd = saved
+        os.chdir(cwd)
+        for name in environment:
+            os.environ.pop(name, None)
+        os.environ.update(saved_environment)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    """Runs the command that a client sends in a worker, which sends back its output."""
+
+    server: "_Server"
+
+    def handle(self) -> None:
+        """Read the command of a client, run it, and send back its output."""
+        arguments: list[str] = []
+        cwd = ""
+        environment: dict[str, str] = {}
+        stdin = bytearray()
+        while (frame := read_frame(self.rfile)) is not None:
+            kind, payload = frame
+            if kind == b"c":
+                cwd = os.fsdecode(payload)
+            elif kind == b"a":
+                arguments.append(os.fsdecode(payload))
+            elif kind == b"v":
+                name, _, value = os.fsdecode(payload).partition("=")
+                environment[name] = value
+            elif kind == b"i" and payload:
+                stdin += payload
+            elif kind == b"i":  # The end of stdin, and of the command.
+                break
+        else:
+            return  # The client went away (or just checked that we're listening).
+
+        # The worker sends the output itself, and the exit code is sent once it's done.
+        future = self.server.executor.submit(
+            _run_command, arguments, cwd, environment, bytes(stdin), self.request
+        )
+        del stdin
+        try:
+            code = future.result()
+        except BrokenProcessPool:
+            # A worker was killed, so no more commands can be run.
+            send_frame(self.request, b"e", b"pbip-tools daemon stopped unexpectedly.\n")
+            code = 1
+            self.server.shutdown()
+        send_frame(self.request, b"x", str(code).encode())
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Serves each client on a thread of its own, which waits for a worker."""
+
+    daemon_threads = True
+
+    def __init__(self, path: str, executor: ProcessPoolExecutor) -> None:
+        self.executor = executor
+        # Only the user who started the daemon may connect to it.
+        umask = os.umask(0o177)
+        try:
+            super().__init__(path, _Handler)
+        finally:
+            os.umask(umask)
+
+
+def _remove_stale_socket(path: str) -> None:
+    """
+    Remove the socket at `path`, if a daemon that was killed left it behind.
+
+    Raises
+    ------
+    FileExistsError
+        If a daemon is listening on `path`.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(path)
+        except FileNotFoundError:
+            return
+        except ConnectionRefusedError:
+            os.unlink(path)  # noqa: PTH108
+            return
+    msg = f"A daemon is already listening on {path}."
+    raise FileExistsError(msg)
+
+
+def serve(path: str, workers: int | None = None) -> int:
+    """
+    Run commands from `pbip-tools-client` until interrupted, e.g. with Ctrl+C.
+
+    Parameters
+    ----------
+    path : str
+        The path of the Unix domain socket to listen on.
+    workers : int, optional
+        The number of worker processes, which defaults to the number of CPU cores.
+
+    Returns
+    -------
+    int
+        0, once the daemon was interrupted.
+
+    Raises
+    ------
+    FileExistsError
+        If a daemon is already listening on `path`.
+    """
+    _remove_stale_socket(path)
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(workers, initializer=_start_worker) as executor:
+        # Start every worker before the first client connects, and before any thread
+        # is started (which `fork` doesn't go well with).
+        wait([executor.submit(os.getpid) for _ in range(workers)])
+        signal.signal(signal.SIGTERM, signal.default_int_handler)
+        with _Server(path, executor) as server:
+            print(f"Listening on {path}", file=sys.stderr, flush=True)
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+            finally:
+                os.unlink(path)  # noqa: PTH108
+    return 0
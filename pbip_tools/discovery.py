@@ -0,0 +1,422 @@
+"""
+Find the files to filter in a Power BI project, in a single pass.
+
+The CLI accepts filenames and glob patterns, and also `.pbip` files and directories.
+For the latter, `find_files` walks the project (or directory) once with `os.scandir`,
+and picks out the JSON artifacts by name: `report.json`, `model.bim`, the `.pbip`,
+`.pbir`, `.pbism` and `.platform` files, and any other `*.json` file. Everything in
+`SKIPPED_DIRECTORIES`, i.e. images, themes and custom visuals, is left alone. Every file
+is found once, even when several arguments match it.
+
+With `--changed-since` and `--staged`, git lists the files that changed instead, and
+`filter_files` keeps those that the arguments would find, without walking or globbing.
+
+Attributes
+----------
+SKIPPED_DIRECTORIES : frozenset of str
+    The directories that are never walked into.
+SHARDS_SUFFIX : str
+    The suffix of the directories that `pbip-tools clean --explode` writes a report
+    to, one file per page and per visual (see `pbip_tools.explode`). They are never
+    walked into either, since their files are only read and written as a whole.
+PLAIN_JSON_SUFFIXES : frozenset of str
+    The suffixes (or names) of the files that Power BI writes as plain JSON, without
+    nested JSON strings.
+"""
+
+import fnmatch
+import glob
+import json
+import os
+import subprocess
+from collections.abc import Callable, Iterable, Iterator
+from itertools import chain
+from pathlib import Path
+
+SKIPPED_DIRECTORIES = frozenset({".git", "CustomVisuals", "StaticResources"})
+SHARDS_SUFFIX = ".shards"
+
+PLAIN_JSON_SUFFIXES = frozenset({".pbip", ".pbir", ".pbism", ".platform"})
+_JSON_SUFFIXES = PLAIN_JSON_SUFFIXES | {".json", ".bim"}
+
+
+def _suffix(name: str) -> str:
+    """
+    Return the suffix of a file name, counting the whole name of a dotfile.
+
+    Examples
+    --------
+    >>> _suffix("model.bim"), _suffix(".platform"), _suffix("LICENSE")
+    ('.bim', '.platform', '')
+    """
+    if name.startswith(".") and name.count(".") == 1:
+        return name
+    return Path(name).suffix
+
+
+def is_plain_json(file: str | os.PathLike[str]) -> bool:
+    """
+    Return whether `file` is an artifact that Power BI writes as plain JSON.
+
+    These files have no nested JSON strings to clean, and some have keys that
+    `smudge_json` would turn into JSON strings (e.g. the `config` of `.platform` files),
+    so the CLI only formats them.
+
+    Examples
+    --------
+    >>> is_plain_json("Sales.Report/.platform"), is_plain_json("Sales.pbip")
+    (True, True)
+    >>> is_plain_json("Sales.Report/report.json")
+    False
+    """
+    return _suffix(Path(file).name) in PLAIN_JSON_SUFFIXES
+
+
+def is_skipped_directory(name: str) -> bool:
+    """
+    Return whether the directory `name` is never walked into.
+
+    Examples
+    --------
+    >>> is_skipped_directory("StaticResources"), is_skipped_directory("report.shards")
+    (True, True)
+    """
+    return name in SKIPPED_DIRECTORIES or name.endswith(SHARDS_SUFFIX)
+
+
+def is_json_artifact(file: str | os.PathLike[str]) -> bool:
+    """
+    Return whether `file` is a JSON artifact that `walk_directory` would find.
+
+    Examples
+    --------
+    >>> is_json_artifact("Sales.Report/report.json"), is_json_artifact("a.png")
+    (True, False)
+    >>> is_json_artifact("Sales.Report/StaticResources/theme.json")
+    False
+    """
+    path = Path(file)
+    return _suffix(path.name) in _JSON_SUFFIXES and not any(
+        map(is_skipped_directory, path.parent.parts)
+    )
+
+
+def walk_directory(directory: str | os.PathLike[str]) -> Iterator[str]:
+    """
+    Yield the JSON artifacts in `directory` and below, in sorted order.
+
+    Parameters
+    ----------
+    directory : str or os.PathLike
+        The directory to walk.
+
+    Yields
+    ------
+    str
+        The path of each JSON artifact, skipping `SKIPPED_DIRECTORIES`, shards
+        directories and symbolic links to directories.
+    """
+    stack = [os.fspath(directory)]
+    while stack:
+        with os.scandir(stack.pop()) as scanned:
+            entries = sorted(scanned, key=lambda entry: entry.name)
+        subdirectories = []
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                if not is_skipped_directory(entry.name):
+                    subdirectories.append(entry.path)
+            elif _suffix(entry.name) in _JSON_SUFFIXES:
+                yield entry.path
+        # Walk the subdirectories in order, after the files of their parent.
+        stack.extend(reversed(subdirectories))
+
+
+def _project_directories(pbip_file: Path) -> list[Path]:
+    """
+    Return the artifact directories of a `.pbip` file, including semantic models.
+
+    The artifacts are listed in the `.pbip` file, and each report refers to its
+    semantic model in its `definition.pbir`. If the `.pbip` file lists no artifacts,
+    the `.Report` and `.SemanticModel` directories next to it, of the same name, are
+    returned instead.
+    """
+    project = json.loads(pbip_file.read_text(encoding="UTF-8"))
+    directories = [
+        pbip_file.parent / artifact["path"]
+        for item in project.get("artifacts", [])
+        for artifact in item.values()
+        if isinstance(artifact, dict) and "path" in artifact
+    ] or [pbip_file.with_suffix(suffix) for suffix in [".Report", ".SemanticModel"]]
+
+    for directory in list(directories):
+        definition = directory / "definition.pbir"
+        if definition.is_file():
+            reference = json.loads(definition.read_text(encoding="UTF-8"))
+            by_path = (reference.get("datasetReference") or {}).get("byPath") or {}
+            if "path" in by_path:
+                directories.append(Path(os.path.normpath(directory / by_path["path"])))
+    return [directory for directory in directories if directory.is_dir()]
+
+
+def _expand(file_dir_or_glob: str, *, literal: bool = False) -> Iterator[str]:
+    """
+    Yield the files that a single CLI argument stands for.
+
+    A `literal` argument is never expanded as a glob pattern, and is skipped unless it
+    exists.
+    """
+    path = Path(file_dir_or_glob)
+    if path.suffix == ".pbip" and path.is_file():
+        yield file_dir_or_glob
+        for directory in _project_directories(path):
+            yield from walk_directory(directory)
+    elif path.is_dir():
+        if not path.resolve().name.endswith(SHARDS_SUFFIX):
+            yield from walk_directory(file_dir_or_glob)
+    elif literal:
+        if path.is_file():
+            yield file_dir_or_glob
+    else:
+        for match in glob.glob(file_dir_or_glob, recursive=True):
+            if not match.endswith(SHARDS_SUFFIX):  # See `find_exploded_reports`.
+                yield match
+
+
+def find_files(
+    files_dirs_or_globs: Iterable[str], literal_files: Iterable[str] = ()
+) -> Iterator[str]:
+    """
+    Yield the files to filter for the file, directory and glob arguments of the CLI.
+
+    Parameters
+    ----------
+    files_dirs_or_globs : Iterable[str]
+        Filenames, glob patterns (which are expanded recursively), directories (whose
+        JSON artifacts are all found), and `.pbip` files (whose artifacts, including
+        the semantic model of each report, are all found).
+    literal_files : Iterable[str], default ()
+        Like `files_dirs_or_globs`, but never expanded as glob patterns, e.g. names read
+        from `--files-from`. Those that don't exist are skipped.
+
+    Yields
+    ------
+    str
+        Each file, in the order of the arguments, only the first time that its real
+        path is found.
+    """
+    seen: set[str] = set()
+    arguments = chain(
+        ((argument, False) for argument in files_dirs_or_globs),
+        ((argument, True) for argument in literal_files),
+    )
+    for file_dir_or_glob, literal in arguments:
+        for file in _expand(file_dir_or_glob, literal=literal):
+            real_path = os.path.realpath(file)
+            if real_path not in seen:
+                seen.add(real_path)
+                yield file
+
+
+def _reports_in(file_or_directory: str) -> Iterator[str]:
+    """Yield the report file of each shards directory at or below the argument."""
+    root = os.path.normpath(file_or_directory)
+    if root.endswith(SHARDS_SUFFIX) and os.path.isdir(root):  # noqa: PTH112
+        yield root.removesuffix(SHARDS_SUFFIX) + ".json"
+        return
+    for directory, subdirectories, _ in os.walk(root):
+        subdirectories.sort()
+        for name in subdirectories:
+            if name.endswith(SHARDS_SUFFIX):
+                report = name.removesuffix(SHARDS_SUFFIX) + ".json"
+                yield os.path.join(directory, report)  # noqa: PTH118
+        subdirectories[:] = [
+            name for name in subdirectories if not is_skipped_directory(name)
+        ]
+
+
+def find_exploded_reports(files_dirs_or_globs: Iterable[str]) -> Iterator[str]:
+    """
+    Yield the report files of the shards directories that the arguments find.
+
+    Unlike `find_files`, this finds reports that were exploded into shards directories
+    (e.g. `report.json` into `report.shards`), whether or not the report file itself
+    exists, e.g. in a fresh clone of a repository that only tracks the shards.
+
+    Parameters
+    ----------
+    files_dirs_or_globs : Iterable[str]
+        Shards directories, directories and `.pbip` files to search for them, and glob
+        patterns (e.g. `**/*.shards`), as for `find_files`.
+
+    Yields
+    ------
+    str
+        The path of each report file, next to its shards directory.
+    """
+    for file_dir_or_glob in files_dirs_or_globs:
+        path = Path(file_dir_or_glob)
+        if path.suffix == ".pbip" and path.is_file():
+            roots = [str(directory) for directory in _project_directories(path)]
+        elif path.is_dir():
+            roots = [file_dir_or_glob]
+        else:
+            roots = glob.glob(file_dir_or_glob, recursive=True)
+        for root in roots:
+            yield from _reports_in(root)
+
+
+def _git(*arguments: str, cwd: Path | None = None) -> str:
+    """
+    Return the output of running git with `arguments`.
+
+    Raises
+    ------
+    OSError
+        If git can't be run.
+    subprocess.CalledProcessError
+        If git fails, e.g. outside of a git repository. Its `stderr` says why.
+    """
+    return subprocess.run(  # noqa: S603
+        ["git", *arguments],  # noqa: S607 (git is wherever the user's `PATH` has it.)
+        cwd=cwd,
+        capture_output=True,
+        text=True,
+        encoding="UTF-8",
+        check=True,
+    ).stdout
+
+
+def git_changed_files(*, since: str | None = None, staged: bool = False) -> list[str]:
+    """
+    Ask the git repository of the working directory which files changed.
+
+    Parameters
+    ----------
+    since : str, optional
+        A git revision (e.g. `origin/main`). The files that differ between it and the
+        working tree are included, along with untracked files that aren't ignored.
+    staged : bool, default False
+        Whether to include the files whose changes are staged, i.e. in the index.
+
+    Returns
+    -------
+    list of str
+        The absolute paths of the files, sorted. Deleted files are left out.
+
+    Raises
+    ------
+    OSError
+        If git can't be run.
+    subprocess.CalledProcessError
+        If git fails, e.g. outside of a git repository or for an unknown revision.
+    """
+    top_level = Path(_git("rev-parse", "--show-toplevel").rstrip("\n"))
+    # Paths are relative to the top level, in which git is run, and NUL-terminated.
+    diff = ["diff", "--name-only", "-z", "--no-renames", "--diff-filter=d"]
+    outputs = []
+    if since is not None:
+        outputs.append(_git(*diff, "--end-of-options", since, "--", cwd=top_level))
+        untracked = ["ls-files", "-z", "--others", "--exclude-standard"]
+        outputs.append(_git(*untracked, cwd=top_level))
+    if staged:
+        outputs.append(_git(*diff, "--cached", cwd=top_level))
+    names = {name for output in outputs for name in output.split("\0") if name}
+    return sorted(os.path.normpath(top_level / name) for name in names)
+
+
+def _glob_matches(parts: list[str], pattern: list[str]) -> bool:
+    """
+    Return whether the path `parts` match the `pattern` parts, like `glob.glob` would.
+
+    As for `glob.glob(pattern, recursive=True)`, `**` matches any number of
+    directories, and wildcards don't match names that start with a dot.
+
+    Examples
+    --------
+    >>> _glob_matches(["a", "b", "c.json"], ["**", "*.json"])
+    True
+    >>> _glob_matches(["a", ".git", "c.json"], ["a", "**", "*.json"])
+    False
+    """
+    if not pattern:
+        return not parts
+    head, *rest = pattern
+    if head == "**":
+        for skipped in range(len(parts) + 1):
+            if _glob_matches(parts[skipped:], rest):
+                return True
+            if skipped < len(parts) and parts[skipped].startswith("."):
+                return False
+        return False
+    return (
+        bool(parts)
+        and (head.startswith(".") or not parts[0].startswith("."))
+        and fnmatch.fnmatch(parts[0], head)
+        and _glob_matches(parts[1:], rest)
+    )
+
+
+def _is_below(file: str, directory: str) -> bool:
+    """Return whether `file` is below `directory`, both absolute and normalized."""
+    return file.startswith(directory.rstrip(os.sep) + os.sep)
+
+
+def _matcher(file_dir_or_glob: str, *, literal: bool = False) -> Callable[[str], bool]:
+    """Return a test of whether an absolute path is one that the argument stands for."""
+    path = Path(file_dir_or_glob)
+    if (path.suffix == ".pbip" and path.is_file()) or path.is_dir():
+        pbip_file = os.path.realpath(path) if path.is_file() else None
+        directories = [
+            os.path.realpath(directory)
+            for directory in (_project_directories(path) if pbip_file else [path])
+        ]
+        return lambda file: file == pbip_file or (
+            is_json_artifact(file)
+            and any(_is_below(file, directory) for directory in directories)
+        )
+    if literal:
+        real_path = os.path.realpath(path)
+        return lambda file: file == real_path
+
+    # Relative to the working directory, which may contain wildcard characters.
+    pattern = Path(glob.escape(str(Path.cwd())), file_dir_or_glob)
+    pattern_parts = list(Path(os.path.normpath(pattern)).parts)
+    return lambda file: _glob_matches(list(Path(file).parts), pattern_parts)
+
+
+def filter_files(
+    files: Iterable[str],
+    files_dirs_or_globs: Iterable[str],
+    literal_files: Iterable[str] = (),
+) -> Iterator[str]:
+    """
+    Yield those of `files` that `find_files(files_dirs_or_globs)` would find.
+
+    Unlike `find_files`, this never walks a directory or expands a glob pattern, so it
+    takes time in proportion to the number of `files`, e.g. those that git says changed.
+
+    Parameters
+    ----------
+    files : Iterable[str]
+        Absolute, normalized paths, e.g. from `git_changed_files`.
+    files_dirs_or_globs : Iterable[str]
+        The file, directory, `.pbip` and glob arguments of the CLI.
+    literal_files : Iterable[str], default ()
+        Files, directories and `.pbip` files that aren't glob patterns, as for
+        `find_files`.
+
+    Yields
+    ------
+    str
+        Each of `files` that is matched by any argument, relative to the working
+        directory (unless it is on another drive).
+    """
+    matchers = [_matcher(argument) for argument in files_dirs_or_globs]
+    matchers += [_matcher(argument, literal=True) for argument in literal_files]
+    for file in files:
+        real_path = os.path.realpath(file)
+        if any(matches(real_path) or matches(file) for matches in matchers):
+            try:
+                yield os.path.relpath(file)
+            except ValueError:  # On Windows, from another drive.
+                yield file
@@ -0,0 +1,392 @@
+"""
+Clean a `report.json` into one file per page and per visual, and smudge it back.
+
+A report is a single file, often of many megabytes, so every change to a visual shows
+up as a change to the same huge file, and two people can hardly work on different
+pages of a report without a merge conflict. `pbip-tools clean --explode` writes the
+cleaned report to a shards directory next to it instead, e.g. `report.shards` for
+`report.json`:
+
+- `index.json`, the order of the pages and of the visuals of each page,
+- `report.json`, the report without its pages,
+- `pages/<page>/page.json`, each page without its visual containers, and
+- `pages/<page>/visuals/<visual>.json`, each visual container.
+
+Pages and visuals are named after their `name` in Power BI, so they keep their files
+when they are reordered. The report file itself is left as it is, for Power BI to
+open. Each shard is cleaned just like the same part of the whole report would be, and
+only the shards whose contents changed are rewritten, so an edit to one visual
+rewrites one small file. The shards of pages and visuals that were removed are
+deleted.
+
+`pbip-tools smudge --implode` puts the report back together from its shards, and
+smudges it. The result is byte for byte what smudging the whole cleaned report gives.
+
+Attributes
+----------
+INDEX_VERSION : int
+    The version of the layout of `index.json`, which is written to it, and which
+    imploding a report checks.
+"""
+
+import json
+import os
+import re
+from collections.abc import Callable, Iterable
+from functools import partial
+from pathlib import Path
+from typing import Any
+
+from pbip_tools.clean.clean_JSON import _clean_json_data
+from pbip_tools.discovery import SHARDS_SUFFIX
+from pbip_tools.interning import loads_interned
+from pbip_tools.json_encoder import dump_indented
+from pbip_tools.json_utils import FileStatus, _FileRewriter, contains_line_comments
+from pbip_tools.stats import FileStats, PhaseTimer, TimedWriter
+from pbip_tools.type_aliases import JSONType, PathLike, SupportsWrite
+
+INDEX_VERSION = 1
+
+# The characters that aren't safe in file names on every platform, and a leading dot.
+_UNSAFE_CHARACTERS = re.compile(r"[^\w.-]|^\.", flags=re.ASCII)
+
+
+def shards_directory(file: PathLike) -> Path:
+    """
+    Return the shards directory of the report `file`.
+
+    Examples
+    --------
+    >>> shards_directory("project/My.Report/report.json").as_posix()
+    'project/My.Report/report.shards'
+    """
+    path = Path(file)
+    return path.with_name(path.stem + SHARDS_SUFFIX)
+
+
+def _visual_name(visual: JSONType) -> str | None:
+    """
+    Return the name of a visual container, from its de-nested `config`, if it has one.
+
+    Examples
+    --------
+    >>> _visual_name({"config": {"name": "a1b2"}}), _visual_name({"x": 1})
+    ('a1b2', None)
+    """
+    config = visual.get("config") if isinstance(visual, dict) else None
+    if isinstance(config, dict) and isinstance(name := config.get("name"), str):
+        return name
+    return None
+
+
+def _file_names(names: Iterable[str | None], fallback: str) -> list[str]:
+    """
+    Return a distinct, safe file name for each of `names`, in the same order.
+
+    Unsafe characters are replaced by underscores, missing names are numbered after
+    `fallback`, and names that are the same but for their case are numbered too, since
+    they would be the same file on Windows and macOS.
+
+    Examples
+    --------
+    >>> _file_names(["Sales", "sales", None, "a/b", ".."], "page")
+    ['Sales', 'sales-2', 'page3', 'a_b', '_.']
+    """
+    file_names: list[str] = []
+    seen: set[str] = set()
+    for number, name in enumerate(names, start=1):
+        file_name = _UNSAFE_CHARACTERS.sub("_", name) if name else f"{fallback}{number}"
+        unique_name, copy = file_name, 1
+        while unique_name.casefold() in seen:
+            copy += 1
+            unique_name = f"{file_name}-{copy}"
+        seen.add(unique_name.casefold())
+        file_names.append(unique_name)
+    return file_names
+
+
+def _is_report(json_data: JSONType) -> bool:
+    """Return whether `json_data` can be exploded, i.e. has a list of pages."""
+    return isinstance(json_data, dict) and isinstance(json_data.get("sections"), list)
+
+
+def _with_parsed_config(
+    visual: JSONType, parse_string: Callable[[str], JSONType] | None
+) -> JSONType:
+    """Return `visual` with its `config` string de-nested by `parse_string`, if any."""
+    if (
+        parse_string is None
+        or not isinstance(visual, dict)
+        or not isinstance(config := visual.get("config"), str)
+    ):
+        return visual
+    return {**visual, "config": parse_string(config)}
+
+
+def _shards(
+    json_data: dict[str, Any], parse_string: Callable[[str], JSONType] | None
+) -> Iterable[tuple[Path, Any]]:
+    """
+    Yield the relative path and the data of each shard of a report.
+
+    The shards share their values with `json_data`, which is left as it is. The
+    `config` of each visual is de-nested with `parse_string` up front, for its name,
+    which is the same as de-nesting it as it is serialized.
+    """
+    pages: list[dict[str, Any]] = []
+    sections: list[Any] = json_data["sections"]
+    page_names = _file_names(
+        (
+            section.get("name") if isinstance(section, dict) else None
+            for section in sections
+        ),
+        "page",
+    )
+    for section, page_name in zip(sections, page_names, strict=True):
+        directory = Path("pages", page_name)
+        visuals = section.get("visualContainers") if isinstance(section, dict) else None
+        if not isinstance(visuals, list):
+            pages.append({"directory": page_name, "visuals": None})
+            yield directory / "page.json", section
+            continue
+        visuals = [_with_parsed_config(visual, parse_string) for visual in visuals]
+        visual_names = [
+            f"{name}.json" for name in _file_names(map(_visual_name, visuals), "visual")
+        ]
+        pages.append({"directory": page_name, "visuals": visual_names})
+        page = {
+            key: value for key, value in section.items() if key != "visualContainers"
+        }
+        yield directory / "page.json", page
+        for visual, visual_name in zip(visuals, visual_names, strict=True):
+            yield directory / "visuals" / visual_name, visual
+
+    report = {key: value for key, value in json_data.items() if key != "sections"}
+    yield Path("report.json"), report
+    yield Path("index.json"), {"pages": pages, "version": INDEX_VERSION}
+
+
+def _save_shard(
+    file: Path,
+    dump: Callable[[SupportsWrite[str]], None],
+    stats: FileStats | None,
+) -> FileStatus:
+    """Write a shard with `dump`, rewriting `file` only if its contents changed."""
+    try:
+        current_contents = file.read_bytes()
+        created = False
+    except FileNotFoundError:
+        # `_FileRewriter` keeps the permissions of the file it replaces.
+        file.parent.mkdir(parents=True, exist_ok=True)
+        file.touch()
+        current_contents, created = b"", True
+    rewriter = _FileRewriter(file, current_contents)
+    writer = TimedWriter(rewriter) if stats else None
+    try:
+        dump(writer or rewriter)
+        status = rewriter.commit()
+    except BaseException:
+        rewriter.discard()
+        if created:
+            file.unlink(missing_ok=True)
+        raise
+    if stats and writer:
+        writer.record(stats)
+    return FileStatus.REWRITTEN if created else status
+
+
+def _remove_stale_shards(pages_directory: Path, shards: set[Path]) -> bool:
+    """
+    Remove the JSON files below `pages_directory` that aren't among `shards`.
+
+    Directories that are left empty are removed too. Returns whether anything was.
+    """
+    removed = False
+    for directory, _, files in os.walk(pages_directory, topdown=False):
+        for name in files:
+            file = Path(directory, name)
+            if name.endswith(".json") and file not in shards:
+                file.unlink()
+                removed = True
+        if not os.listdir(directory):
+            Path(directory).rmdir()
+            removed = True
+    return removed
+
+
+def explode_json_file(  # noqa: PLR0913
+    file: PathLike,
+    save_file: Callable[..., FileStatus],
+    stats: FileStats | None = None,
+    *,
+    indent: int = 2,
+    sort_lists: bool = False,
+    schema_aware: bool = False,
+    low_memory: bool = False,
+) -> FileStatus:
+    """
+    Clean the report `file` into its shards directory, leaving `file` as it is.
+
+    Parameters
+    ----------
+    file : PathLike
+        The `report.json` to explode.
+    save_file : Callable[..., FileStatus]
+        What to do with a file that isn't a report after all (i.e. has no list of
+        `sections`), e.g. `_process_and_save_json_file` with `clean_json_to`. It is
+        passed `file` and `stats`.
+    stats : FileStats, optional
+        Statistics to add the sizes and phase timings of the file to.
+    indent : int, default 2
+        The number of spaces to indent each nesting level with.
+    sort_lists : bool, default False
+        Whether to sort every list, as in `clean_json`. This also sorts the pages and
+        the visuals of each page.
+    schema_aware : bool, default False
+        Whether to only de-nest the strings at known key paths, as in `clean_json`.
+    low_memory : bool, default False
+        Whether to parse the file and its nested JSON strings with `loads_interned`, as
+        in `clean_json`.
+
+    Returns
+    -------
+    FileStatus
+        Whether any shard was written or removed, or the file was skipped because it
+        contains JSON5-style comments.
+
+    Raises
+    ------
+    ValueError
+        Raised when there is an issue loading or processing the file.
+    """
+    try:
+        timer = PhaseTimer(stats)
+        json_from_file_as_str = Path(file).read_text(encoding="UTF-8")
+        timer.lap("read")
+        if contains_line_comments(json_from_file_as_str):
+            return FileStatus.SKIPPED
+        loads = loads_interned if low_memory else json.loads
+        json_from_file = loads(json_from_file_as_str, parse_constant=str)
+        if stats:
+            stats.bytes_in = len(json_from_file_as_str.encode("UTF-8"))
+        del json_from_file_as_str
+        timer.lap("parse")
+        if not _is_report(json_from_file):
+            return save_file(file, stats=stats)
+
+        json_data, parse_string = _clean_json_data(
+            json_from_file,
+            sort_lists=sort_lists,
+            schema_aware=schema_aware,
+            low_memory=low_memory,
+        )
+        directory = shards_directory(file)
+        shards = set()
+        statuses = []
+        for relative_path, shard in _shards(json_data, parse_string):  # type: ignore[arg-type]
+            shard_file = directory / relative_path
+            shards.add(shard_file)
+            # The index is written by this module, and has no nested JSON strings.
+            dump = partial(
+                dump_indented,
+                shard,
+                indent=indent,
+                parse_string=None
+                if relative_path.name == "index.json"
+                else parse_string,
+            )
+            statuses.append(_save_shard(shard_file, dump, stats))
+        timer.lap("serialize")
+        removed = _remove_stale_shards(directory / "pages", shards)
+        timer.lap("write")
+    except Exception as e:
+        msg = f"Error processing {file}: {e}"
+        raise ValueError(msg) from e
+    if removed or FileStatus.REWRITTEN in statuses:
+        return FileStatus.REWRITTEN
+    return FileStatus.UNCHANGED
+
+
+def _load_shard(file: Path) -> Any:  # noqa: ANN401
+    """Load a shard, keeping `NaN` and `Infinity` as strings, as files are."""
+    return json.loads(file.read_text(encoding="UTF-8"), parse_constant=str)
+
+
+def _checked_name(name: JSONType) -> str:
+    """Return `name` from the index, unless it isn't a file name in its directory."""
+    if not isinstance(name, str) or Path(name).name != name or name in {"", ".", ".."}:
+        msg = f"Invalid name in index.json: {name!r}"
+        raise ValueError(msg)
+    return name
+
+
+def _assemble(directory: Path) -> JSONType:
+    """Return the report that was exploded into `directory`, as it was cleaned."""
+    index = _load_shard(directory / "index.json")
+    if not isinstance(index, dict) or index.get("version") != INDEX_VERSION:
+        msg = f"Unsupported index.json in {directory}."
+        raise ValueError(msg)
+    sections = []
+    for page in index["pages"]:
+        page_directory = directory / "pages" / _checked_name(page["directory"])
+        section = _load_shard(page_directory / "page.json")
+        if page["visuals"] is not None:
+            section["visualContainers"] = [
+                _load_shard(page_directory / "visuals" / _checked_name(name))
+                for name in page["visuals"]
+            ]
+        sections.append(section)
+    report = _load_shard(directory / "report.json")
+    report["sections"] = sections
+    return report
+
+
+def implode_json_file(
+    file: PathLike,
+    save_file: Callable[..., FileStatus],
+    stats: FileStats | None = None,
+    *,
+    process_func: Callable[[JSONType, SupportsWrite[str]], None],
+) -> FileStatus:
+    """
+    Put the report `file` back together from its shards directory, and smudge it.
+
+    `file` is only rewritten if its contents changed, and it is created if it doesn't
+    exist yet.
+
+    Parameters
+    ----------
+    file : PathLike
+        The `report.json` to implode.
+    save_file : Callable[..., FileStatus]
+        What to do with `file` if it has no shards directory, e.g.
+        `_process_and_save_json_file` with `smudge_json_to`. It is passed `file` and
+        `stats`.
+    stats : FileStats, optional
+        Statistics to add the sizes and phase timings of the file to.
+    process_func : Callable[[JSONType, SupportsWrite[str]], None]
+        The function that writes the report, e.g. `smudge_json_to`.
+
+    Returns
+    -------
+    FileStatus
+        Whether the file was rewritten or already up to date.
+
+    Raises
+    ------
+    ValueError
+        Raised when there is an issue loading the shards or processing the report.
+    """
+    directory = shards_directory(file)
+    if not directory.is_dir():
+        return save_file(file, stats=stats)
+    try:
+        timer = PhaseTimer(stats)
+        json_data = _assemble(directory)
+        timer.lap("parse")
+        status = _save_shard(Path(file), partial(process_func, json_data), stats)
+        timer.lap("serialize")
+    except Exception as e:
+        msg = f"Error processing {file}: {e}"
+        raise ValueError(msg) from e
+    return status
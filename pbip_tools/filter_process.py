@@ -0,0 +1,266 @@
+"""
+Git long-running filter process for the clean and smudge filters.
+
+Implement the filter side of git's `filter.<driver>.process` protocol, so that a single
+resident Python process cleans and smudges every file git hands it, instead of git
+starting a new interpreter per file. See "Long Running Filter Process" in
+`gitattributes(5)` for the specification of the pkt-line protocol.
+
+Configure git to use it with, e.g.::
+
+    git config filter.pbip.process "pbip-tools filter-process"
+    git config filter.pbip.required true
+
+and mark the relevant files in `.gitattributes` with `*.json filter=pbip`.
+"""
+
+import json
+import sys
+from collections.abc import Callable, Mapping
+from typing import BinaryIO
+
+from pbip_tools.json_utils import contains_line_comments
+from pbip_tools.type_aliases import JSONType, SupportsWrite
+
+# A pkt-line is a 4-byte hex length header (which counts itself) followed by the data.
+PKT_LINE_HEADER_SIZE = 4
+PKT_LINE_MAX_DATA_SIZE = 65520 - PKT_LINE_HEADER_SIZE
+FLUSH_PKT = b"0000"
+
+
+def _read_pkt_line(stream: BinaryIO) -> bytes | None:
+    """
+    Read a single pkt-line from `stream`.
+
+    Parameters
+    ----------
+    stream : BinaryIO
+        The binary stream git writes to (i.e. our stdin).
+
+    Returns
+    -------
+    bytes or None
+        The payload of the pkt-line, or `None` for a flush packet.
+
+    Raises
+    ------
+    EOFError
+        If git closed the stream before a new pkt-line started.
+    ValueError
+        If the stream ends in the middle of a pkt-line or the header is malformed.
+    """
+    header = stream.read(PKT_LINE_HEADER_SIZE)
+    if not header:
+        raise EOFError
+    if len(header) != PKT_LINE_HEADER_SIZE:
+        msg = f"Truncated pkt-line header: {header!r}"
+        raise ValueError(msg)
+
+    try:
+        length = int(header, 16)
+    except ValueError as e:
+        msg = f"Invalid pkt-line header: {header!r}"
+        raise ValueError(msg) from e
+
+    if length == 0:
+        return None
+    if length <= PKT_LINE_HEADER_SIZE:
+        msg = f"Invalid pkt-line length: {length}"
+        raise ValueError(msg)
+
+    data = stream.read(length - PKT_LINE_HEADER_SIZE)
+    if len(data) != length - PKT_LINE_HEADER_SIZE:
+        msg = "Unexpected end of stream inside a pkt-line."
+        raise ValueError(msg)
+    return data
+
+
+def _read_pkt_text_list(stream: BinaryIO) -> list[str]:
+    """Read text pkt-lines until the next flush packet, without trailing newlines."""
+    lines = []
+    while (data := _read_pkt_line(stream)) is not None:
+        lines.append(data.decode("UTF-8").removesuffix("\n"))
+    return lines
+
+
+def _read_pkt_content(stream: BinaryIO) -> bytes:
+    """Read binary pkt-lines until the next flush packet and join them."""
+    chunks = []
+    while (data := _read_pkt_line(stream)) is not None:
+        chunks.append(data)
+    return b"".join(chunks)
+
+
+def _write_pkt_line(stream: BinaryIO, data: bytes | memoryview) -> None:
+    """Write `data` as a single pkt-line."""
+    stream.write(b"%04x" % (len(data) + PKT_LINE_HEADER_SIZE))
+    stream.write(data)
+
+
+def _write_pkt_text_list(stream: BinaryIO, lines: list[str]) -> None:
+    """Write each of `lines` as a text pkt-line, followed by a flush packet."""
+    for line in lines:
+        _write_pkt_line(stream, f"{line}\n".encode())
+    stream.write(FLUSH_PKT)
+
+
+def _write_pkt_content(stream: BinaryIO, content: bytes) -> None:
+    """Write `content` split over as many pkt-lines as needed, then a flush packet."""
+    for start in range(0, len(content), PKT_LINE_MAX_DATA_SIZE):
+        _write_pkt_line(stream, content[start : start + PKT_LINE_MAX_DATA_SIZE])
+    stream.write(FLUSH_PKT)
+
+
+def _handshake(
+    stdin: BinaryIO, stdout: BinaryIO, supported_capabilities: list[str]
+) -> None:
+    """
+    Perform the version and capability negotiation with git.
+
+    Parameters
+    ----------
+    stdin, stdout : BinaryIO
+        The binary streams connected to git.
+    supported_capabilities : list of str
+        The capabilities this filter process offers, e.g. `["clean", "smudge"]`.
+
+    Raises
+    ------
+    ValueError
+        If git does not speak version 2 of the protocol.
+    """
+    welcome = _read_pkt_text_list(stdin)
+    if welcome[:1] != ["git-filter-client"] or "version=2" not in welcome[1:]:
+        msg = f"Unsupported filter protocol handshake: {welcome}"
+        raise ValueError(msg)
+    _write_pkt_text_list(stdout, ["git-filter-server", "version=2"])
+    stdout.flush()
+
+    offered = {
+        line.removeprefix("capability=")
+        for line in _read_pkt_text_list(stdin)
+        if line.startswith("capability=")
+    }
+    _write_pkt_text_list(
+        stdout,
+        [
+            f"capability={capability}"
+            for capability in supported_capabilities
+            if capability in offered
+        ],
+    )
+    stdout.flush()
+
+
+class _PktContentWriter:
+    """
+    Text stream that sends everything written to it to git as content pkt-lines.
+
+    The text is encoded as UTF-8 and sent in full pkt-lines as soon as there is enough
+    of it, so the filter output is never held in memory as a whole.
+    """
+
+    def __init__(self, stream: BinaryIO) -> None:
+        self._stream = stream
+        self._buffer = bytearray()
+
+    def write(self, text: str) -> int:
+        """Buffer `text` and send any full pkt-lines."""
+        self._buffer += text.encode("UTF-8")
+        if len(self._buffer) >= PKT_LINE_MAX_DATA_SIZE:
+            with memoryview(self._buffer) as view:
+                full_size = len(view) - len(view) % PKT_LINE_MAX_DATA_SIZE
+                for start in range(0, full_size, PKT_LINE_MAX_DATA_SIZE):
+                    _write_pkt_line(
+                        self._stream, view[start : start + PKT_LINE_MAX_DATA_SIZE]
+                    )
+            del self._buffer[:full_size]
+        return len(text)
+
+    def close(self) -> None:
+        """Send the rest of the content, followed by a flush packet."""
+        _write_pkt_content(self._stream, bytes(self._buffer))
+        self._buffer.clear()
+
+
+def run_filter_process(
+    filters: Mapping[str, Callable[[JSONType, SupportsWrite[str]], None]],
+    stdin: BinaryIO | None = None,
+    stdout: BinaryIO | None = None,
+) -> int:
+    """
+    Serve clean and smudge requests from git until git closes the connection.
+
+    Parameters
+    ----------
+    filters : Mapping[str, Callable[[JSONType, SupportsWrite[str]], None]]
+        Maps each git filter command (`"clean"`, `"smudge"`) to the filter function
+        used for it, which writes its output to the given text stream, e.g.
+        `{"clean": clean_json_to, "smudge": smudge_json_to}`.
+    stdin, stdout : BinaryIO, optional
+        The binary streams connected to git. Defaults to the binary buffers of
+        `sys.stdin` and `sys.stdout`.
+
+    Returns
+    -------
+    int
+        Returns 0 once git closes the connection.
+
+    Notes
+    -----
+    Files are loaded like `json-clean` and `json-smudge` load them. Those with
+    JSON5-style comments, which they skip, are sent back unchanged, with a warning on
+    stderr.
+
+    A file that cannot be filtered is answered with `status=error` and the error is
+    reported on stderr. Git then either fails (when `filter.<driver>.required` is set)
+    or uses the unfiltered content, exactly as with a failing single-file filter.
+
+    The output is sent to git while it is being written. Should a filter fail after it
+    started writing, the partial content is followed by `status=error`, as the protocol
+    allows.
+    """
+    stdin = stdin if stdin is not None else sys.stdin.buffer
+    stdout = stdout if stdout is not None else sys.stdout.buffer
+
+    _handshake(stdin, stdout, list(filters))
+
+    while True:
+        try:
+            request = _read_pkt_text_list(stdin)
+        except EOFError:
+            return 0
+        headers = dict(line.partition("=")[::2] for line in request)
+        content = _read_pkt_content(stdin)
+
+        command, pathname = headers.get("command", ""), headers.get("pathname", "")
+        try:
+            filter_function = filters[command]
+            json_str = content.decode("UTF-8")
+            if contains_line_comments(json_str):
+                print(f'Skipping file with comments: "{pathname}"', file=sys.stderr)
+                _write_pkt_text_list(stdout, ["status=success"])
+                _write_pkt_content(stdout, content)
+                _write_pkt_text_list(stdout, [])
+                stdout.flush()
+                continue
+            json_data = json.loads(json_str, parse_constant=str)
+        except Exception as e:  # noqa: BLE001 (report *any* failure back to git)
+            print(f"Error processing {pathname}: {e!r}", file=sys.stderr)
+            _write_pkt_text_list(stdout, ["status=error"])
+            stdout.flush()
+            continue
+        del content, json_str
+
+        _write_pkt_text_list(stdout, ["status=success"])
+        content_writer = _PktContentWriter(stdout)
+        try:
+            filter_function(json_data, content_writer)
+        except Exception as e:  # noqa: BLE001
+            print(f"Error processing {pathname}: {e!r}", file=sys.stderr)
+            content_writer.close()
+            _write_pkt_text_list(stdout, ["status=error"])
+        else:
+            content_writer.close()
+            _write_pkt_text_list(stdout, [])  # An empty list keeps "status=success".
+        stdout.flush()
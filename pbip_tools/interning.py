@@ -0,0 +1,73 @@
+"""
+Low-memory JSON loading, which keeps a single copy of each key and short string.
+
+`json.loads` shares the keys of the objects within a single document, but every
+document gets its own copies of them, and so does every nested JSON string that
+`clean_json` parses (of which a report has thousands). String values are never shared
+at all, even when the same `"Automatic"` or `"Table0"` appears thousands of times.
+
+`loads_interned` interns every key, and every string value of up to
+`_MAX_INTERNED_LENGTH` characters, with `sys.intern`, so each of them is kept in memory
+only once for the whole run. This trades some speed (every object goes through a Python
+hook) for a smaller peak memory use.
+
+String values that could be JSON themselves are never interned, so that no two values
+that `clean_json` might parse share an object. `clean_json(..., schema_aware=True)`
+tells the strings at the known key paths apart by their identity.
+"""
+
+import json
+import sys
+from typing import Any
+
+# The longest string values that are interned. Longer ones are rarely repeated.
+_MAX_INTERNED_LENGTH = 32
+
+# The characters that JSON text can start with, going by `clean_JSON._MAYBE_JSON`.
+_JSON_START = frozenset('-{["0123456789tfnNI \t\n\r')
+
+
+def _intern_pairs(pairs: list[tuple[str, Any]]) -> dict[str, Any]:
+    """
+    Build a `dict` from `pairs`, interning its keys and its short string values.
+
+    Examples
+    --------
+    >>> a, b = loads_interned('{"name": "Sales"}'), loads_interned('{"name": "Sales"}')
+    >>> next(iter(a)) is next(iter(b)), a["name"] is b["name"]
+    (True, True)
+    >>> a, b = loads_interned('{"x": "[1]"}'), loads_interned('{"x": "[1]"}')
+    >>> a["x"] is b["x"]  # Could be JSON.
+    False
+    """
+    intern = sys.intern
+    return {
+        intern(key): (
+            intern(value)
+            if type(value) is str
+            and value
+            and len(value) <= _MAX_INTERNED_LENGTH
+            and value[0] not in _JSON_START
+            else value
+        )
+        for key, value in pairs
+    }
+
+
+def loads_interned(s: str | bytes, **kwargs: Any) -> Any:  # noqa: ANN401
+    """
+    Parse JSON text like `json.loads`, interning keys and short string values.
+
+    Parameters
+    ----------
+    s : str or bytes
+        The JSON text.
+    **kwargs
+        Passed on to `json.loads`, e.g. `parse_constant`.
+
+    Returns
+    -------
+    Any
+        The parsed JSON data.
+    """
+    return json.loads(s, object_pairs_hook=_intern_pairs, **kwargs)
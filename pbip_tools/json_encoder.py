@@ -0,0 +1,453 @@
+"""
+Fast indented JSON encoder for the output of the clean and smudge filters.
+
+Both filters finish with `json.dumps` with `indent`, `ensure_ascii=False` and
+`sort_keys=True`. In CPython, passing `indent` disables the C accelerated encoder and
+falls back to the pure-Python `json.encoder._make_iterencode`, which yields every token
+through a stack of generators. `dumps_indented` produces byte-identical output, but
+appends to a single list of chunks, inlines the common scalar cases, and reuses the
+indentation strings of each nesting level, which makes it several times faster.
+
+`dump_indented` writes the same output to a file or stream as it is encoded, so the
+whole output never has to be held in memory at once.
+"""
+
+import io
+import json
+from collections.abc import Callable, Collection, Iterator
+from json.encoder import INFINITY, encode_basestring
+from typing import Any, cast
+
+from pbip_tools.stats import nested_json
+from pbip_tools.type_aliases import JSONType, SupportsWrite
+
+# How many chunks `dump_indented` collects before writing them out in one go, which
+# keeps both the number of writes and the memory held by pending chunks small.
+_CHUNKS_PER_WRITE = 4096
+
+
+def dumps_reference(json_data: JSONType, indent: int | None = 2) -> str:
+    """
+    Serialize `json_data` with the standard library's encoder.
+
+    This is the reference output that `dumps_indented` must reproduce byte for byte.
+
+    Parameters
+    ----------
+    json_data : JSONType
+        The JSON data to serialize.
+    indent : int or None, default 2
+        The number of spaces to indent each nesting level with.
+
+    Returns
+    -------
+    str
+        The serialized JSON, with sorted keys and without escaping non-ASCII characters.
+    """
+    return json.dumps(json_data, ensure_ascii=False, indent=indent, sort_keys=True)
+
+
+# Compact JSON, as embedded in JSON strings by Power BI. Without `indent`, this runs on
+# the C accelerated encoder.
+_encode_compact = json.JSONEncoder(
+    ensure_ascii=False, separators=(",", ":"), sort_keys=True
+).encode
+
+
+def _floatstr(o: float) -> str:
+    """Format a float the way `json.dumps` does (allowing `NaN` and `Infinity`)."""
+    if o != o:  # noqa: PLR0124 (only NaN is not equal to itself)
+        return "NaN"
+    if o == INFINITY:
+        return "Infinity"
+    if o == -INFINITY:
+        return "-Infinity"
+    return float.__repr__(o)
+
+
+def _keystr(key: object) -> str:
+    """Convert a non-`str` dictionary key the way `json.dumps` does."""
+    if isinstance(key, str):
+        return key
+    if isinstance(key, float):
+        return _floatstr(key)
+    if key is True:
+        return "true"
+    if key is False:
+        return "false"
+    if key is None:
+        return "null"
+    if isinstance(key, int):
+        return int.__repr__(key)
+    msg = f"keys must be str, int, float, bool or None, not {key.__class__.__name__}"
+    raise TypeError(msg)
+
+
+def _encode_scalar(o: object) -> str:  # noqa: PLR0911
+    """Encode anything but a non-empty `dict`, `list` or `tuple`, like `json.dumps`."""
+    if isinstance(o, str):
+        return encode_basestring(o)
+    if o is None:
+        return "null"
+    if o is True:
+        return "true"
+    if o is False:
+        return "false"
+    if isinstance(o, int):
+        return int.__repr__(o)
+    if isinstance(o, float):
+        return _floatstr(o)
+    if isinstance(o, dict):
+        return "{}"
+    if isinstance(o, list | tuple):
+        return "[]"
+    msg = f"Object of type {o.__class__.__name__} is not JSON serializable"
+    raise TypeError(msg)
+
+
+def _make_indented_encoder(  # noqa: C901, PLR0915 (one loop keeps lookups local)
+    indent: int,
+    append: Callable[[str], Any],
+    embedded_json_keys: Collection[str] = frozenset(),
+    checkpoint: Callable[[], Any] | None = None,
+    parse_string: Callable[[str], Any] | None = None,
+) -> Callable[[JSONType, int], None]:
+    """
+    Create a function that encodes JSON data by passing chunks of text to `append`.
+
+    The encoder walks the data with an explicit stack rather than by recursion, so it
+    costs no Python call per `dict` or `list`, and there is no limit to how deeply the
+    data may be nested.
+
+    Parameters
+    ----------
+    indent : int
+        The number of spaces to indent each nesting level with.
+    append : Callable[[str], Any]
+        Called with each consecutive chunk of the output.
+    embedded_json_keys : Collection[str], optional
+        Dictionary keys whose `dict` or `list` values are encoded as compact JSON
+        strings, instead of as nested JSON.
+    checkpoint : Callable[[], Any], optional
+        Called before each non-empty `dict` or `list` is encoded, e.g. to write out the
+        chunks appended so far.
+    parse_string : Callable[[str], Any], optional
+        Called on every string inside of a `dict` or `list`. Whatever it returns is
+        encoded in place of the string (and its strings are parsed in turn), e.g. the
+        parsed JSON of strings that contain JSON.
+
+    Returns
+    -------
+    Callable[[JSONType, int], None]
+        A function `encode(json_data, level)` that encodes `json_data` as if it were
+        nested `level` levels deep.
+
+    Raises
+    ------
+    ValueError
+        From `encode`, if the data contains a circular reference.
+    """
+    indent_str = " " * indent
+    newlines = ["\n"]  # The newline plus indentation of each nesting level.
+    encode_compact: Callable[[Any], str] = _encode_compact
+    collect_stats = nested_json.enabled
+    if collect_stats:
+        encode_compact = nested_json.timed(_encode_compact)
+
+    def encode(o: Any, level: int) -> None:  # noqa: ANN401, C901, PLR0912, PLR0915
+        if not isinstance(o, dict | list | tuple) or not o:
+            append(_encode_scalar(o))
+            return
+
+        # The enclosing containers of the one being encoded, as tuples of the state
+        # below, and the `id` of each of them to detect circular references.
+        stack: list[tuple[Any, Iterator[Any], bool, str, str]] = []
+        open_ids: set[int] = set()
+        items: Iterator[Any]
+        key: Any
+        value: Any = o
+        while True:
+            # Open the non-empty `dict`, `list` or `tuple` in `value`.
+            if id(value) in open_ids:
+                msg = "Circular reference detected"
+                raise ValueError(msg)
+            open_ids.add(id(value))
+            if checkpoint is not None:
+                checkpoint()
+            level += 1
+            while len(newlines) <= level:
+                newlines.append(newlines[-1] + indent_str)
+            is_dict = isinstance(value, dict)
+            if is_dict:
+                items = iter(sorted(value.items()))
+                append("{" + newlines[level])
+                closing = newlines[level - 1] + "}"
+            else:
+                items = iter(value)
+                append("[" + newlines[level])
+                closing = newlines[level - 1] + "]"
+            separator = "," + newlines[level]
+            container = value
+            first = True
+
+            # Encode items until a non-empty container turns up, which is opened on
+            # the next pass of the outer loop, or until the outermost one is closed.
+            while True:
+                if is_dict:
+                    for key, value in items:
+                        if first:
+                            first = False
+                        else:
+                            append(separator)
+                        if type(key) is not str:
+                            key = _keystr(key)  # noqa: PLW2901
+                        append(encode_basestring(key) + ": ")
+                        if type(value) is str:
+                            if parse_string is None:
+                                append(encode_basestring(value))
+                                continue
+                            value = parse_string(value)  # noqa: PLW2901
+                            if type(value) is str:
+                                append(encode_basestring(value))
+                                continue
+                        if type(value) is int:
+                            append(int.__repr__(value))
+                        elif (
+                            embedded_json_keys
+                            and key in embedded_json_keys
+                            and isinstance(value, dict | list)
+                        ):
+                            # The C encoder's compact output, escaped into the output.
+                            append(encode_basestring(encode_compact(value)))
+                        elif isinstance(value, dict | list | tuple) and value:
+                            break
+                        else:
+                            append(_encode_scalar(value))
+                    else:
+                        value = None
+                else:
+                    for value in items:
+                        if first:
+                            first = False
+                        else:
+                            append(separator)
+                        if type(value) is str:
+                            if parse_string is None:
+                                append(encode_basestring(value))
+                                continue
+                            value = parse_string(value)  # noqa: PLW2901
+                            if type(value) is str:
+                                append(encode_basestring(value))
+                                continue
+                        if type(value) is int:
+                            append(int.__repr__(value))
+                        elif isinstance(value, dict | list | tuple) and value:
+                            break
+                        else:
+                            append(_encode_scalar(value))
+                    else:
+                        value = None
+
+                if value is not None:  # `break` found a container to open.
+                    stack.append((container, items, is_dict, separator, closing))
+                    break
+                append(closing)
+                level -= 1
+                open_ids.discard(id(container))
+                if not stack:
+                    if collect_stats:
+                        depth = max(nested_json.max_depth, len(newlines) - 1)
+                        nested_json.max_depth = depth
+                    return
+                container, items, is_dict, separator, closing = stack.pop()
+                first = False
+
+    return encode
+
+
+def dumps_indented(
+    json_data: JSONType,
+    indent: int | None = 2,
+    *,
+    embedded_json_keys: Collection[str] = frozenset(),
+    parse_string: Callable[[str], Any] | None = None,
+) -> str:
+    """
+    Serialize `json_data` exactly like `dumps_reference`, but faster.
+
+    Parameters
+    ----------
+    json_data : JSONType
+        The JSON data to serialize.
+    indent : int or None, default 2
+        The number of spaces to indent each nesting level with. `None` gives compact
+        single-line output, for which the standard library's C encoder is used.
+    embedded_json_keys : Collection[str], optional
+        Dictionary keys whose `dict` or `list` values are written as compact JSON
+        strings (as `smudge_json` does), instead of as nested JSON. Values nested
+        inside of such a string are written as they are.
+    parse_string : Callable[[str], Any], optional
+        Called on every string inside of a `dict` or `list` (but not on `json_data`
+        itself), to return the value to write in its place, e.g. the parsed JSON of
+        strings that contain JSON (as `clean_json` does).
+
+    Returns
+    -------
+    str
+        The serialized JSON, with sorted keys and without escaping non-ASCII characters.
+
+    See Also
+    --------
+    dumps_reference : The standard library's (slower) equivalent.
+
+    Notes
+    -----
+    The data is walked without recursion, so unlike `json.dumps`, there is no limit
+    to how deeply it may be nested. Circular references raise a `ValueError`.
+
+    Examples
+    --------
+    >>> print(dumps_indented({"b": [1, 2.5, None], "a": {"é": True, "x": {}}}))
+    {
+      "a": {
+        "x": {},
+        "é": true
+      },
+      "b": [
+        1,
+        2.5,
+        null
+      ]
+    }
+    """
+    if indent is None and not embedded_json_keys and parse_string is None:
+        return dumps_reference(json_data, indent=None)
+    if indent is None:
+        msg = "`embedded_json_keys` and `parse_string` require an `indent`."
+        raise ValueError(msg)
+    chunks: list[str] = []
+    encode = _make_indented_encoder(
+        indent, chunks.append, embedded_json_keys, parse_string=parse_string
+    )
+    encode(json_data, 0)
+    return "".join(chunks)
+
+
+def dump_indented(
+    json_data: JSONType,
+    fp: SupportsWrite[str] | SupportsWrite[bytes],
+    indent: int | None = 2,
+    *,
+    embedded_json_keys: Collection[str] = frozenset(),
+    parse_string: Callable[[str], Any] | None = None,
+) -> None:
+    """
+    Serialize `json_data` like `dumps_indented`, writing it to `fp` as it is encoded.
+
+    Parameters
+    ----------
+    json_data : JSONType
+        The JSON data to serialize.
+    fp : SupportsWrite[str] or SupportsWrite[bytes]
+        The text or binary stream to write to. Binary streams (i.e. instances of
+        `io.RawIOBase` or `io.BufferedIOBase`) receive UTF-8; anything else receives
+        `str`.
+    indent : int or None, default 2
+        The number of spaces to indent each nesting level with. `None` gives compact
+        single-line output, which is written in one go.
+    embedded_json_keys : Collection[str], optional
+        Dictionary keys whose `dict` or `list` values are written as compact JSON
+        strings, as in `dumps_indented`.
+    parse_string : Callable[[str], Any], optional
+        Called on every nested string to return the value to write in its place, as in
+        `dumps_indented`.
+
+    See Also
+    --------
+    dumps_indented : Serialize to a `str` instead.
+
+    Notes
+    -----
+    Chunks are collected and written out in batches, before the start of a `dict` or
+    `list`, so `fp` sees a few large writes rather than one per token.
+
+    Examples
+    --------
+    >>> import io
+    >>> stream = io.BytesIO()
+    >>> dump_indented({"b": [1], "a": "é"}, stream)
+    >>> stream.getvalue().decode("UTF-8") == dumps_indented({"b": [1], "a": "é"})
+    True
+    """
+    if indent is None and not embedded_json_keys and parse_string is None:
+        _text_writer(fp)(dumps_reference(json_data, indent=None))
+        return
+    if indent is None:
+        msg = "`embedded_json_keys` and `parse_string` require an `indent`."
+        raise ValueError(msg)
+
+    encode, _, write_pending = _make_stream_encoder(
+        fp, indent, embedded_json_keys, parse_string
+    )
+    encode(json_data, 0)
+    write_pending(force=True)
+
+
+def _text_writer(
+    fp: SupportsWrite[str] | SupportsWrite[bytes],
+) -> Callable[[str], object]:
+    """Return a function that writes `str` to `fp`, encoding it if `fp` is binary."""
+    if isinstance(fp, io.RawIOBase | io.BufferedIOBase):
+        write_bytes = cast("SupportsWrite[bytes]", fp).write
+
+        def write(text: str, /) -> object:
+            return write_bytes(text.encode("UTF-8"))
+
+        return write
+    return cast("SupportsWrite[str]", fp).write
+
+
+def _make_stream_encoder(
+    fp: SupportsWrite[str] | SupportsWrite[bytes],
+    indent: int,
+    embedded_json_keys: Collection[str] = frozenset(),
+    parse_string: Callable[[str], Any] | None = None,
+) -> tuple[Callable[[JSONType, int], None], Callable[[str], Any], Callable[..., None]]:
+    """
+    Create an indented encoder that writes its output to `fp` in batches.
+
+    Parameters
+    ----------
+    fp : SupportsWrite[str] or SupportsWrite[bytes]
+        The text or binary stream to write to.
+    indent : int
+        The number of spaces to indent each nesting level with.
+    embedded_json_keys : Collection[str], optional
+        Dictionary keys whose `dict` or `list` values are encoded as compact JSON
+        strings, instead of as nested JSON.
+    parse_string : Callable[[str], Any], optional
+        Called on every string inside of a `dict` or `list`, to return the value to
+        encode in its place.
+
+    Returns
+    -------
+    encode : Callable[[JSONType, int], None]
+        Encodes JSON data as if it were nested `level` levels deep.
+    append : Callable[[str], Any]
+        Adds a chunk of text to the output, e.g. for the parts written by the caller.
+    write_pending : Callable[..., None]
+        Writes out the pending chunks once there are many of them, or regardless
+        when called with `force=True`. The latter must be called at the end.
+    """
+    write = _text_writer(fp)
+    chunks: list[str] = []
+
+    def write_pending(*, force: bool = False) -> None:
+        if force or len(chunks) >= _CHUNKS_PER_WRITE:
+            write("".join(chunks))
+            chunks.clear()
+
+    encode = _make_indented_encoder(
+        indent, chunks.append, embedded_json_keys, write_pending, parse_string
+    )
+    return encode, chunks.append, write_pending
@@ -1,17 +1,488 @@
 """Utility functions to process and save JSON files."""
 
 import json
+import mmap
+import os
 import re
+import stat
+import sys
+import tempfile
+import time
 import warnings
+from collections import Counter
 from collections.abc import Callable, Iterable
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from contextlib import nullcontext
+from enum import Enum
+from functools import partial
 from pathlib import Path
+from typing import Any, BinaryIO
 
-from pbip_tools.type_aliases import JSONType, PathLike
+from pbip_tools.cache import ResultCache
+from pbip_tools.discovery import is_plain_json
+from pbip_tools.interning import loads_interned
+from pbip_tools.stats import (
+    FileStats,
+    PhaseTimer,
+    TimedWriter,
+    collect_stats,
+    format_stats,
+)
+from pbip_tools.streaming import Source
+from pbip_tools.type_aliases import JSONType, PathLike, SupportsWrite
 
 
-def _process_and_save_json_files(
+class FileStatus(Enum):
+    """The outcome of processing a single file in-place."""
+
+    REWRITTEN = "rewritten"
+    UNCHANGED = "unchanged"
+    SKIPPED = "skipped"  # The file contains JSON5-style comments.
+    DIFFERS = "differs"  # When checking: the file would be rewritten.
+
+
+class _FileRewriter:
+    """
+    Text stream that atomically rewrites `file`, but only if what's written differs.
+
+    Text written to the stream is compared with the current contents of the file as it
+    comes in. At the first difference, a temporary file is created in the same
+    directory, and the rest of the output is streamed to it. On `commit`, the temporary
+    file is flushed to disk and renamed over `file`, so an interrupted run never leaves
+    a truncated file behind. The permissions of `file` are preserved, and symlinks are
+    written through. Newlines are written as `os.linesep`, like a text-mode file would.
+
+    Parameters
+    ----------
+    file : PathLike
+        The file to rewrite.
+    current_contents : bytes or mmap.mmap
+        The current contents of `file`.
+    on_output : Callable[[bytes], object], optional
+        Called with each piece of the output, as encoded, e.g. to hash it.
+    """
+
+    def __init__(
+        self,
+        file: PathLike,
+        current_contents: bytes | mmap.mmap,
+        on_output: Callable[[bytes], object] | None = None,
+    ) -> None:
+        self._target = Path(os.path.realpath(file))
+        self._on_output = on_output
+        self._current_contents = memoryview(current_contents)
+        self._current_size = len(current_contents)
+        self._matched = 0  # The length of the prefix that is identical so far.
+        self._temp_file: BinaryIO | None = None
+        self._temp_name = ""
+
+    def _open_temp_file(self) -> BinaryIO:
+        """Start the temporary file with the output so far (i.e. the matched prefix)."""
+        fd, self._temp_name = tempfile.mkstemp(
+            prefix=f".{self._target.name}.", suffix=".tmp", dir=self._target.parent
+        )
+        self._temp_file = os.fdopen(fd, "wb")
+        self._temp_file.write(self._current_contents[: self._matched])
+        return self._temp_file
+
+    def write(self, text: str) -> int:
+        """Write `text`, comparing it with the current contents while they match."""
+        if os.linesep != "\n":
+            text = text.replace("\n", os.linesep)
+        data = text.encode("UTF-8")
+        if self._on_output is not None:
+            self._on_output(data)
+        if self._temp_file is None:
+            end = self._matched + len(data)
+            if self._current_contents[self._matched : end] == data:
+                self._matched = end
+                return len(text)
+            self._open_temp_file()
+        self._temp_file.write(data)  # type: ignore[union-attr]
+        return len(text)
+
+    def commit(self) -> FileStatus:
+        """
+        Replace `file` with the output, unless it is identical to the current contents.
+
+        Returns
+        -------
+        FileStatus
+            `FileStatus.REWRITTEN` or `FileStatus.UNCHANGED`.
+        """
+        self.release_contents()
+        if self._temp_file is None:
+            return FileStatus.UNCHANGED
+        temp_file = self._temp_file
+        mode = stat.S_IMODE(self._target.stat().st_mode)
+        try:
+            temp_file.flush()
+            os.fsync(temp_file.fileno())
+            temp_file.close()
+            os.chmod(self._temp_name, mode)  # noqa: PTH101 (`mkstemp` creates 0600)
+            os.replace(self._temp_name, self._target)  # noqa: PTH105
+        except BaseException:
+            self.discard()
+            raise
+        self._temp_file = None
+        return FileStatus.REWRITTEN
+
+    def release_contents(self) -> None:
+        """
+        Stop comparing the output with the current contents of `file`.
+
+        This lets a memory map of `file` be closed before `commit`, which is required on
+        Windows, where a mapped file can't be replaced.
+        """
+        if self._temp_file is None and self._matched != self._current_size:
+            self._open_temp_file()  # The output is a truncated copy of the contents.
+        self._current_contents.release()
+
+    def discard(self) -> None:
+        """Remove the temporary file, if any, leaving `file` as it was."""
+        self._current_contents.release()
+        if self._temp_file is not None:
+            self._temp_file.close()
+            Path(self._temp_name).unlink(missing_ok=True)
+            self._temp_file = None
+
+
+class _OutputDiffersError(Exception):
+    """Raised by `_FileComparer` at the first difference, to stop the filter there."""
+
+
+class _FileComparer:
+    """
+    Text stream that compares what's written with the contents of a file, and no more.
+
+    This stands in for `_FileRewriter` when checking whether files are already in
+    filtered form. Text is compared as it comes in, and `_OutputDiffersError` is raised
+    at the first difference, so that the rest of the output is never produced.
+
+    Parameters
+    ----------
+    current_contents : bytes or mmap.mmap
+        The current contents of the file.
+    """
+
+    def __init__(self, current_contents: bytes | mmap.mmap) -> None:
+        self._current_contents = memoryview(current_contents)
+        self._current_size = len(current_contents)
+        self._matched = 0  # The length of the prefix that is identical so far.
+
+    def write(self, text: str) -> int:
+        """Compare `text` with the current contents, like `_FileRewriter` writes it."""
+        if os.linesep != "\n":
+            text = text.replace("\n", os.linesep)
+        data = text.encode("UTF-8")
+        end = self._matched + len(data)
+        if self._current_contents[self._matched : end] != data:
+            raise _OutputDiffersError
+        self._matched = end
+        return len(text)
+
+    def commit(self) -> FileStatus:
+        """
+        Return whether the output was identical to the current contents.
+
+        Returns
+        -------
+        FileStatus
+            `FileStatus.UNCHANGED`, or `FileStatus.DIFFERS` if the output ended before
+            the current contents did.
+        """
+        self.release_contents()
+        if self._matched != self._current_size:
+            return FileStatus.DIFFERS
+        return FileStatus.UNCHANGED
+
+    def release_contents(self) -> None:
+        """Stop comparing the output with the current contents of the file."""
+        self._current_contents.release()
+
+    def discard(self) -> None:
+        """Stop comparing, like `release_contents`; there is nothing to remove."""
+        self._current_contents.release()
+
+
+class _OutputRecorder:
+    """
+    Text stream that passes everything on to `stream`, and keeps a copy of it.
+
+    This lets an output be stored in the result cache while it is streamed out. Once
+    more than `max_size` characters are written, which is too large for the cache
+    anyway, the copy is dropped to save memory.
+
+    Parameters
+    ----------
+    stream : SupportsWrite[str]
+        The text stream to write to.
+    max_size : int
+        The number of characters beyond which no copy is kept.
+    """
+
+    def __init__(self, stream: SupportsWrite[str], max_size: int) -> None:
+        self._stream = stream
+        self._max_size = max_size
+        self._size = 0
+        self._chunks: list[str] | None = []
+
+    def write(self, text: str) -> object:
+        """Write `text` to the stream, and keep a copy of it."""
+        if self._chunks is not None:
+            self._size += len(text)
+            if self._size > self._max_size:
+                self._chunks = None
+            else:
+                self._chunks.append(text)
+        return self._stream.write(text)
+
+    def getvalue(self) -> str | None:
+        """Return everything written so far, or `None` if it was too large to keep."""
+        return None if self._chunks is None else "".join(self._chunks)
+
+
+def _process_and_save_json_file(  # noqa: PLR0913
+    file: PathLike,
+    process_func: Callable[[JSONType, SupportsWrite[str]], None],
+    cache: ResultCache | None = None,
+    stats: FileStats | None = None,
+    *,
+    low_memory: bool = False,
+    check: bool = False,
+    executor: Executor | None = None,
+    on_output: Callable[[bytes], object] | None = None,
+) -> FileStatus:
+    """
+    Apply a processing function to a single JSON file and save it in-place.
+
+    The output is streamed to disk as it is produced, the file is only rewritten when
+    the output differs from its current contents, and the write itself is atomic.
+
+    Parameters
+    ----------
+    file : PathLike
+        The JSON file to process.
+    process_func : Callable[[JSONType, SupportsWrite[str]], None]
+        A callable processing function that takes loaded JSON objects and writes the
+        processed content to the given text stream, e.g. `clean_json_to`.
+    cache : ResultCache, optional
+        A cache of previous results of `process_func`. On a hit, the cached output is
+        used without parsing the file.
+    stats : FileStats, optional
+        Statistics to add the sizes and phase timings of the file to.
+    low_memory : bool, default False
+        Whether to parse the file with `loads_interned`, which keeps a single copy of
+        each key and short string in memory.
+    check : bool, default False
+        Whether to only check if the file is already up to date, without writing it.
+        Processing then stops at the first byte of output that differs from the file.
+    executor : Executor, optional
+        A pool of worker processes to process the parts of the file in, which is passed
+        on to `process_func` (e.g. `clean_json_to`) as its `executor`.
+    on_output : Callable[[bytes], object], optional
+        Called with each piece of the output, as written to the file (or found in it
+        already), e.g. `hashlib.sha256().update`. Not called when checking.
+
+    Returns
+    -------
+    FileStatus
+        Whether the file was rewritten (or, when checking, differs), already up to
+        date, or skipped because it contains JSON5-style comments.
+
+    Raises
+    ------
+    ValueError
+        Raised when there is an issue loading or processing the file.
+    """
+    try:
+        timer = PhaseTimer(stats)
+        json_from_file_as_bytes = Path(file).read_bytes()
+        cache_key = cache.key(json_from_file_as_bytes) if cache else ""
+        processed_json = cache.get(cache_key) if cache else None
+        timer.lap("read")
+
+        rewriter = (
+            _FileComparer(json_from_file_as_bytes)
+            if check
+            else _FileRewriter(file, json_from_file_as_bytes, on_output)
+        )
+        writer = TimedWriter(rewriter) if stats else None
+        try:
+            if processed_json is not None:
+                (writer or rewriter).write(processed_json)
+                timer.lap("serialize")
+                status = rewriter.commit()
+                timer.lap("write")
+                return status
+
+            json_from_file_as_str = json_from_file_as_bytes.decode("UTF-8")
+            if contains_line_comments(json_from_file_as_str):
+                # We can't currently process files that use JSON5-style comments.
+                return FileStatus.SKIPPED
+
+            loads = loads_interned if low_memory else json.loads
+            json_from_file = loads(json_from_file_as_str, parse_constant=str)
+            del json_from_file_as_str
+            timer.lap("parse")
+            output = writer or rewriter
+            recorder = _OutputRecorder(output, cache.max_size) if cache else None
+            if executor is None:
+                process_func(json_from_file, recorder or output)
+            else:
+                split_func: Callable[..., None] = process_func  # It takes `executor`.
+                split_func(json_from_file, recorder or output, executor=executor)
+            timer.lap("serialize")
+            status = rewriter.commit()
+            timer.lap("write")
+        finally:
+            rewriter.discard()
+            if stats and writer:
+                stats.bytes_in = len(json_from_file_as_bytes)
+                writer.record(stats)
+
+        if cache and recorder and (processed_json := recorder.getvalue()) is not None:
+            cache.put(cache_key, processed_json)
+    except _OutputDiffersError:
+        return FileStatus.DIFFERS
+    except Exception as e:
+        msg = f"Error processing {file}: {e}"
+        raise ValueError(msg) from e
+    return status
+
+
+def _stream_and_save_json_file(
+    file: PathLike,
+    stream_func: Callable[[Source, SupportsWrite[str]], None],
+    stats: FileStats | None = None,
+    *,
+    check: bool = False,
+) -> FileStatus:
+    """
+    Like `_process_and_save_json_file`, but in bounded memory with `stream_func`.
+
+    The file is memory-mapped rather than read, and `stream_func` gets its raw bytes
+    instead of the parsed JSON. The result cache is not used, as the outputs of files
+    that need streaming are too large to be cached.
+
+    Parameters
+    ----------
+    file : PathLike
+        The JSON file to process.
+    stream_func : Callable[[Source, SupportsWrite[str]], None]
+        A function that takes the raw bytes of a JSON document and writes the processed
+        content to the given text stream, e.g. `clean_json_stream`.
+    stats : FileStats, optional
+        Statistics to add the sizes and phase timings of the file to. The file is
+        parsed while it is serialized, so parsing counts as the latter.
+    check : bool, default False
+        Whether to only check if the file is already up to date, as in
+        `_process_and_save_json_file`.
+
+    Returns
+    -------
+    FileStatus
+        Whether the file was rewritten (or, when checking, differs), already up to
+        date, or skipped because it contains JSON5-style comments.
+
+    Raises
+    ------
+    ValueError
+        Raised when there is an issue loading or processing the file.
+    """
+    try:
+        timer = PhaseTimer(stats)
+        with Path(file).open("rb") as f:
+            # An empty file can't be mapped (and isn't valid JSON anyway).
+            size = os.fstat(f.fileno()).st_size
+            with (
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                if size
+                else nullcontext(b"")
+            ) as contents:
+                if contains_line_comments(contents):
+                    return FileStatus.SKIPPED
+                timer.lap("read")
+                rewriter = (
+                    _FileComparer(contents) if check else _FileRewriter(file, contents)
+                )
+                writer = TimedWriter(rewriter) if stats else None
+                try:
+                    stream_func(contents, writer or rewriter)
+                    rewriter.release_contents()
+                except BaseException:
+                    rewriter.discard()
+                    raise
+                timer.lap("serialize")
+        status = rewriter.commit()  # Only once the file is no longer mapped.
+        timer.lap("write")
+        if stats and writer:
+            stats.bytes_in = size
+            writer.record(stats)
+    except _OutputDiffersError:
+        return FileStatus.DIFFERS
+    except Exception as e:
+        msg = f"Error processing {file}: {e}"
+        raise ValueError(msg) from e
+    return status
+
+
+def _summarize_file_statuses(
+    statuses: Iterable[FileStatus], *, check: bool = False
+) -> str:
+    """
+    Summarize how many files were (or, if `check`, would be) rewritten, or skipped.
+
+    Examples
+    --------
+    >>> _summarize_file_statuses([FileStatus.REWRITTEN, FileStatus.UNCHANGED] * 2)
+    '2 files rewritten, 2 files left unchanged.'
+    >>> _summarize_file_statuses([FileStatus.UNCHANGED, FileStatus.SKIPPED])
+    '0 files rewritten, 1 file left unchanged, 1 file skipped.'
+    >>> _summarize_file_statuses([FileStatus.DIFFERS, FileStatus.UNCHANGED], check=True)
+    '1 file would be rewritten, 1 file would be left unchanged.'
+    """
+    counts = Counter(statuses)
+
+    def files(status: FileStatus) -> str:
+        return f"{counts[status]} file{'' if counts[status] == 1 else 's'}"
+
+    summary = (
+        (
+            f"{files(FileStatus.DIFFERS)} would be rewritten,"
+            f" {files(FileStatus.UNCHANGED)} would be left unchanged"
+        )
+        if check
+        else (
+            f"{files(FileStatus.REWRITTEN)} rewritten,"
+            f" {files(FileStatus.UNCHANGED)} left unchanged"
+        )
+    )
+    if counts[FileStatus.SKIPPED]:
+        summary += f", {files(FileStatus.SKIPPED)} skipped"
+    return f"{summary}."
+
+
+def _file_size(file: PathLike) -> int:
+    """Return the size of `file` in bytes, or 0 if it cannot be determined."""
+    try:
+        return Path(file).stat().st_size
+    except OSError:
+        return 0
+
+
+def _process_and_save_json_files(  # noqa: PLR0913
     json_files: Iterable[PathLike],
-    process_func: Callable[[JSONType], str],
+    process_func: Callable[[JSONType, SupportsWrite[str]], None],
+    jobs: int = 1,
+    cache: ResultCache | None = None,
+    stats_format: str | None = None,
+    *,
+    low_memory: bool = False,
+    plain_func: Callable[[JSONType, SupportsWrite[str]], None] | None = None,
+    check: bool = False,
+    split_size: int | None = None,
+    report_func: Callable[..., FileStatus] | None = None,
 ) -> int:
     """
     Apply a processing function to a JSON file and save it in-place.
@@ -25,19 +496,54 @@ def _process_and_save_json_files(
     ----------
     json_files : Iterable[PathLike]
         A `list` or `Iterable` of PathLike representations of your JSON files.
-    process_func : Callable[[JSONType], str]
-        A callable processing function that takes loaded JSON objects and returns a
-        `str` of the processed content.
+    process_func : Callable[[JSONType, SupportsWrite[str]], None]
+        A callable processing function that takes loaded JSON objects and writes the
+        processed content to the given text stream, e.g. `clean_json_to`. When `jobs`
+        is not 1, it must be picklable (e.g. a module-level function or a
+        `functools.partial` of one).
+    jobs : int, default 1
+        The number of worker processes used to process the files. Pass 0 to use one
+        worker per CPU core.
+    cache : ResultCache, optional
+        A cache of previous results of `process_func`, keyed by the file contents.
+        Unchanged files are then served from the cache without being parsed.
+    stats_format : {"human", "json"}, optional
+        If given, print the sizes and phase timings of each file, the throughput, and
+        the slowest files to stderr, as a table or as JSON.
+    low_memory : bool, default False
+        Whether to parse the files with `loads_interned`, which keeps a single copy of
+        each key and short string in memory, at some cost in speed. (Pass a
+        `process_func` with `low_memory=True`, if it has that option, for nested JSON.)
+    plain_func : Callable[[JSONType, SupportsWrite[str]], None], optional
+        The processing function for the files that Power BI writes as plain JSON (see
+        `pbip_tools.discovery.is_plain_json`), e.g. `.platform` files, instead of
+        `process_func`. Their results are not cached.
+    check : bool, default False
+        Whether to only check that every file is already up to date, without writing
+        any. Each file is processed up to the first byte that differs from it, and the
+        files that would be rewritten are printed to stdout.
+    split_size : int, optional
+        With multiple `jobs`, the files of at least this many bytes are each split
+        across all workers (see `pbip_tools.split`), rather than processed by one of
+        them. `process_func` must then take an `executor` keyword argument, like
+        `clean_json_to` does.
+    report_func : Callable[..., FileStatus], optional
+        What to do with the `report.json` files instead, e.g.
+        `pbip_tools.explode.explode_json_file`. It is passed each file, what would
+        have been done with it as `save_file`, and `stats`. When `jobs` is not 1, it
+        must be picklable.
 
     Returns
     -------
     int
-        Returns 0 on successful processing (or skipping) of all files.
+        Returns 0 on successful processing (or skipping) of all files. When checking,
+        returns 1 if any file would be rewritten.
 
     Raises
     ------
     ValueError
-        Raised when there is an issue loading or processing the file.
+        Raised when there is an issue loading or processing the file, or when `jobs`
+        is negative.
 
     Warns
     -----
@@ -48,27 +554,270 @@ def _process_and_save_json_files(
     -----
     Any document that is detected to contain JSON5-style line comments (denoted by `//`)
     will be automatically skipped. These file will not be processed or overwritten.
+
+    Files whose processed output is identical to their current contents are not
+    rewritten, and a summary of how many files were rewritten or left unchanged is
+    printed to stderr.
+
+    With multiple `jobs`, the largest files are scheduled first so that a single giant
+    file isn't left running on its own at the end. Files of at least `split_size` bytes
+    are read in the main process instead, which hands their parts to the workers.
+    Warnings are still issued in the order of `json_files`. Failing files don't stop
+    the others, with or without `jobs`: once all files are done, and the summary is
+    printed, a single `ValueError` lists every failure, in the order of `json_files`.
     """
-    for file in json_files:
-        try:
-            with Path(file).open(encoding="UTF-8") as f:
-                json_from_file_as_str = f.read()
+    return _save_json_files(
+        json_files,
+        _with_plain_func(
+            partial(
+                _process_and_save_json_file,
+                process_func=process_func,
+                cache=cache,
+                low_memory=low_memory,
+                check=check,
+            ),
+            plain_func,
+            check=check,
+            report_func=report_func,
+        ),
+        jobs,
+        stats_format,
+        check=check,
+        split_size=split_size,
+    )
 
-            if contains_line_comments(json_from_file_as_str):
-                # We can't currently process files that use JSON5-style comments.
-                warning_msg = f'Skipping file with comments: "{file}"'
-                warnings.warn(warning_msg, UserWarning, stacklevel=2)
+
+def _stream_and_save_json_files(  # noqa: PLR0913
+    json_files: Iterable[PathLike],
+    stream_func: Callable[[Source, SupportsWrite[str]], None],
+    jobs: int = 1,
+    stats_format: str | None = None,
+    *,
+    plain_func: Callable[[JSONType, SupportsWrite[str]], None] | None = None,
+    check: bool = False,
+) -> int:
+    """
+    Like `_process_and_save_json_files`, but in bounded memory with `stream_func`.
+
+    Parameters
+    ----------
+    json_files : Iterable[PathLike]
+        A `list` or `Iterable` of PathLike representations of your JSON files.
+    stream_func : Callable[[Source, SupportsWrite[str]], None]
+        A function that takes the raw bytes of a JSON document and writes the processed
+        content to the given text stream, e.g. `clean_json_stream`. When `jobs` is not
+        1, it must be picklable.
+    jobs : int, default 1
+        The number of worker processes used to process the files. Pass 0 to use one
+        worker per CPU core.
+    stats_format : {"human", "json"}, optional
+        If given, print statistics on each file to stderr, as a table or as JSON.
+    plain_func : Callable[[JSONType, SupportsWrite[str]], None], optional
+        The processing function for the files that Power BI writes as plain JSON, as
+        in `_process_and_save_json_files`. These small files are loaded whole.
+    check : bool, default False
+        Whether to only check that every file is already up to date, as in
+        `_process_and_save_json_files`.
+
+    Returns
+    -------
+    int
+        Returns 0 on successful processing (or skipping) of all files. When checking,
+        returns 1 if any file would be rewritten.
+
+    See Also
+    --------
+    pbip_tools.streaming : How files are processed in bounded memory.
+    """
+    return _save_json_files(
+        json_files,
+        _with_plain_func(
+            partial(_stream_and_save_json_file, stream_func=stream_func, check=check),
+            plain_func,
+            check=check,
+        ),
+        jobs,
+        stats_format,
+        check=check,
+    )
+
+
+def _save_by_kind(
+    file: PathLike,
+    save_file: Callable[..., FileStatus],
+    save_plain_file: Callable[..., FileStatus],
+    **kwargs: Any,  # noqa: ANN401
+) -> FileStatus:
+    """Run `save_plain_file` on `file` if it is plain JSON, or `save_file` if not."""
+    if is_plain_json(file):
+        kwargs.pop("executor", None)  # Plain JSON files are small, and never split.
+        return save_plain_file(file, **kwargs)
+    return save_file(file, **kwargs)
+
+
+def _save_report(
+    file: PathLike,
+    save_file: Callable[..., FileStatus],
+    report_func: Callable[..., FileStatus],
+    **kwargs: Any,  # noqa: ANN401
+) -> FileStatus:
+    """Run `report_func` on `file` if it is a `report.json`, or `save_file` if not."""
+    if Path(file).name == "report.json":
+        kwargs.pop("executor", None)  # Its shards are small, and never split.
+        return report_func(file, save_file=save_file, **kwargs)
+    return save_file(file, **kwargs)
+
+
+def _with_plain_func(
+    save_file: Callable[..., FileStatus],
+    plain_func: Callable[[JSONType, SupportsWrite[str]], None] | None,
+    *,
+    check: bool = False,
+    report_func: Callable[..., FileStatus] | None = None,
+) -> Callable[..., FileStatus]:
+    """
+    Make `save_file` process the plain JSON files with `plain_func`, if given.
+
+    With a `report_func`, the `report.json` files are passed to it, with `save_file`.
+    """
+    if report_func is not None:
+        save_file = partial(_save_report, save_file=save_file, report_func=report_func)
+    if plain_func is None:
+        return save_file
+    save_plain_file = partial(
+        _process_and_save_json_file, process_func=plain_func, check=check
+    )
+    return partial(_save_by_kind, save_file=save_file, save_plain_file=save_plain_file)
+
+
+def _save_file(
+    file: PathLike,
+    save_file: Callable[..., FileStatus],
+    *,
+    with_stats: bool,
+    executor: Executor | None = None,
+) -> tuple[FileStatus, FileStats | None]:
+    """
+    Run `save_file` on `file`, and return its status and statistics (if any).
+
+    With an `executor`, `save_file` splits the file across its worker processes.
+    """
+    kwargs = {} if executor is None else {"executor": executor}
+    if not with_stats:
+        return save_file(file, **kwargs), None
+    stats = FileStats(str(file))
+    with collect_stats(stats):
+        status = save_file(file, stats=stats, **kwargs)
+    stats.status = status.value
+    return status, stats
+
+
+def _report(
+    statuses: list[FileStatus],
+    all_stats: list[FileStats],
+    seconds: float,
+    stats_format: str | None,
+    *,
+    check: bool,
+) -> None:
+    """Print the summary of `statuses`, and the statistics in `stats_format` if any."""
+    print(_summarize_file_statuses(statuses, check=check), file=sys.stderr)
+    if stats_format:
+        print(format_stats(all_stats, seconds, stats_format), file=sys.stderr)
+
+
+def _save_json_files(  # noqa: C901, PLR0913
+    json_files: Iterable[PathLike],
+    save_file: Callable[..., FileStatus],
+    jobs: int,
+    stats_format: str | None = None,
+    *,
+    check: bool = False,
+    split_size: int | None = None,
+) -> int:
+    """
+    Run `save_file` on each of `json_files`, and report on the outcome.
+
+    This runs the files in order, or in `jobs` worker processes, for
+    `_process_and_save_json_files` and `_stream_and_save_json_files`. See the former for
+    how files are scheduled, and how warnings and errors are reported. With a
+    `stats_format`, `save_file` is also passed the `FileStats` of each file, and with
+    a `split_size`, the files of at least that size are passed the `executor` to split
+    them across. When checking, the files that `save_file` finds to differ are printed
+    to stdout, and 1 is returned if there are any.
+    """
+    if jobs < 0:
+        msg = f"The number of jobs must be non-negative, not {jobs}."
+        raise ValueError(msg)
+
+    start = time.perf_counter()
+    run = partial(_save_file, save_file=save_file, with_stats=bool(stats_format))
+    statuses = []
+    all_stats: list[FileStats] = []
+
+    def record(file: PathLike, result: tuple[FileStatus, FileStats | None]) -> None:
+        status, stats = result
+        if status is FileStatus.SKIPPED:
+            warning_msg = f'Skipping file with comments: "{file}"'
+            warnings.warn(warning_msg, UserWarning, stacklevel=4)
+        elif status is FileStatus.DIFFERS:
+            print(file)
+        statuses.append(status)
+        if stats:
+            all_stats.append(stats)
+
+    errors: list[ValueError] = []
+    if jobs == 1:
+        for file in json_files:
+            try:
+                result = run(file)
+            except ValueError as e:
+                errors.append(e)
+                continue
+            record(file, result)
+    else:
+        unique_files = list(dict.fromkeys(json_files))
+        sizes = {file: _file_size(file) for file in unique_files}
+        largest_first = sorted(unique_files, key=sizes.__getitem__, reverse=True)
+        split_files = (
+            []
+            if split_size is None
+            else [file for file in largest_first if sizes[file] >= split_size]
+        )
+        with ProcessPoolExecutor(max_workers=jobs or os.cpu_count()) as executor:
+            futures = {
+                file: executor.submit(run, file)
+                for file in largest_first
+                if file not in split_files
+            }
+            # The workers start on the other files while this process reads these.
+            for file in split_files:
+                futures[file] = _call(partial(run, file, executor=executor))
+
+        # Report back in the original order so the output is the same on every run.
+        for file in unique_files:
+            try:
+                result = futures[file].result()
+            except ValueError as e:
+                errors.append(e)
                 continue
+            record(file, result)
+
+    _report(statuses, all_stats, time.perf_counter() - start, stats_format, check=check)
+    if errors:
+        msg = "\n".join(map(str, errors))
+        raise ValueError(msg) from errors[0]
+    return int(FileStatus.DIFFERS in statuses)
 
-            json_from_file = json.loads(json_from_file_as_str, parse_constant=str)
-            processed_json = process_func(json_from_file)
 
-            with Path(file).open("w", encoding="UTF-8") as f:
-                f.write(processed_json)
-        except Exception as e:
-            msg = f"Error processing {file}: {e}"
-            raise ValueError(msg) from e
-    return 0
+def _call(func: Callable[[], Any]) -> Future[Any]:
+    """Call `func` in this process, and return its outcome as a done `Future`."""
+    future: Future[Any] = Future()
+    try:
+        future.set_result(func())
+    except Exception as e:  # noqa: BLE001 (It is raised by `future.result()`.)
+        future.set_exception(e)
+    return future
 
 
 def _specified_stdin_instead_of_file(filename_args: list[str]) -> bool:
@@ -106,14 +855,14 @@ def _specified_stdin_instead_of_file(filename_args: list[str]) -> bool:
     return "-" in filename_args  # which is for sure True at this point.
 
 
-def contains_line_comments(json_str: str) -> bool:
+def contains_line_comments(json_str: str | bytes | mmap.mmap) -> bool:
     """
     Check a JSON string for line comments, denoted by `//`.
 
     Parameters
     ----------
-    json_str : str
-        The JSON text to check for line comments.
+    json_str : str, bytes or mmap.mmap
+        The JSON text to check for line comments, or its raw bytes.
 
     Returns
     -------
@@ -135,4 +884,6 @@ def contains_line_comments(json_str: str) -> bool:
     False
     """
     single_line_comment_regex = r"(?m)^\s*\/\/.*$"
+    if not isinstance(json_str, str):
+        return bool(re.search(single_line_comment_regex.encode(), json_str))
     return bool(re.search(single_line_comment_regex, json_str))
@@ -0,0 +1,147 @@
+"""
+Memo of the nested JSON strings that `clean_json` parses.
+
+Power BI repeats many nested JSON strings verbatim: shared filter definitions, default
+visual configs and theme fragments appear in many visuals of a report, and in many
+reports of a project. `nested_json_memo` keeps the JSON data of the most recently
+parsed strings that repeat, so that most of them are parsed only twice per process,
+across all files that it cleans (e.g. all files of a CLI run, or of a `--jobs` worker).
+
+The parsed JSON data is shared between every place that the same string appears, rather
+than copied. This is safe because the filters never change the data that they are
+serializing. Cleaning with `sort_lists=True` does change the data it parses (it sorts
+and de-nests it in-place), and cleaning that data again would de-nest it further, so the
+strings it parses are never memoized.
+
+Attributes
+----------
+nested_json_memo : NestedJSONMemo
+    The memo that `clean_json` uses.
+"""
+
+from collections import OrderedDict
+from collections.abc import Callable
+
+from pbip_tools.type_aliases import JSONType
+
+# The default cap on the total length of the strings in the memo. The JSON data kept
+# for them takes several times as much memory.
+DEFAULT_MAX_CHARS = 4 * 1024**2
+
+# Strings shorter than this are parsed about as fast as they are looked up.
+_MIN_LENGTH = 64
+# How many hashes of strings that were seen once are remembered, at most.
+_MAX_SEEN = 2**16
+
+
+class NestedJSONMemo:
+    """
+    Bounded LRU memo of parsed JSON strings.
+
+    Parameters
+    ----------
+    max_chars : int, default DEFAULT_MAX_CHARS
+        The cap on the total length of the strings in the memo. The least recently used
+        entries are evicted first once it is exceeded. Strings longer than a sixteenth
+        of it are never kept, so that a single one doesn't evict everything else.
+
+    Attributes
+    ----------
+    hits : int
+        How many strings were found in the memo.
+    misses : int
+        How many strings had to be parsed.
+
+    Notes
+    -----
+    Most nested JSON strings appear only once, and keeping their JSON data alive makes
+    parsing the others slower (there is more for the garbage collector to check, and
+    less freed memory to reuse). So a string is only kept once it has been seen before,
+    going by its hash, and strings shorter than `_MIN_LENGTH` are never looked up.
+
+    Examples
+    --------
+    >>> import json
+    >>> memo, value = NestedJSONMemo(), json.dumps({"a": list(range(30))})
+    >>> first, second = memo.loads(value, json.loads), memo.loads(value, json.loads)
+    >>> memo.loads(value, json.loads) is second, (memo.hits, memo.misses)
+    (True, (1, 2))
+    """
+
+    def __init__(self, max_chars: int = DEFAULT_MAX_CHARS) -> None:
+        self.max_chars = max_chars
+        self._entries: OrderedDict[str, JSONType] = OrderedDict()
+        self._chars = 0
+        # The hashes of the strings seen so far that aren't in `_entries` (yet).
+        self._seen: set[int] = set()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        """Return the number of entries in the memo."""
+        return len(self._entries)
+
+    def loads(
+        self,
+        value: str,
+        loads: Callable[..., JSONType],
+        *,
+        sort_lists: bool = False,
+    ) -> JSONType:
+        """
+        Return the JSON data of `value`, parsing it with `loads` if it isn't memoized.
+
+        Parameters
+        ----------
+        value : str
+            The JSON string.
+        loads : Callable[..., JSONType]
+            Parses `value`, e.g. `json.loads`. Called with `parse_constant=str`.
+        sort_lists : bool, default False
+            Whether the JSON data will be cleaned with `sort_lists=True`, which changes
+            it in-place. It is then neither looked up nor kept in the memo.
+
+        Returns
+        -------
+        JSONType
+            The JSON data, which must not be changed, unless `sort_lists`.
+
+        Raises
+        ------
+        json.JSONDecodeError
+            From `loads`, if `value` isn't JSON. This isn't memoized.
+        """
+        if sort_lists or len(value) < _MIN_LENGTH:
+            return loads(value, parse_constant=str)
+        entries = self._entries
+        if value in entries:
+            self.hits += 1
+            entries.move_to_end(value)
+            return entries[value]
+
+        self.misses += 1
+        parsed = loads(value, parse_constant=str)
+        value_hash = hash(value)
+        if value_hash not in self._seen:
+            if len(self._seen) >= _MAX_SEEN:
+                self._seen.clear()
+            self._seen.add(value_hash)
+        elif len(value) <= self.max_chars // 16:
+            self._seen.discard(value_hash)
+            entries[value] = parsed
+            self._chars += len(value)
+            while self._chars > self.max_chars:
+                evicted, _ = entries.popitem(last=False)
+                self._chars -= len(evicted)
+        return parsed
+
+    def clear(self) -> None:
+        """Remove all entries from the memo, and set its counts back to zero."""
+        self._entries.clear()
+        self._chars = 0
+        self._seen.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+nested_json_memo = NestedJSONMemo()
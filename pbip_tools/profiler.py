@@ -0,0 +1,308 @@
+"""
+Key-path profiler for the `pbip-tools profile` command.
+
+`profile_json` runs the clean and smudge traversals over a document while accounting
+for every key path in it, with list indices collapsed to `[*]` (e.g.
+`sections[*].visualContainers[*].config`). Paths continue into nested JSON strings, so
+the contents of a `config` show up below it. For each path, it counts the values found
+there, and totals the following over the path and everything below it:
+
+- the time spent deciding whether strings are nested JSON and decoding them (clean),
+- the time spent encoding values back into JSON strings (smudge),
+- how many nested JSON strings were decoded and encoded, and
+- how many bytes of the clean and smudged output the path accounts for.
+
+The byte counts add up to the exact size of the output of `clean_json` and
+`smudge_json`, indentation included. Serializing the output isn't timed per path, as
+that would cost far more than the serialization itself; the byte counts show where it
+is spent instead.
+"""
+
+import json
+import time
+from collections.abc import Callable, Collection, Iterator
+from dataclasses import asdict, dataclass
+from json.encoder import encode_basestring
+
+from pbip_tools.clean.clean_JSON import _clean_json_data, _parse_nested_json_string
+from pbip_tools.json_encoder import (
+    _encode_compact,
+    _encode_scalar,
+    _keystr,
+    dumps_indented,
+)
+from pbip_tools.smudge.smudge_JSON import NESTED_JSON_KEYS
+from pbip_tools.type_aliases import JSONType
+
+# The key path of the document itself.
+ROOT = "(document)"
+
+# The columns that `format_profile` can sort the key paths by.
+SORT_KEYS = {
+    "time": lambda profile: profile.clean_seconds + profile.smudge_seconds,
+    "clean-time": lambda profile: profile.clean_seconds,
+    "smudge-time": lambda profile: profile.smudge_seconds,
+    "bytes": lambda profile: profile.clean_bytes,
+    "nested": lambda profile: profile.nested_decoded,
+    "values": lambda profile: profile.values,
+}
+
+
+@dataclass
+class PathProfile:
+    """The values, time, nested JSON strings and output bytes of a key path."""
+
+    values: int = 0
+    clean_seconds: float = 0.0
+    smudge_seconds: float = 0.0
+    nested_decoded: int = 0
+    nested_encoded: int = 0
+    clean_bytes: int = 0
+    smudge_bytes: int = 0
+
+    def add(self, other: "PathProfile") -> None:
+        """Add the totals of `other` (but not its values) to this profile."""
+        self.clean_seconds += other.clean_seconds
+        self.smudge_seconds += other.smudge_seconds
+        self.nested_decoded += other.nested_decoded
+        self.nested_encoded += other.nested_encoded
+        self.clean_bytes += other.clean_bytes
+        self.smudge_bytes += other.smudge_bytes
+
+
+def _utf8_size(text: str) -> int:
+    """Return the number of bytes of `text` in UTF-8."""
+    return len(text) if text.isascii() else len(text.encode("UTF-8"))
+
+
+def _members(
+    path: str, value: dict[str | int, JSONType] | list[JSONType], level: int
+) -> Iterator[tuple[str, str, str | None, JSONType, int]]:
+    """Yield the path, parent path, key, value and `level` of each member of `value`."""
+    if isinstance(value, list):
+        child = f"{path}[*]" if path != ROOT else "[*]"
+        yield from ((child, path, None, item, level) for item in value)
+        return
+    for key, item in value.items():
+        key_str = key if type(key) is str else _keystr(key)
+        child = key_str if path == ROOT else f"{path}.{key_str}"
+        yield child, path, key_str, item, level
+
+
+class _Traversal:
+    """
+    Walks a document like the indented encoder does, accounting for each key path.
+
+    The walk uses an explicit stack, like the encoder, so that deeply nested documents
+    don't hit the recursion limit. Each path's own totals are recorded first, and added
+    to those of its parents by `finish`.
+    """
+
+    def __init__(self) -> None:
+        self.profiles: dict[str, PathProfile] = {}
+        self.parents: dict[str, str] = {}
+
+    def profile(self, path: str, parent: str) -> PathProfile:
+        """Return the profile of `path`, creating it (below `parent`) if need be."""
+        profile = self.profiles.get(path)
+        if profile is None:
+            profile = self.profiles[path] = PathProfile()
+            if path != ROOT:
+                self.parents[path] = parent
+        return profile
+
+    def walk(
+        self,
+        json_data: JSONType,
+        indent: int,
+        *,
+        parse_string: Callable[[str], JSONType] | None = None,
+        embedded_json_keys: Collection[str] = frozenset(),
+    ) -> None:
+        """
+        Account for encoding `json_data`, cleaning it with `parse_string` or smudging.
+
+        Parameters
+        ----------
+        json_data : JSONType
+            The document to walk.
+        indent : int
+            The number of spaces that the output is indented with.
+        parse_string : Callable[[str], JSONType], optional
+            Called on every string inside of a `dict` or `list` when cleaning, like the
+            `parse_string` of the encoder.
+        embedded_json_keys : Collection[str], optional
+            Dictionary keys whose `dict` or `list` values are encoded as JSON strings
+            when smudging.
+        """
+        # The path of each value, the path of its parent, its key (if it is a member of
+        # a `dict`), the value itself, and its nesting level.
+        stack: list[tuple[str, str, str | None, JSONType, int]] = [
+            (ROOT, ROOT, None, json_data, 0)
+        ]
+        while stack:
+            path, parent, key, value, level = stack.pop()
+            profile = self.profile(path, parent)
+            if parse_string is not None:  # Count each value once, when cleaning.
+                profile.values += 1
+            # The key of a member is written before it, followed by `: `.
+            size = 0 if key is None else _utf8_size(encode_basestring(key)) + 2
+            if parse_string is not None and level and type(value) is str:
+                start = time.perf_counter()
+                parsed = parse_string(value)
+                profile.clean_seconds += time.perf_counter() - start
+                if parsed is not value:
+                    profile.nested_decoded += 1
+                    value = parsed
+
+            if (
+                key is not None
+                and key in embedded_json_keys
+                and isinstance(value, dict | list)
+            ):
+                start = time.perf_counter()
+                text = encode_basestring(_encode_compact(value))
+                profile.smudge_seconds += time.perf_counter() - start
+                profile.nested_encoded += 1
+                size += _utf8_size(text)
+            elif isinstance(value, dict | list) and value:
+                # The brackets, and the newline and indentation of each member, the
+                # separating commas, and the closing bracket.
+                count = len(value)
+                size += 2 + count * (1 + indent * (level + 1)) + (count - 1)
+                size += 1 + indent * level
+                stack.extend(_members(path, value, level + 1))
+            else:
+                size += _utf8_size(
+                    encode_basestring(value)
+                    if type(value) is str
+                    else _encode_scalar(value)
+                )
+
+            if parse_string is not None:
+                profile.clean_bytes += size
+            else:
+                profile.smudge_bytes += size
+
+    def finish(self) -> None:
+        """Add the totals of every path to those of its parents."""
+        # Paths are first seen after their parents, so this visits children first.
+        for path in reversed(self.profiles):
+            if path in self.parents:
+                self.profiles[self.parents[path]].add(self.profiles[path])
+
+
+def profile_json(
+    json_data: JSONType, indent: int = 2, *, schema_aware: bool = False
+) -> dict[str, PathProfile]:
+    """
+    Profile cleaning `json_data`, and smudging the result, per key path.
+
+    Parameters
+    ----------
+    json_data : JSONType
+        The document to profile, e.g. as Power BI saved it.
+    indent : int, default 2
+        The number of spaces that the clean output is indented with.
+    schema_aware : bool, default False
+        Whether to clean like `clean_json(..., schema_aware=True)`.
+
+    Returns
+    -------
+    dict of str to PathProfile
+        The profile of every key path, with list indices collapsed to `[*]`. The
+        totals of a path include everything below it, so those of `ROOT` are the
+        totals of the whole document.
+
+    Examples
+    --------
+    >>> profiles = profile_json({"pages": [{"config": '{"a": 1}'}, {"config": "x"}]})
+    >>> profiles["pages[*].config"].values, profiles["pages[*].config"].nested_decoded
+    (2, 1)
+    >>> profiles["pages[*].config.a"].clean_bytes  # i.e. `"a": 1`
+    6
+    """
+    json_data, parse_string = _clean_json_data(
+        json_data, sort_lists=False, schema_aware=schema_aware, low_memory=False
+    )
+    parse_string = parse_string or _parse_nested_json_string
+    traversal = _Traversal()
+    traversal.walk(json_data, indent, parse_string=parse_string)
+
+    # Smudge what cleaning produces. The walk doesn't keep the decoded values, so they
+    # are decoded again (without being timed) to get it.
+    cleaned = json.loads(
+        dumps_indented(json_data, indent=indent, parse_string=parse_string)
+    )
+    traversal.walk(cleaned, 2, embedded_json_keys=NESTED_JSON_KEYS)
+
+    traversal.finish()
+    return traversal.profiles
+
+
+def format_profile(
+    profiles: dict[str, PathProfile],
+    output_format: str = "human",
+    *,
+    sort: str = "time",
+    top: int | None = 25,
+) -> str:
+    """
+    Format the key paths of `profiles` as a table or as JSON, sorted by `sort`.
+
+    Parameters
+    ----------
+    profiles : dict of str to PathProfile
+        The profile of every key path, from `profile_json`.
+    output_format : {"human", "json"}, default "human"
+        Whether to format a table, or JSON.
+    sort : str, default "time"
+        The column to sort by, from the largest down: one of `SORT_KEYS`.
+    top : int or None, default 25
+        How many key paths to include, or `None` for all of them.
+
+    Returns
+    -------
+    str
+        The formatted profile.
+    """
+    paths = sorted(
+        profiles, key=lambda path: SORT_KEYS[sort](profiles[path]), reverse=True
+    )[:top]
+    if output_format == "json":
+        return json.dumps({path: asdict(profiles[path]) for path in paths}, indent=2)
+
+    header = [
+        "key path",
+        "values",
+        "clean ms",
+        "smudge ms",
+        "decoded",
+        "encoded",
+        "clean KB",
+        "smudge KB",
+    ]
+    rows = [header]
+    for path in paths:
+        profile = profiles[path]
+        rows.append(
+            [
+                path,
+                str(profile.values),
+                f"{profile.clean_seconds * 1000:.2f}",
+                f"{profile.smudge_seconds * 1000:.2f}",
+                str(profile.nested_decoded),
+                str(profile.nested_encoded),
+                f"{profile.clean_bytes / 1024:.1f}",
+                f"{profile.smudge_bytes / 1024:.1f}",
+            ]
+        )
+    widths = [max(map(len, column)) for column in zip(*rows, strict=True)]
+    return "\n".join(
+        "  ".join(
+            # The key paths are aligned left, and the numbers right.
+            cell.rjust(width) if column else cell.ljust(width)
+            for column, (cell, width) in enumerate(zip(row, widths, strict=True))
+        ).rstrip()
+        for row in rows
+    )
@@ -6,9 +6,14 @@ source for the command line utility `json-smudge`. Certain values are converted
 strings so they can be correctly loaded in Power BI.
 """
 
-import json
+from concurrent.futures import Executor
 
-from pbip_tools.type_aliases import JSONType
+from pbip_tools.json_encoder import dump_indented, dumps_indented
+from pbip_tools.split import dump_split
+from pbip_tools.type_aliases import JSONType, SupportsWrite
+
+# The keys whose values Power BI stores as JSON strings.
+NESTED_JSON_KEYS = frozenset({"config", "filters", "value", "parameters"})
 
 
 def smudge_json(json_data: JSONType) -> str:
@@ -44,51 +49,39 @@ def smudge_json(json_data: JSONType) -> str:
     - Any float with one decimal of precision is automatically assigned a zero in its
       hundredths place.
     """
+    # Convert the values of these keys back to JSON strings while the output is being
+    # written, in a single pass over the data.
+    return dumps_indented(json_data, indent=2, embedded_json_keys=NESTED_JSON_KEYS)
+
+
+def smudge_json_to(
+    json_data: JSONType,
+    fp: SupportsWrite[str] | SupportsWrite[bytes],
+    *,
+    executor: Executor | None = None,
+) -> None:
+    """
+    Smudge JSON data like `smudge_json`, writing the output to `fp` as it is encoded.
+
+    Parameters
+    ----------
+    json_data : JSONType
+        The JSON object to be smudged. It may be a list, dictionary, or `JSONPrimitive`.
+    fp : SupportsWrite[str] or SupportsWrite[bytes]
+        The text or binary file (or stream) to write the smudged JSON to. Binary
+        streams receive UTF-8.
+    executor : Executor, optional
+        A pool of worker processes to smudge the parts of a large file in, with
+        `pbip_tools.split.dump_split`. The output is the same.
 
-    def recursively_smudge_json(json_data_subset: JSONType) -> JSONType:
-        """
-        Recursively revert certain values JSON strings for Power BI compatibility.
-
-        Parameters
-        ----------
-        json_data_subset : JSONType
-            The subset of JSON data to be smudged.
-
-        Returns
-        -------
-        JSONType
-            The smudged subset of JSON data
-        """
-        # Define the keys that need to be converted to JSON strings
-        conditional_keys = {"config", "filters", "value", "parameters"}
-
-        if isinstance(json_data_subset, dict):
-            for key, value in json_data_subset.items():
-                if key in conditional_keys and isinstance(value, dict | list):
-                    # Convert these keys back to JSON strings
-                    json_data_subset[key] = json.dumps(
-                        value,
-                        ensure_ascii=False,
-                        indent=0,
-                        separators=(",", ":"),  # without trailing whitespace
-                        sort_keys=True,
-                    ).replace("\n", "")
-                else:
-                    # Recursively apply the smudge operation
-                    json_data_subset[key] = recursively_smudge_json(value)
-        elif isinstance(json_data_subset, list):
-            json_data_subset = [
-                recursively_smudge_json(item) for item in json_data_subset
-            ]
-
-        return json_data_subset
-
-    # Recursively smudge the data
-    json_data = recursively_smudge_json(json_data)
-
-    # Final post-processing
-    data_str = json.dumps(json_data, ensure_ascii=False, indent=2, sort_keys=True)
-    return data_str  # noqa: RET504: "Unnecessary assignment to `data_str` before `return` statement"
+    See Also
+    --------
+    smudge_json : Return the smudged JSON as a `str` instead.
+    """
+    if executor is None:
+        dump_indented(json_data, fp, indent=2, embedded_json_keys=NESTED_JSON_KEYS)
+    else:
+        dump_split(json_data, fp, executor, 2, embedded_json_keys=NESTED_JSON_KEYS)
 
 
 def main() -> int:
@@ -98,7 +91,7 @@ def main() -> int:
     return _run_main(
         tool_name="json-smudge",
         desc="Smudge PowerBI-generated JSON files that have been cleaned.",
-        filter_function=smudge_json,
+        filter_function=smudge_json_to,
     )
 
 
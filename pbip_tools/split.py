@@ -0,0 +1,266 @@
+"""
+Clean or smudge a single large JSON document in several processes.
+
+With `--jobs`, each file is processed by one worker process, so a huge `report.json`
+with hundreds of pages would still be cleaned on a single core. Its pages are
+independent of each other, though, and so are the visual containers of each page: how
+one is cleaned (or smudged) never depends on another. `dump_split` cuts a document into
+such parts, the items of its lists, and encodes each of them in a worker process at the
+nesting level where it belongs. The rest of the document, its skeleton, is encoded in
+the calling process, with a marker string in place of each part, and the outputs of
+the parts are written in place of the markers. The output is identical to that of
+`dump_indented`.
+
+Parts are found by walking the document through its dictionaries (but not into the
+keys whose values are embedded as JSON strings, when smudging) down to its lists,
+e.g. `sections` in a `report.json`, or `tables` in a `model.bim`. The non-empty
+dictionaries and lists in those lists are the parts. When there are too few of them
+to keep the workers busy, each part is split again in the same way, e.g. into the
+visual containers of each page.
+
+Attributes
+----------
+SPLIT_SIZE : int
+    The size in bytes from which a file is split across the worker processes of
+    `--jobs`. Below it, the cost of sending the parts to the workers and their outputs
+    back isn't worth it.
+"""
+
+import os
+import re
+import secrets
+from collections.abc import Callable, Collection, Sequence
+from concurrent.futures import Executor, Future
+from json.encoder import encode_basestring
+from typing import Any, TypeAlias
+
+from pbip_tools.json_encoder import _make_indented_encoder, _text_writer, dump_indented
+from pbip_tools.type_aliases import JSONType, SupportsWrite
+
+SPLIT_SIZE = 4 * 1024**2
+
+# How many tasks the parts are spread over, per CPU core, so that the workers stay
+# busy even though some parts take longer than others.
+_TASKS_PER_CPU = 4
+
+# The dictionary keys and list positions from the document down to a part.
+_Path: TypeAlias = tuple[str | int, ...]
+# Builds the `parse_string` of a part in the worker, from the part and its path.
+PartParser: TypeAlias = Callable[[JSONType, _Path], Callable[[str], Any] | None]
+
+
+def _value_at(json_data: JSONType, path: _Path) -> JSONType:
+    """Return the value at `path` in `json_data`."""
+    for key in path:
+        json_data = json_data[key]  # type: ignore[index]
+    return json_data
+
+
+def _subparts(
+    value: JSONType, path: _Path, embedded_json_keys: Collection[str]
+) -> list[_Path]:
+    """
+    Return the paths of the parts that `value`, at `path`, can be split into.
+
+    Examples
+    --------
+    >>> report = {"config": "{}", "sections": [{"a": [1]}, {}, {"b": 2}]}
+    >>> _subparts(report, (), frozenset())
+    [('sections', 0), ('sections', 2)]
+    >>> _subparts({"config": [{"a": 1}]}, (), frozenset({"config"}))
+    []
+    """
+    if isinstance(value, list | tuple):
+        return [
+            (*path, position)
+            for position, item in enumerate(value)
+            if isinstance(item, dict | list | tuple) and item
+        ]
+    if isinstance(value, dict):
+        return [
+            subpart
+            for key, item in value.items()
+            if key not in embedded_json_keys
+            for subpart in _subparts(item, (*path, key), embedded_json_keys)
+        ]
+    return []
+
+
+def find_parts(
+    json_data: JSONType, min_parts: int, embedded_json_keys: Collection[str] = ()
+) -> list[_Path]:
+    """
+    Return the paths of the parts to encode separately, in the order of the output.
+
+    Parts are split again as long as there are fewer than `min_parts` of them, and any
+    of them can be split. If the document can't be split at all, the only part is the
+    document itself, at the empty path.
+
+    Examples
+    --------
+    >>> report = {"sections": [{"visualContainers": [{"x": 1}, {"x": 2}]}, {"y": 1}]}
+    >>> find_parts(report, 2)
+    [('sections', 0), ('sections', 1)]
+    >>> find_parts(report, 3)  # doctest: +NORMALIZE_WHITESPACE
+    [('sections', 0, 'visualContainers', 0), ('sections', 0, 'visualContainers', 1),
+     ('sections', 1)]
+    """
+    parts: list[_Path] = [()]
+    while len(parts) < min_parts:
+        split_parts = [
+            subpart
+            for path in parts
+            for subpart in (
+                _subparts(_value_at(json_data, path), path, embedded_json_keys)
+                or [path]
+            )
+        ]
+        if split_parts == parts:
+            break
+        parts = split_parts
+    # Sibling keys (or list positions) all have the same type, so sorting the paths
+    # puts them in the order of the output, whose keys are sorted. The parts that are
+    # written first are then encoded first.
+    return sorted(parts)
+
+
+def _skeleton(
+    json_data: JSONType, parts: Sequence[_Path], markers: list[str]
+) -> JSONType:
+    """
+    Return a copy of `json_data` with the value at each path of `parts` replaced.
+
+    Only the dictionaries and lists along the paths are copied, shallowly, and
+    `json_data` itself is left as it is.
+    """
+    copies: dict[_Path, Any] = {}
+
+    def copy_of(path: _Path) -> Any:  # noqa: ANN401
+        if path not in copies:
+            original = _value_at(json_data, path)
+            copies[path] = (
+                dict(original) if isinstance(original, dict) else list(original)  # type: ignore[arg-type]
+            )
+            if path:
+                copy_of(path[:-1])[path[-1]] = copies[path]
+        return copies[path]
+
+    for path, marker in zip(parts, markers, strict=True):
+        copy_of(path[:-1])[path[-1]] = marker
+    return copy_of(())
+
+
+def _encode_parts(
+    parts: list[tuple[JSONType, _Path]],
+    indent: int,
+    embedded_json_keys: Collection[str],
+    part_parser: PartParser | None,
+) -> list[str]:
+    """Encode each part at the nesting level of its path, in a worker process."""
+    outputs = []
+    for part, path in parts:
+        chunks: list[str] = []
+        parse_string = part_parser(part, path) if part_parser else None
+        encode = _make_indented_encoder(
+            indent, chunks.append, embedded_json_keys, parse_string=parse_string
+        )
+        encode(part, len(path))
+        outputs.append("".join(chunks))
+    return outputs
+
+
+def dump_split(  # noqa: PLR0913
+    json_data: JSONType,
+    fp: SupportsWrite[str] | SupportsWrite[bytes],
+    executor: Executor,
+    indent: int = 2,
+    *,
+    embedded_json_keys: Collection[str] = frozenset(),
+    parse_string: Callable[[str], Any] | None = None,
+    part_parser: PartParser | None = None,
+) -> None:
+    """
+    Serialize `json_data` like `dump_indented`, encoding its parts with `executor`.
+
+    Parameters
+    ----------
+    json_data : JSONType
+        The JSON data to serialize.
+    fp : SupportsWrite[str] or SupportsWrite[bytes]
+        The text or binary stream to write to, as in `dump_indented`.
+    executor : Executor
+        The pool of worker processes to encode the parts in, e.g. a
+        `ProcessPoolExecutor`.
+    indent : int, default 2
+        The number of spaces to indent each nesting level with.
+    embedded_json_keys : Collection[str], optional
+        Dictionary keys whose `dict` or `list` values are written as compact JSON
+        strings, as in `dump_indented`.
+    parse_string : Callable[[str], Any], optional
+        Called on every nested string of the skeleton to return the value to write in
+        its place, as in `dump_indented`. Strings that can't be JSON must be returned
+        unchanged, as `clean_json` does.
+    part_parser : Callable[[JSONType, tuple], Callable[[str], Any] or None], optional
+        Called in the worker with each part and its path, to return the
+        `parse_string` of the part, if any. It must be picklable.
+
+    Notes
+    -----
+    The outputs of the parts are kept in memory until they are written, unlike the
+    output of `dump_indented`. Statistics on nested JSON strings (see
+    `pbip_tools.stats`) only cover the skeleton.
+    """
+    tasks = _TASKS_PER_CPU * (os.cpu_count() or 1)
+    parts = find_parts(json_data, tasks, embedded_json_keys)
+    if len(parts) <= 1:
+        dump_indented(
+            json_data,
+            fp,
+            indent,
+            embedded_json_keys=embedded_json_keys,
+            parse_string=parse_string,
+        )
+        return
+
+    # Markers can't be JSON, so `parse_string` returns them unchanged. The token makes
+    # sure that no string of the document is taken for one.
+    token = secrets.token_hex(8)
+    markers = [f"\0{token}:{number}\0" for number in range(len(parts))]
+    marker_pattern = re.compile(
+        re.escape(encode_basestring(f"\0{token}:")[:-1])
+        + r"(\d+)"
+        + re.escape(encode_basestring("\0")[1:])
+    )
+
+    per_task = -(-len(parts) // tasks)
+    futures: list[Future[list[str]]] = [
+        executor.submit(
+            _encode_parts,
+            [
+                (_value_at(json_data, path), path)
+                for path in parts[start : start + per_task]
+            ],
+            indent,
+            embedded_json_keys,
+            part_parser,
+        )
+        for start in range(0, len(parts), per_task)
+    ]
+    try:
+        chunks: list[str] = []
+        encode = _make_indented_encoder(
+            indent, chunks.append, embedded_json_keys, parse_string=parse_string
+        )
+        encode(_skeleton(json_data, parts, markers), 0)
+        pieces = marker_pattern.split("".join(chunks))
+        del chunks
+
+        write = _text_writer(fp)
+        write(pieces[0])
+        for number, piece in zip(pieces[1::2], pieces[2::2], strict=True):
+            task, position = divmod(int(number), per_task)
+            write(futures[task].result()[position])
+            write(piece)
+    finally:
+        for future in futures:
+            future.cancel()
@@ -0,0 +1,284 @@
+"""
+Per-file statistics for the `--stats` option of the CLI.
+
+Nothing is measured unless statistics are collected for a file with `collect_stats`.
+The filters only check whether `nested_json` is enabled once per file (or encoder),
+rather than once per value, so that statistics cost close to nothing when they are off.
+
+Attributes
+----------
+nested_json : NestedJSONCounters
+    Counts and times the nested JSON strings that are decoded (by `clean`) or encoded
+    (by `smudge`) while collecting statistics.
+parse_counts : Counter[str]
+    How often `clean` skipped `json.loads` on a string that can't be JSON ("avoided"),
+    parsed a string ("parsed"), and tried to but found it wasn't JSON after all
+    ("not_json"). These are always counted, since counting costs next to nothing.
+"""
+
+import json
+import time
+from collections import Counter
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import TypeVar
+
+from pbip_tools.memo import nested_json_memo
+from pbip_tools.type_aliases import SupportsWrite
+
+_T = TypeVar("_T")
+_R = TypeVar("_R")
+
+# How many of the slowest files to list at the end of the statistics.
+_SLOWEST_FILES = 5
+
+
+@dataclass
+class FileStats:
+    """
+    The sizes, phase timings (in seconds), and nested JSON counts of a single file.
+
+    The phases are reading the file, parsing it, transforming it (i.e. decoding or
+    encoding its nested JSON strings), serializing the output, and writing it. With
+    `--stream`, the file is parsed while it is serialized, so parsing counts as the
+    latter. The memo hits and misses are those of `nested_json_memo` while cleaning,
+    and the parses avoided and failed are the "avoided" and "not_json" `parse_counts`.
+    """
+
+    file: str
+    status: str = ""
+    bytes_in: int = 0
+    bytes_out: int = 0
+    read: float = 0.0
+    parse: float = 0.0
+    transform: float = 0.0
+    serialize: float = 0.0
+    write: float = 0.0
+    nested_strings: int = 0
+    max_depth: int = 0
+    memo_hits: int = 0
+    memo_misses: int = 0
+    parses_avoided: int = 0
+    parses_failed: int = 0
+
+    @property
+    def total(self) -> float:
+        """The total time taken by the file, in seconds."""
+        return self.read + self.parse + self.transform + self.serialize + self.write
+
+
+class NestedJSONCounters:
+    """
+    Counts and times the nested JSON strings that are decoded or encoded.
+
+    Also keeps track of the deepest nesting level that was serialized.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.reset()
+
+    def reset(self) -> None:
+        """Set all counts back to zero."""
+        self.count = 0
+        self.seconds = 0.0
+        self.max_depth = 0
+
+    def timed(self, function: Callable[[_T], _R]) -> Callable[[_T], _R]:
+        """
+        Wrap `function`, which decodes or encodes a nested JSON string, to time it.
+
+        Calls that return their argument unchanged (e.g. a string that isn't JSON) are
+        timed, but not counted.
+        """
+
+        def timed_function(value: _T) -> _R:
+            start = time.perf_counter()
+            result = function(value)
+            self.seconds += time.perf_counter() - start
+            if result is not value:
+                self.count += 1
+            return result
+
+        return timed_function
+
+
+nested_json = NestedJSONCounters()
+parse_counts: Counter[str] = Counter()
+
+
+@contextmanager
+def collect_stats(stats: FileStats) -> Iterator[None]:
+    """Enable `nested_json` while the file of `stats` is processed, and record it."""
+    nested_json.reset()
+    nested_json.enabled = True
+    hits, misses = nested_json_memo.hits, nested_json_memo.misses
+    avoided, failed = parse_counts["avoided"], parse_counts["not_json"]
+    try:
+        yield
+    finally:
+        nested_json.enabled = False
+        # Nested strings are decoded or encoded while the output is serialized.
+        stats.serialize -= nested_json.seconds
+        stats.transform += nested_json.seconds
+        stats.nested_strings = nested_json.count
+        stats.max_depth = nested_json.max_depth
+        stats.memo_hits = nested_json_memo.hits - hits
+        stats.memo_misses = nested_json_memo.misses - misses
+        stats.parses_avoided = parse_counts["avoided"] - avoided
+        stats.parses_failed = parse_counts["not_json"] - failed
+
+
+class PhaseTimer:
+    """Adds the time since the previous lap to a phase of `stats`, if there are any."""
+
+    def __init__(self, stats: FileStats | None) -> None:
+        self._stats = stats
+        self._start = time.perf_counter()
+
+    def lap(self, phase: str) -> None:
+        """Add the time since the previous lap (or the start) to `phase`."""
+        now = time.perf_counter()
+        if self._stats is not None:
+            setattr(self._stats, phase, getattr(self._stats, phase) + now - self._start)
+        self._start = now
+
+
+class TimedWriter:
+    """
+    Text stream that writes to `stream`, counting the time and the UTF-8 bytes written.
+
+    Parameters
+    ----------
+    stream : SupportsWrite[str]
+        The text stream to write to.
+    """
+
+    def __init__(self, stream: SupportsWrite[str]) -> None:
+        self._stream = stream
+        self.bytes = 0
+        self.seconds = 0.0
+
+    def write(self, text: str) -> int:
+        """Write `text` to the stream."""
+        start = time.perf_counter()
+        self._stream.write(text)
+        self.seconds += time.perf_counter() - start
+        self.bytes += len(text) if text.isascii() else len(text.encode("UTF-8"))
+        return len(text)
+
+    def record(self, stats: FileStats) -> None:
+        """Move the time spent writing from serializing to writing in `stats`."""
+        stats.serialize -= self.seconds
+        stats.write += self.seconds
+        stats.bytes_out += self.bytes
+
+
+def format_stats(all_stats: list[FileStats], seconds: float, output_format: str) -> str:
+    """
+    Format the statistics of all files as a table or as JSON.
+
+    Parameters
+    ----------
+    all_stats : list of FileStats
+        The statistics of each file.
+    seconds : float
+        The wall-clock time of the whole run (which processes files in parallel with
+        `--jobs`).
+    output_format : {"human", "json"}
+        Whether to format a table, or JSON.
+
+    Returns
+    -------
+    str
+        The formatted statistics, ending with the totals and the slowest files.
+
+    Examples
+    --------
+    >>> stats = FileStats("a.json", "rewritten", 2_000_000, 4_000_000, parse=0.5)
+    >>> print(format_stats([stats], 1.0, "human"))  # doctest: +NORMALIZE_WHITESPACE
+    file    status      in KB  out KB  read ms  parse ms  transform ms  serialize ms
+        write ms  nested  depth
+    a.json  rewritten  1953.1  3906.2      0.0     500.0           0.0           0.0
+             0.0       0      0
+    1 file, 1.9 MB in, 3.8 MB out in 1.00 s: 1.9 MB/s.
+    Slowest: a.json (500.0 ms).
+    """
+    bytes_in = sum(stats.bytes_in for stats in all_stats)
+    bytes_out = sum(stats.bytes_out for stats in all_stats)
+    slowest = sorted(all_stats, key=lambda stats: stats.total, reverse=True)
+    slowest = slowest[:_SLOWEST_FILES]
+    mb_per_second = bytes_in / 1024**2 / seconds if seconds else 0.0
+    memo_hits = sum(stats.memo_hits for stats in all_stats)
+    memo_misses = sum(stats.memo_misses for stats in all_stats)
+    parses_avoided = sum(stats.parses_avoided for stats in all_stats)
+    parses_failed = sum(stats.parses_failed for stats in all_stats)
+
+    if output_format == "json":
+        totals = {
+            "files": len(all_stats),
+            "bytes_in": bytes_in,
+            "bytes_out": bytes_out,
+            "seconds": seconds,
+            "mb_per_second": mb_per_second,
+            "memo_hits": memo_hits,
+            "memo_misses": memo_misses,
+            "parses_avoided": parses_avoided,
+            "parses_failed": parses_failed,
+        }
+        return json.dumps(
+            {
+                "files": [asdict(stats) for stats in all_stats],
+                "totals": totals,
+                "slowest": [stats.file for stats in slowest],
+            },
+            indent=2,
+        )
+
+    header = ["file", "status", "in KB", "out KB"]
+    phases = ["read", "parse", "transform", "serialize", "write"]
+    rows = [header + [f"{phase} ms" for phase in phases] + ["nested", "depth"]]
+    rows.extend(
+        [
+            stats.file,
+            stats.status,
+            f"{stats.bytes_in / 1024:.1f}",
+            f"{stats.bytes_out / 1024:.1f}",
+            *(f"{getattr(stats, phase) * 1000:.1f}" for phase in phases),
+            str(stats.nested_strings),
+            str(stats.max_depth),
+        ]
+        for stats in all_stats
+    )
+    widths = [max(map(len, column)) for column in zip(*rows, strict=True)]
+    lines = [
+        "  ".join(
+            # The file and status are aligned left, and the numbers right.
+            cell.ljust(width) if column < 2 else cell.rjust(width)  # noqa: PLR2004
+            for column, (cell, width) in enumerate(zip(row, widths, strict=True))
+        ).rstrip()
+        for row in rows
+    ]
+    files = f"{len(all_stats)} file{'' if len(all_stats) == 1 else 's'}"
+    lines.append(
+        f"{files}, {bytes_in / 1024**2:.1f} MB in, {bytes_out / 1024**2:.1f} MB out"
+        f" in {seconds:.2f} s: {mb_per_second:.1f} MB/s."
+    )
+    if slowest:
+        slowest_files = ", ".join(
+            f"{stats.file} ({stats.total * 1000:.1f} ms)" for stats in slowest
+        )
+        lines.append(f"Slowest: {slowest_files}.")
+    if memo_hits or memo_misses:
+        hit_rate = memo_hits / (memo_hits + memo_misses)
+        lines.append(
+            f"Nested JSON memo: {memo_hits} hits, {memo_misses} misses"
+            f" ({hit_rate:.0%} hit rate)."
+        )
+    if parses_avoided or parses_failed:
+        lines.append(
+            f"Nested JSON parses: {parses_avoided} avoided, {parses_failed} failed"
+            " (not JSON)."
+        )
+    return "\n".join(lines)
@@ -0,0 +1,366 @@
+"""
+Clean and smudge very large JSON files in bounded memory.
+
+`clean_json` and `smudge_json` need the whole document as Python objects, which takes
+several times the size of the file itself. The functions here instead work on the raw
+bytes of the document (typically a memory-mapped file), and never parse more than a
+small piece of it at a time:
+
+- A `dict` or `list` larger than `LOAD_SIZE` bytes is scanned for the positions of its
+  members, without parsing them. The members are then filtered one at a time, in
+  sorted key order, and written out as soon as each is done.
+- Anything smaller, as well as every string, is parsed on its own and run through the
+  regular in-memory filter.
+- When smudging, a large `dict` or `list` that is written as a JSON string (e.g. a
+  `config`) is scanned in the same way, and its compact JSON is written piece by piece.
+
+Memory use is thus bounded by the nesting depth of the large containers (plus the keys
+of each large `dict`), `LOAD_SIZE`, and the largest single string, rather than by the
+size of the file. When cleaning, that includes the JSON data of the largest nested JSON
+string, which is parsed as a whole, like any string. The output is identical to that of
+`clean_json` and `smudge_json`.
+
+Attributes
+----------
+LOAD_SIZE : int
+    The size in bytes up to which a `dict` or `list` is parsed in one go.
+"""
+
+import itertools
+import json
+import mmap
+import re
+from collections.abc import Callable, Iterator
+from functools import partial
+from json.encoder import encode_basestring
+from typing import Any, TypeAlias, cast
+
+from pbip_tools.clean.clean_JSON import _parse_nested_json_string
+from pbip_tools.json_encoder import _encode_compact, _make_stream_encoder
+from pbip_tools.smudge.smudge_JSON import NESTED_JSON_KEYS
+from pbip_tools.stats import nested_json
+from pbip_tools.type_aliases import JSONType, SupportsWrite
+
+LOAD_SIZE = 1024**2  # 1 MiB
+
+# The raw bytes of a JSON document, e.g. a `bytes` object or a memory-mapped file.
+Source: TypeAlias = bytes | mmap.mmap
+
+_WHITESPACE = re.compile(rb"[ \t\n\r]*")
+_STRING = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"')
+_SCALAR = re.compile(rb'[^ \t\n\r,:\[\]{}"]+')
+# A lone `"` only matches where a string is never closed.
+_STRING_OR_BRACKET = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"|[\[\]{}]|"')
+_OPENING_TO_CLOSING = {ord("{"): ord("}"), ord("["): ord("]")}
+
+
+def _skip_whitespace(source: Source, position: int) -> int:
+    """Return the position of the first non-whitespace byte from `position` on."""
+    return _WHITESPACE.match(source, position).end()  # type: ignore[union-attr]
+
+
+def _value_end(source: Source, start: int) -> int:
+    """
+    Find the end of the JSON value starting at `start`, without parsing it.
+
+    Only strings and brackets are checked on the way, so a malformed value may go
+    unnoticed here. It is caught once the value itself is parsed, or scanned with
+    `_iter_members`.
+
+    Raises
+    ------
+    ValueError
+        If there is no value at `start`, or its strings or brackets are unbalanced.
+    """
+    first = source[start : start + 1]
+    if first in (b"{", b"["):
+        return _container_end(source, start)
+    if match := (_STRING if first == b'"' else _SCALAR).match(source, start):
+        return match.end()
+    msg = f"Expecting value at byte {start}"
+    raise ValueError(msg)
+
+
+def _container_end(source: Source, start: int) -> int:
+    """Find the end of the `dict` or `list` starting at `start`, like `_value_end`."""
+    expected_closing = []
+    for match in _STRING_OR_BRACKET.finditer(source, start):
+        char = source[match.start()]
+        if char in _OPENING_TO_CLOSING:
+            expected_closing.append(_OPENING_TO_CLOSING[char])
+        elif char == ord('"'):
+            if match.end() - match.start() == 1:
+                break  # An unterminated string.
+            continue
+        elif not expected_closing or expected_closing.pop() != char:
+            msg = f"Mismatched bracket at byte {match.start()}"
+            raise ValueError(msg)
+        if not expected_closing:
+            return match.end()
+    msg = f"Unterminated container starting at byte {start}"
+    raise ValueError(msg)
+
+
+def _iter_members(source: Source, start: int) -> Iterator[tuple[str | int, int, int]]:
+    """
+    Scan the `dict` or `list` starting at `start` for the positions of its members.
+
+    Yields
+    ------
+    str or int
+        The key of the member of a `dict`, or the index of an item of a `list`.
+    int
+        The position where the member's value starts.
+    int
+        The position where the member's value ends.
+
+    Raises
+    ------
+    ValueError
+        If the `dict` or `list` is malformed.
+    """
+    is_dict = source[start] == ord("{")
+    closing = b"}" if is_dict else b"]"
+    position = _skip_whitespace(source, start + 1)
+    if source[position : position + 1] == closing:
+        return
+    for index in itertools.count():
+        key: str | int = index
+        if is_dict:
+            if not (match := _STRING.match(source, position)):
+                msg = f"Expecting property name at byte {position}"
+                raise ValueError(msg)
+            key = json.loads(match.group())
+            position = _skip_whitespace(source, match.end())
+            if source[position : position + 1] != b":":
+                msg = f"Expecting ':' delimiter at byte {position}"
+                raise ValueError(msg)
+            position = _skip_whitespace(source, position + 1)
+
+        end = _value_end(source, position)
+        yield key, position, end
+
+        position = _skip_whitespace(source, end)
+        delimiter = source[position : position + 1]
+        if delimiter == closing:
+            return
+        if delimiter != b",":
+            msg = f"Expecting ',' delimiter at byte {position}"
+            raise ValueError(msg)
+        position = _skip_whitespace(source, position + 1)
+
+
+def _iter_members_in_output_order(
+    source: Source, start: int
+) -> Iterator[tuple[str | int, int, int]]:
+    """
+    Scan a `dict` or `list` like `_iter_members`, with the keys of a `dict` sorted.
+
+    Like `json.loads`, only the last of any duplicate keys is kept.
+    """
+    members = _iter_members(source, start)
+    if source[start] != ord("{"):
+        return members
+    spans = {cast("str", key): (start, end) for key, start, end in members}
+    return ((key, *spans[key]) for key in sorted(spans))
+
+
+def _stream_filter(  # noqa: C901, PLR0913, PLR0915
+    source: Source,
+    fp: SupportsWrite[str] | SupportsWrite[bytes],
+    load: Callable[[bytes], JSONType],
+    *,
+    indent: int,
+    embedded_json_keys: frozenset[str] = frozenset(),
+    parse_string: Callable[[str], Any] | None = None,
+) -> None:
+    """
+    Filter the JSON document in `source` piece by piece, writing the output to `fp`.
+
+    Parameters
+    ----------
+    source : Source
+        The raw bytes of the JSON document.
+    fp : SupportsWrite[str] or SupportsWrite[bytes]
+        The text or binary stream to write to.
+    load : Callable[[bytes], JSONType]
+        Parses a piece of `source`, e.g. `json.loads`.
+    indent : int
+        The number of spaces to indent each nesting level with.
+    embedded_json_keys : frozenset of str, optional
+        Dictionary keys whose `dict` or `list` values are written as compact JSON
+        strings.
+    parse_string : Callable[[str], Any], optional
+        Called on every string inside of a `dict` or `list`, to return the value to
+        write in its place.
+    """
+    encode_compact: Callable[[Any], str] = _encode_compact
+    if nested_json.enabled:
+        encode_compact = nested_json.timed(_encode_compact)
+        if parse_string is not None:
+            parse_string = nested_json.timed(parse_string)
+    encode, append, write_pending = _make_stream_encoder(
+        fp, indent, embedded_json_keys, parse_string
+    )
+    indent_str = " " * indent
+
+    def write_value(start: int, end: int, level: int, key: str | int | None) -> None:
+        large = end - start > LOAD_SIZE and source[start] in _OPENING_TO_CLOSING
+        if isinstance(key, str) and key in embedded_json_keys:
+            if large:
+                append('"')
+                write_embedded_container(start)
+                append('"')
+                return
+            # Small enough: it is written as a single (JSON) string anyway.
+            value = load(source[start:end])
+            if isinstance(value, dict | list):
+                append(encode_basestring(encode_compact(value)))
+                return
+        elif not large:
+            value = load(source[start:end])
+        else:
+            write_container(start, level)
+            return
+        if key is not None and parse_string is not None and isinstance(value, str):
+            value = parse_string(value)
+        encode(value, level)
+        write_pending()
+
+    def write_container(start: int, level: int) -> None:
+        opening, closing = ("{", "}") if source[start] == ord("{") else ("[", "]")
+        newline = "\n" + indent_str * (level + 1)
+        separator = opening + newline
+        for key, member_start, member_end in _iter_members_in_output_order(
+            source, start
+        ):
+            append(separator)
+            separator = "," + newline
+            if opening == "{":
+                append(encode_basestring(cast("str", key)) + ": ")
+            write_value(member_start, member_end, level + 1, key)
+
+        if separator == opening + newline:  # There were no members at all.
+            append(opening + closing)
+        else:
+            append("\n" + indent_str * level + closing)
+
+    def write_embedded_container(start: int) -> None:
+        # The compact JSON of the `dict` or `list`, escaped as the inside of a string,
+        # which is the same for its pieces as for the whole.
+        opening, closing = ("{", "}") if source[start] == ord("{") else ("[", "]")
+        separator = opening
+        for key, member_start, member_end in _iter_members_in_output_order(
+            source, start
+        ):
+            if opening == "{":
+                separator += encode_basestring(cast("str", key)) + ":"
+            append(encode_basestring(separator)[1:-1])
+            separator = ","
+            if (
+                member_end - member_start > LOAD_SIZE
+                and source[member_start] in _OPENING_TO_CLOSING
+            ):
+                write_embedded_container(member_start)
+            else:
+                value = load(source[member_start:member_end])
+                append(encode_basestring(encode_compact(value))[1:-1])
+                write_pending()
+        append(
+            encode_basestring(opening + closing if separator == opening else closing)[
+                1:-1
+            ]
+        )
+
+    start = _skip_whitespace(source, 0)
+    end = _value_end(source, start)
+    if _skip_whitespace(source, end) != len(source):
+        msg = f"Extra data at byte {end}"
+        raise ValueError(msg)
+    write_value(start, end, 0, None)
+    write_pending(force=True)
+
+
+def clean_json_stream(
+    source: Source,
+    fp: SupportsWrite[str] | SupportsWrite[bytes],
+    indent: int = 2,
+    *,
+    parse_constant: Callable[[str], Any] | None = None,
+) -> None:
+    """
+    Clean the JSON document in `source` like `clean_json`, in bounded memory.
+
+    Parameters
+    ----------
+    source : bytes or mmap.mmap
+        The raw UTF-8 bytes of the JSON document, e.g. a memory-mapped file.
+    fp : SupportsWrite[str] or SupportsWrite[bytes]
+        The text or binary stream to write the cleaned JSON to.
+    indent : int, default 2
+        The number of spaces to indent each nesting level with.
+    parse_constant : Callable[[str], Any], optional
+        Passed on to `json.loads`, e.g. `str` to keep `NaN` as a string like the CLI.
+
+    Raises
+    ------
+    ValueError
+        If `source` isn't valid JSON.
+
+    See Also
+    --------
+    clean_json_to : Clean JSON data that is already loaded.
+
+    Notes
+    -----
+    Lists can't be sorted in bounded memory, so there is no `sort_lists` option.
+
+    Examples
+    --------
+    >>> import io
+    >>> stream = io.StringIO()
+    >>> clean_json_stream(b'{"b": "[1, 2]", "a": null}', stream, indent=1)
+    >>> print(stream.getvalue())
+    {
+     "a": null,
+     "b": [
+      1,
+      2
+     ]
+    }
+    """
+    load = partial(json.loads, parse_constant=parse_constant)
+    _stream_filter(
+        source, fp, load, indent=indent, parse_string=_parse_nested_json_string
+    )
+
+
+def smudge_json_stream(
+    source: Source,
+    fp: SupportsWrite[str] | SupportsWrite[bytes],
+    *,
+    parse_constant: Callable[[str], Any] | None = None,
+) -> None:
+    """
+    Smudge the JSON document in `source` like `smudge_json`, in bounded memory.
+
+    Parameters
+    ----------
+    source : bytes or mmap.mmap
+        The raw UTF-8 bytes of the JSON document, e.g. a memory-mapped file.
+    fp : SupportsWrite[str] or SupportsWrite[bytes]
+        The text or binary stream to write the smudged JSON to.
+    parse_constant : Callable[[str], Any], optional
+        Passed on to `json.loads`, e.g. `str` to keep `NaN` as a string like the CLI.
+
+    Raises
+    ------
+    ValueError
+        If `source` isn't valid JSON.
+
+    See Also
+    --------
+    smudge_json_to : Smudge JSON data that is already loaded.
+    """
+    load = partial(json.loads, parse_constant=parse_constant)
+    _stream_filter(source, fp, load, indent=2, embedded_json_keys=NESTED_JSON_KEYS)
@@ -9,15 +9,26 @@ JSONType : TypeAlias
     Represents the recursive structure of a JSON object.
 PathLike : TypeAlias
     Represents file system paths, but behaves a little nicer than `os.PathLike`.
+SupportsWrite : Protocol
+    Represents anything with a `write` method, like a text or binary file.
 """
 
 # (Attempt to) define type aliases for JSON data...
 import os
 from pathlib import Path
-from typing import Any, TypeAlias
+from typing import Any, Protocol, TypeAlias, TypeVar
 
 JSONPrimitive: TypeAlias = str | int | float | bool | None
 JSONType: TypeAlias = dict[str | int, "JSONType"] | list["JSONType"] | JSONPrimitive
 
 # A custom "PathLike" type alias (that works as expected...)
 PathLike: TypeAlias = str | Path | os.PathLike[Any]
+
+_T_contra = TypeVar("_T_contra", contravariant=True)
+
+
+class SupportsWrite(Protocol[_T_contra]):
+    """A stream that can be written to, e.g. `SupportsWrite[str]` for a text file."""
+
+    def write(self, data: _T_contra, /) -> object:
+        """Write `data` to the stream."""
@@ -0,0 +1,358 @@
+"""
+Clean a Power BI project continuously, as Power BI Desktop saves it.
+
+`pbip-tools watch` cleans every file of the projects and directories it is given, and
+then waits for them to change. Power BI Desktop rewrites several files on every save,
+so changes are collected until none have come in for a short while (the debounce
+interval), and then only the files whose content hash changed are cleaned again.
+
+Changes are detected with inotify on Linux, and by polling the size and modification
+time of every file elsewhere (or when inotify is unavailable). The hash of each file is
+recorded after it is cleaned, so the events caused by the watcher's own writes are
+ignored. (Cleaning is idempotent as well, so they couldn't cause a loop anyway.)
+"""
+
+import ctypes
+import ctypes.util
+import hashlib
+import os
+import select
+import struct
+import sys
+import time
+from collections.abc import Callable, Generator, Iterable, Iterator
+from functools import partial
+from pathlib import Path
+
+from pbip_tools.cache import ResultCache
+from pbip_tools.discovery import (
+    _project_directories,
+    find_files,
+    is_json_artifact,
+    is_skipped_directory,
+    walk_directory,
+)
+from pbip_tools.json_utils import (
+    FileStatus,
+    _process_and_save_json_file,
+    _with_plain_func,
+)
+from pbip_tools.type_aliases import JSONType, SupportsWrite
+
+# The inotify events of interest (see `inotify(7)`), and the flags of its events.
+_IN_CLOSE_WRITE = 0x8
+_IN_MOVED_FROM = 0x40
+_IN_MOVED_TO = 0x80
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_IN_Q_OVERFLOW = 0x4000
+_IN_IGNORED = 0x8000
+_IN_ISDIR = 0x40000000
+_WATCH_MASK = _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+# The header of an inotify event: its watch descriptor, mask, cookie and name length.
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def _watched_directories(directories_or_projects: Iterable[str]) -> list[str]:
+    """Return the directories to watch for the directories and `.pbip` files given."""
+    directories: list[str] = []
+    for directory_or_project in directories_or_projects:
+        path = Path(directory_or_project)
+        if path.suffix == ".pbip" and path.is_file():
+            directories.extend(map(str, _project_directories(path)))
+        else:
+            directories.append(directory_or_project)
+    return [os.path.abspath(directory) for directory in directories]  # noqa: PTH100
+
+
+class _PollingMonitor:
+    """
+    Finds the files that changed by comparing the size and modification time of each.
+
+    Parameters
+    ----------
+    directories : list of str
+        The directories to watch, including their subdirectories.
+    interval : float
+        The number of seconds between two scans of all files.
+    """
+
+    def __init__(self, directories: list[str], interval: float) -> None:
+        self._directories = directories
+        self._interval = interval
+        self._snapshot = self._scan()
+
+    def _scan(self) -> dict[str, tuple[int, int]]:
+        """Return the modification time and size of every file, by path."""
+        snapshot = {}
+        for directory in self._directories:
+            for file in walk_directory(directory):
+                try:
+                    file_stat = Path(file).stat()
+                except OSError:
+                    continue
+                snapshot[file] = (file_stat.st_mtime_ns, file_stat.st_size)
+        return snapshot
+
+    def changes(self, timeout: float | None) -> set[str]:
+        """
+        Wait for files to change, for up to `timeout` seconds (or forever if `None`).
+
+        Returns
+        -------
+        set of str
+            The files that were changed, created or deleted, if any.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            time.sleep(self._interval if remaining is None else max(0, remaining))
+            snapshot = self._scan()
+            changed = {
+                file
+                for file in snapshot.keys() | self._snapshot.keys()
+                if snapshot.get(file) != self._snapshot.get(file)
+            }
+            self._snapshot = snapshot
+            if changed or (deadline is not None and time.monotonic() >= deadline):
+                return changed
+
+    def close(self) -> None:
+        """Stop watching."""
+
+
+class _InotifyMonitor:
+    """
+    Finds the files that changed with Linux's inotify, through `ctypes`.
+
+    Every directory is watched on its own, so new subdirectories are watched as they
+    are created.
+
+    Parameters
+    ----------
+    directories : list of str
+        The directories to watch, including their subdirectories.
+
+    Raises
+    ------
+    OSError
+        If inotify is unavailable, or a directory can't be watched (e.g. once the
+        limit on the number of watches is reached).
+    """
+
+    def __init__(self, directories: list[str]) -> None:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self._fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        self._directories: dict[int, str] = {}  # By watch descriptor.
+        self._roots = directories
+        try:
+            for directory in directories:
+                self._watch_tree(directory)
+        except OSError:
+            self.close()
+            raise
+
+    def _watch_tree(self, directory: str, *, strict: bool = True) -> set[str]:
+        """
+        Watch `directory` and its subdirectories, and return the files in them.
+
+        Unless `strict`, the directories that can't be watched are skipped, rather than
+        raising an `OSError`. They are reported to stderr, unless they are already gone
+        (e.g. the temporary directories that Power BI Desktop removes while saving).
+        """
+        files = set()
+        stack = [directory]
+        while stack:
+            directory = stack.pop()
+            try:
+                files |= self._watch_directory(directory, stack)
+            except OSError as e:
+                if strict:
+                    raise
+                if os.path.isdir(directory):  # noqa: PTH112
+                    print(f"Can't watch {directory} ({e}).", file=sys.stderr)
+        return files
+
+    def _watch_directory(self, directory: str, subdirectories: list[str]) -> set[str]:
+        """Watch `directory`, add its subdirectories, and return the files in it."""
+        descriptor = self._add_watch(self._fd, os.fsencode(directory), _WATCH_MASK)
+        if descriptor < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno), directory)
+        self._directories[descriptor] = directory
+        files = set()
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if not entry.is_dir(follow_symlinks=False):
+                    files.add(entry.path)
+                elif not is_skipped_directory(entry.name):
+                    subdirectories.append(entry.path)
+        return files
+
+    def _read_events(self, timeout: float | None) -> Iterator[tuple[int, int, str]]:
+        """Yield the watch descriptor, mask and name of the events within `timeout`."""
+        if not select.select([self._fd], [], [], timeout)[0]:
+            return
+        # Any events that don't fit are read on the next call.
+        data = os.read(self._fd, 64 * 1024)
+        offset = 0
+        while offset < len(data):
+            descriptor, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = os.fsdecode(data[offset : offset + length].rstrip(b"\0"))
+            offset += length
+            yield descriptor, mask, name
+
+    def changes(self, timeout: float | None) -> set[str]:
+        """
+        Wait for files to change, for up to `timeout` seconds (or forever if `None`).
+
+        Returns
+        -------
+        set of str
+            The files that were changed, created or deleted, if any. When events were
+            lost, every file is returned.
+        """
+        changed: set[str] = set()
+        for descriptor, mask, name in self._read_events(timeout):
+            directory = self._directories.get(descriptor)
+            if mask & _IN_Q_OVERFLOW:
+                for root in self._roots:
+                    changed.update(walk_directory(root))
+            elif mask & _IN_IGNORED:  # The directory was deleted.
+                self._directories.pop(descriptor, None)
+            elif directory is None:
+                continue
+            elif not mask & _IN_ISDIR:
+                if not mask & _IN_CREATE:  # Files are complete once they're closed.
+                    changed.add(os.path.join(directory, name))  # noqa: PTH118
+            elif mask & (_IN_CREATE | _IN_MOVED_TO) and not is_skipped_directory(name):
+                # Files may have been written to it before it was watched.
+                subdirectory = os.path.join(directory, name)  # noqa: PTH118
+                changed.update(self._watch_tree(subdirectory, strict=False))
+        return changed
+
+    def close(self) -> None:
+        """Stop watching."""
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+def _make_monitor(
+    directories: list[str], *, polling: bool, interval: float
+) -> _InotifyMonitor | _PollingMonitor:
+    """Return an inotify monitor on Linux, unless `polling`, or a polling one."""
+    if not polling and sys.platform.startswith("linux"):
+        try:
+            return _InotifyMonitor(directories)
+        except (OSError, AttributeError) as e:  # `AttributeError`: not in libc.
+            print(f"Can't use inotify ({e}); polling instead.", file=sys.stderr)
+    return _PollingMonitor(directories, interval)
+
+
+def _hash_file(file: str) -> bytes | None:
+    """Return the hash of the contents of `file`, or `None` if it can't be read."""
+    try:
+        return hashlib.sha256(Path(file).read_bytes()).digest()
+    except OSError:
+        return None
+
+
+def watch_files(  # noqa: PLR0913
+    directories_or_projects: list[str],
+    filter_function: Callable[[JSONType, SupportsWrite[str]], None],
+    *,
+    plain_func: Callable[[JSONType, SupportsWrite[str]], None] | None = None,
+    cache: ResultCache | None = None,
+    low_memory: bool = False,
+    debounce: float = 0.5,
+    polling: bool = False,
+    interval: float = 1.0,
+) -> Generator[list[tuple[str, FileStatus]], None, None]:
+    """
+    Filter the files of directories or projects, and then again whenever they change.
+
+    Parameters
+    ----------
+    directories_or_projects : list of str
+        The directories and `.pbip` files to watch. Their files are found like
+        `pbip_tools.discovery.find_files` finds them.
+    filter_function : Callable[[JSONType, SupportsWrite[str]], None]
+        The filter to apply to each file, e.g. `clean_json_to`.
+    plain_func : Callable[[JSONType, SupportsWrite[str]], None], optional
+        The filter for the files that Power BI writes as plain JSON, as in
+        `_process_and_save_json_files`.
+    cache : ResultCache, optional
+        A cache of previous results of `filter_function`.
+    low_memory : bool, default False
+        Whether to parse the files with `loads_interned`.
+    debounce : float, default 0.5
+        How many seconds to wait for more changes before filtering the changed files.
+    polling : bool, default False
+        Whether to poll for changes, even where inotify is available.
+    interval : float, default 1.0
+        The number of seconds between two scans for changes, when polling.
+
+    Yields
+    ------
+    list of tuple of str and FileStatus
+        The files filtered in a batch, and their statuses: first all files, and then
+        those whose content hash changed. Files that fail to be filtered (e.g. while
+        Power BI is still writing them) are reported to stderr, and retried when they
+        change again.
+    """
+    save_file = _with_plain_func(
+        partial(
+            _process_and_save_json_file,
+            process_func=filter_function,
+            cache=cache,
+            low_memory=low_memory,
+        ),
+        plain_func,
+    )
+    hashes: dict[str, bytes | None] = {}  # By absolute path.
+    monitor = _make_monitor(
+        _watched_directories(directories_or_projects),
+        polling=polling,
+        interval=interval,
+    )
+    try:
+        changed = {
+            os.path.abspath(file)  # noqa: PTH100
+            for file in find_files(directories_or_projects)
+        }
+        while True:
+            batch = []
+            for file in sorted(filter(is_json_artifact, changed)):
+                file_hash = _hash_file(file)
+                if file_hash is None:  # Deleted.
+                    hashes.pop(file, None)
+                    continue
+                if file_hash == hashes.get(file):  # e.g. the last write was our own.
+                    continue
+                # The hash of what is written, rather than of the file once it is,
+                # which may already be a newer save by Power BI.
+                output_hash = hashlib.sha256()
+                try:
+                    status = save_file(file, on_output=output_hash.update)
+                except ValueError as e:
+                    print(e, file=sys.stderr)
+                    continue
+                batch.append((file, status))
+                hashes[file] = (
+                    file_hash if status == FileStatus.SKIPPED else output_hash.digest()
+                )
+            if batch:
+                yield batch
+
+            changed = monitor.changes(None)
+            while more_changes := monitor.changes(debounce):
+                changed |= more_changes
+    finally:
+        monitor.close()
@@ -7,6 +7,7 @@ from pathlib import Path
 
 import pytest
 
+from pbip_tools.cache import CACHE_DIR_ENV_VAR
 from pbip_tools.clean.clean_JSON import clean_json
 from pbip_tools.smudge.smudge_JSON import smudge_json
 from pbip_tools.type_aliases import JSONType, PathLike
@@ -15,6 +16,20 @@ tests_directory = Path(__file__).parent
 json_files_list = list(tests_directory.glob("Sample PBIP Reports/**/*.json"))
 
 
+@pytest.fixture(autouse=True, scope="session")
+def result_cache_dir(tmp_path_factory: pytest.TempPathFactory) -> Iterator[Path]:
+    """
+    Point the result cache at a temporary directory for the whole test session.
+
+    The environment variable is inherited by the CLI subprocesses, so the tests never
+    read from or write to the user's own cache.
+    """
+    cache_dir = tmp_path_factory.mktemp("result_cache")
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setenv(CACHE_DIR_ENV_VAR, str(cache_dir))
+        yield cache_dir
+
+
 @pytest.fixture(params=json_files_list, ids=str)
 def json_files() -> list[Path]:
     """
@@ -95,6 +110,8 @@ pbip_tools_cli_executable_params = [
     "clean --indent=13",
     "clean --sort-lists",
     "clean --indent=17 --sort-lists",
+    "clean --schema-aware",
+    "clean --low-memory",
 ]
 any_cli_executable_params = (
     filter_func_cli_executable_params + pbip_tools_cli_executable_params
@@ -141,6 +158,8 @@ def any_cli_executable(
       - `["pbip-tools", "clean", "--indent=13"]`
       - `["pbip-tools", "clean", "--sort-lists"]`
       - `["pbip-tools", "clean", "--indent=17", "--sort-lists"]`
+      - `["pbip-tools", "clean", "--schema-aware"]`
+      - `["pbip-tools", "clean", "--low-memory"]`
     This fixture is meant to be passed to `subprocess.run`.
 
     Notes
@@ -0,0 +1,179 @@
+"""Tests for the persistent result cache."""
+
+import json
+import sqlite3
+import subprocess
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+
+from pbip_tools import cache as cache_module
+from pbip_tools import clean_json
+from pbip_tools.cache import ResultCache, _package_version, _source_digest, clear_cache
+
+executable = Path(sys.executable).parent / "pbip-tools"
+
+
+def _fake_clock(monkeypatch: pytest.MonkeyPatch) -> list[float]:
+    """Make the cache tell the time by the returned list's only item, from now."""
+    now = [1e9]
+    monkeypatch.setattr(cache_module, "time", SimpleNamespace(time=lambda: now[0]))
+    return now
+
+
+def test_cache_roundtrip(tmp_path: Path) -> None:
+    """Test that a stored output is returned for the same input only."""
+    cache = ResultCache("clean", {"indent": 2}, tmp_path)
+    cache.put(cache.key(b"[1]"), "cached output")
+
+    assert cache.get(cache.key(b"[1]")) == "cached output"
+    assert cache.get(cache.key(b"[2]")) is None
+
+
+def test_cache_key_depends_on_filter_and_options(tmp_path: Path) -> None:
+    """Test that the same input is cached separately per filter and options."""
+    keys = {
+        ResultCache(filter_name, options, tmp_path).key(b"{}")
+        for filter_name, options in [
+            ("clean", {"indent": 2}),
+            ("clean", {"indent": 4}),
+            ("clean", {"indent": 2, "sort_lists": True}),
+            ("smudge", {}),
+        ]
+    }
+    assert len(keys) == 4  # noqa: PLR2004
+
+
+def test_cache_evicts_least_recently_used(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that the least recently used entries are evicted beyond `max_size`."""
+    now = _fake_clock(monkeypatch)
+    cache = ResultCache("clean", directory=tmp_path, max_size=20)
+    cache.put("a", "a" * 8)
+    now[0] += 1
+    cache.put("b", "b" * 8)
+    now[0] += cache_module._TOUCH_INTERVAL  # noqa: SLF001
+    assert cache.get("a") is not None  # Now "b" is the least recently used.
+
+    cache.put("c", "c" * 8)
+
+    assert cache.get("a") is not None
+    assert cache.get("b") is None
+    assert cache.get("c") is not None
+
+
+def test_cache_size_counts_each_key_once(tmp_path: Path) -> None:
+    """Test that storing a key again replaces its size, rather than adding to it."""
+    cache = ResultCache("clean", directory=tmp_path, max_size=20)
+    for _ in range(5):
+        cache.put("a", "a" * 8)
+    cache.put("b", "b" * 8)
+
+    assert (cache.get("a"), cache.get("b")) == ("a" * 8, "b" * 8)
+
+
+def test_cache_hits_seldom_write(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that a hit only marks its entry as used if it wasn't in the last hour."""
+    now = _fake_clock(monkeypatch)
+    cache = ResultCache("clean", directory=tmp_path)
+    cache.put("a", "a")
+    database = sqlite3.connect(tmp_path / "results.sqlite3")
+
+    for seconds, last_used in [(60, 1e9), (60 * 60, 1e9 + 60 * 61)]:
+        now[0] += seconds
+        assert cache.get("a") == "a"
+        assert database.execute("SELECT last_used FROM results").fetchone() == (
+            last_used,
+        )
+    database.close()
+
+
+def test_cache_connects_once(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that a process opens the cache database once, not on every lookup."""
+    connections = []
+    connect = sqlite3.connect
+
+    def counting_connect(*args: Any, **kwargs: Any) -> sqlite3.Connection:  # noqa: ANN401
+        connections.append(args)
+        return connect(*args, **kwargs)
+
+    monkeypatch.setattr(sqlite3, "connect", counting_connect)
+    cache = ResultCache("clean", directory=tmp_path)
+    for key in ["a", "b", "c"]:
+        cache.put(key, key)
+        assert cache.get(key) == key
+    assert len(connections) == 1
+
+
+def test_cache_key_depends_on_source(tmp_path: Path) -> None:
+    """Test that the cache is keyed by the source files, for uninstalled checkouts."""
+    (tmp_path / "module.py").write_text("x = 1", encoding="UTF-8")
+    before = _source_digest(tmp_path)
+    assert _source_digest(tmp_path) == before
+
+    (tmp_path / "module.py").write_text("x = 2", encoding="UTF-8")
+    assert _source_digest(tmp_path) != before
+    assert "+" in _package_version()
+
+
+def test_installed_version_skips_source(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that an installed (not editable) package is keyed by its version alone."""
+    installed = SimpleNamespace(
+        version="1.2.3", locate_file=lambda _path: Path(cache_module.__file__)
+    )
+    monkeypatch.setattr(cache_module, "distribution", lambda _name: installed)
+    monkeypatch.setattr(cache_module, "_source_digest", None)  # Never called.
+
+    assert _package_version.__wrapped__() == "1.2.3"
+
+
+def test_clear_cache(tmp_path: Path) -> None:
+    """Test that clearing the cache removes every entry."""
+    cache = ResultCache("clean", directory=tmp_path)
+    cache.put("a", "a")
+
+    clear_cache(tmp_path)
+
+    assert cache.get("a") is None
+
+
+def test_cli_uses_cache(tmp_path: Path) -> None:
+    """Test that `pbip-tools clean` serves a cache hit without parsing the file."""
+    file = tmp_path / "file.json"
+    file.write_text('{"b": 1, "a": 2}', encoding="UTF-8")
+    options = {"indent": 2, "sort_lists": False, "schema_aware": False}
+    cache = ResultCache("clean", options, tmp_path / "cache")
+    cache.put(cache.key(file.read_bytes()), "from the cache")
+    cache_args = ["--cache-dir", str(tmp_path / "cache")]
+
+    subprocess.run([executable, "clean", *cache_args, file], check=True)  # noqa: S603
+    assert file.read_text(encoding="UTF-8") == "from the cache"
+
+    file.write_text('{"b": 1, "a": 2}', encoding="UTF-8")
+    subprocess.run(  # noqa: S603
+        [executable, "clean", "--no-cache", *cache_args, file], check=True
+    )
+    assert file.read_text(encoding="UTF-8") == clean_json({"b": 1, "a": 2})
+
+    subprocess.run([executable, "cache", "clear", *cache_args], check=True)  # noqa: S603
+    assert cache.get(cache.key(b'{"b": 1, "a": 2}')) is None
+
+
+def test_cli_stdin_populates_cache(tmp_path: Path) -> None:
+    """Test that piping through `pbip-tools smudge -` stores its result."""
+    json_bytes = json.dumps({"config": {"b": [1, 2]}}).encode("UTF-8")
+    result = subprocess.run(  # noqa: S603
+        [executable, "smudge", "--cache-dir", tmp_path, "-"],
+        input=json_bytes,
+        check=True,
+        capture_output=True,
+    )
+
+    cache = ResultCache("smudge (stdin)", {}, tmp_path)
+    assert cache.get(cache.key(json_bytes)) == result.stdout.decode("UTF-8")
@@ -0,0 +1,86 @@
+"""Tests for checking that files are already clean, without writing them."""
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from pbip_tools import clean_json, clean_json_to
+from pbip_tools.json_utils import FileStatus, _process_and_save_json_file
+from pbip_tools.type_aliases import JSONType, SupportsWrite
+
+REPORT: JSONType = {"sections": [{"config": '{"name": "a"}', "x": 1}]}
+
+
+def test_check_file(tmp_path: Path) -> None:
+    """Test that checking a file compares it with its output, and never writes it."""
+    file = tmp_path / "report.json"
+    file.write_text(json.dumps(REPORT), encoding="UTF-8")
+    before = file.stat()
+
+    assert _process_and_save_json_file(file, clean_json_to, check=True) == (
+        FileStatus.DIFFERS
+    )
+    after = file.stat()
+    assert (before.st_ino, before.st_mtime_ns) == (after.st_ino, after.st_mtime_ns)
+    assert list(tmp_path.iterdir()) == [file]
+
+    file.write_text(clean_json(REPORT), encoding="UTF-8")
+    assert _process_and_save_json_file(file, clean_json_to, check=True) == (
+        FileStatus.UNCHANGED
+    )
+
+    # The output is a prefix of the file, which still differs.
+    file.write_text(clean_json(REPORT) + "\n", encoding="UTF-8")
+    assert _process_and_save_json_file(file, clean_json_to, check=True) == (
+        FileStatus.DIFFERS
+    )
+
+
+def test_check_stops_at_first_difference(tmp_path: Path) -> None:
+    """Test that the filter is stopped at the first output that differs."""
+    file = tmp_path / "file.json"
+    file.write_text('"abc"', encoding="UTF-8")
+    written = []
+
+    def process_func(_json_data: JSONType, fp: SupportsWrite[str]) -> None:
+        for chunk in ['"a', "x", 'c"']:
+            fp.write(chunk)
+            written.append(chunk)
+
+    assert _process_and_save_json_file(file, process_func, check=True) == (
+        FileStatus.DIFFERS
+    )
+    assert written == ['"a']
+
+
+@pytest.mark.parametrize(
+    "options", [[], ["--jobs", "2"], ["--stream"]], ids=["serial", "jobs", "stream"]
+)
+def test_cli_check(options: list[str], tmp_path: Path) -> None:
+    """Test that `pbip-tools check` lists the files that `clean` would rewrite."""
+    clean_file, smudged_file = tmp_path / "clean.json", tmp_path / "smudged.json"
+    clean_file.write_text(clean_json(REPORT), encoding="UTF-8")
+    smudged_file.write_text(json.dumps(REPORT), encoding="UTF-8")
+    executable = Path(sys.executable).parent / "pbip-tools"
+
+    result = subprocess.run(  # noqa: S603
+        [executable, "check", *options, "--no-cache", tmp_path],
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    assert (result.returncode, result.stdout) == (1, f"{smudged_file}\n")
+    assert "1 file would be rewritten, 1 file would be left unchanged." in result.stderr
+    assert smudged_file.read_text(encoding="UTF-8") == json.dumps(REPORT)
+
+    smudged_file.write_text(clean_json(REPORT), encoding="UTF-8")
+    result = subprocess.run(  # noqa: S603
+        [executable, "check", *options, "--no-cache", tmp_path],
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    assert (result.returncode, result.stdout) == (0, "")
@@ -0,0 +1,153 @@
+"""Tests for parsing the nested JSON strings in `clean_json`."""
+
+import json
+import re
+from collections import Counter
+from collections.abc import Iterator
+
+import pytest
+
+from pbip_tools import clean_json, smudge_json
+from pbip_tools.clean import clean_JSON
+from pbip_tools.clean.clean_JSON import NESTED_JSON_PATHS, _parse_nested_json_string
+from pbip_tools.interning import loads_interned
+from pbip_tools.smudge.smudge_JSON import NESTED_JSON_KEYS
+from pbip_tools.type_aliases import JSONType
+
+
+def _reference_parse_nested_json_string(value: str) -> JSONType:
+    """Parse every string that isn't a number or boolean, as before the pre-check."""
+    if re.match(r"^-?\d+(?:\.\d+)?$|true|false", value, flags=re.IGNORECASE):
+        return value
+    try:
+        return json.loads(value, parse_constant=str)
+    except json.JSONDecodeError:
+        return value
+
+
+def _iter_strings(json_data: JSONType) -> Iterator[str]:
+    """Yield every string in `json_data`, including those inside of nested JSON."""
+    pending = [json_data]
+    while pending:
+        value = pending.pop()
+        if isinstance(value, dict):
+            pending.extend(value.values())
+        elif isinstance(value, list):
+            pending.extend(value)
+        elif isinstance(value, str):
+            yield value
+            parsed = _reference_parse_nested_json_string(value)
+            if isinstance(parsed, dict | list):
+                pending.append(parsed)
+
+
+def test_parse_matches_reference_on_corpus(json_from_file_str: str) -> None:
+    """Test every string of the sample reports, nested JSON strings included."""
+    for value in _iter_strings(json.loads(json_from_file_str)):
+        expected = _reference_parse_nested_json_string(value)
+        assert _parse_nested_json_string(value) == expected
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        *["", " ", "a", "1", "-", "12", " 12", "12 ", "\n-3.5\t", "1e5", "1.", "0x1"],
+        *["null", "NaN", "Infinity", "-Infinity", "nan", "true", "False", "trueish"],
+        *['""', '"quoted"', '"unterminated', "[]", " [1, 2]\r\n", "{}", '{"a": 1}'],
+        *["[1, 2", "{a}", "[1] x", "\ufeff[1]", "\x0b[1]", "Sales Amount", "SUM(x)"],
+    ],
+    ids=repr,
+)
+def test_parse_matches_reference(value: str) -> None:
+    """Test edge cases of JSON, near-JSON, numbers and whitespace."""
+    assert _parse_nested_json_string(value) == _reference_parse_nested_json_string(
+        value
+    )
+
+
+def test_parse_counts(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that strings that can't be JSON are counted as avoided parses."""
+    monkeypatch.setattr(clean_JSON, "parse_counts", Counter())
+
+    for value in ["Sales Amount", "3.14", "[1, 2]", "[1, 2", "null"]:
+        _parse_nested_json_string(value)
+
+    assert clean_JSON.parse_counts == {"avoided": 2, "parsed": 2, "not_json": 1}
+
+
+def test_schema_aware_roundtrip(json_from_file_str: str) -> None:
+    """Test that schema-aware cleaning undoes smudging."""
+    cleaned = clean_json(json.loads(json_from_file_str), schema_aware=True)
+    smudged = smudge_json(json.loads(cleaned))
+
+    assert clean_json(json.loads(smudged), schema_aware=True) == cleaned
+
+
+def test_known_paths_are_smudged() -> None:
+    """Test that `smudge_json` turns the values of all known paths back into strings."""
+    for paths in NESTED_JSON_PATHS.values():
+        assert {path[-1] for path in paths} <= NESTED_JSON_KEYS
+
+
+def test_schema_aware_parses_known_paths(caplog: pytest.LogCaptureFixture) -> None:
+    """Test that only known paths and (logged) nested JSON containers are parsed."""
+    report: JSONType = {
+        "sections": [
+            {
+                "config": '{"literal": "null", "number": "12 "}',
+                "filters": "[]",
+                "displayName": "null",
+                "query": '{"unknown": "path"}',
+            }
+        ]
+    }
+
+    cleaned = json.loads(clean_json(report, schema_aware=True))
+
+    assert cleaned == {
+        "sections": [
+            {
+                "config": {"literal": "null", "number": "12 "},
+                "filters": [],
+                "displayName": "null",
+                "query": {"unknown": "path"},
+            }
+        ]
+    }
+    assert "outside of the known paths of report.json" in caplog.text
+
+
+@pytest.mark.parametrize("sort_lists", [False, True])
+def test_schema_aware_only_logs_strings_of_the_file(
+    caplog: pytest.LogCaptureFixture, *, sort_lists: bool
+) -> None:
+    """Test that nested JSON inside of nested JSON at a known path isn't logged."""
+    config = json.dumps({"singleVisual": '{"objects": ["a"]}', "layouts": "[]"})
+    report: JSONType = {"sections": [{"visualContainers": [{"config": config}]}]}
+
+    cleaned = json.loads(clean_json(report, sort_lists=sort_lists, schema_aware=True))
+
+    assert cleaned["sections"][0]["visualContainers"][0]["config"] == {
+        "singleVisual": {"objects": ["a"]},
+        "layouts": [],
+    }
+    assert "outside of the known paths" not in caplog.text
+
+
+def test_schema_aware_falls_back_on_unknown_files() -> None:
+    """Test that files of unknown kinds are cleaned like they are by default."""
+    model: JSONType = {"model": {"tables": ['{"a": "12 "}', "null"]}}
+
+    assert clean_json(model, schema_aware=True) == clean_json(model)
+
+
+@pytest.mark.parametrize("schema_aware", [False, True])
+def test_low_memory(json_from_file_str: str, *, schema_aware: bool) -> None:
+    """Test that interning keys and short strings doesn't change the output."""
+    expected = clean_json(json.loads(json_from_file_str), schema_aware=schema_aware)
+
+    json_data = loads_interned(json_from_file_str)
+    cleaned = clean_json(json_data, schema_aware=schema_aware, low_memory=True)
+
+    assert cleaned == expected
+    assert smudge_json(loads_interned(cleaned)) == smudge_json(json.loads(cleaned))
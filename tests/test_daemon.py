@@ -0,0 +1,121 @@
+"""Tests for running commands in `pbip-tools daemon`, through `pbip-tools-client`."""
+
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from pbip_tools import clean_json
+from pbip_tools.type_aliases import JSONType
+
+REPORT: JSONType = {"sections": [{"config": '{"name": "a"}', "x": 1}]}
+SCRIPTS = Path(sys.executable).parent
+
+
+def _client(
+    arguments: list[str], socket_path: Path, stdin: str = "", cwd: Path | None = None
+) -> subprocess.CompletedProcess[str]:
+    """Run `pbip-tools-client` with `arguments`, connecting to `socket_path`."""
+    return subprocess.run(  # noqa: S603
+        [SCRIPTS / "pbip-tools-client", *arguments],
+        input=stdin,
+        capture_output=True,
+        text=True,
+        cwd=cwd,
+        env={**os.environ, "PBIP_TOOLS_SOCKET": str(socket_path)},
+        check=False,
+    )
+
+
+def test_filters_are_imported_lazily() -> None:
+    """Test that importing the package doesn't import the filters until they're used."""
+    code = (
+        "import sys, pbip_tools;"
+        "print('pbip_tools.clean.clean_JSON' in sys.modules);"
+        "pbip_tools.clean_json;"
+        "print('pbip_tools.clean.clean_JSON' in sys.modules)"
+    )
+    result = subprocess.run(  # noqa: S603
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert result.stdout.split() == ["False", "True"]
+
+
+def test_client_without_daemon(tmp_path: Path) -> None:
+    """Test that the client runs the command itself when no daemon is running."""
+    result = _client(
+        ["clean", "-", "--no-cache"], tmp_path / "missing.sock", json.dumps(REPORT)
+    )
+    assert (result.returncode, result.stdout) == (0, clean_json(REPORT))
+
+
+@pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="Needs Unix sockets.")
+def test_daemon(tmp_path: Path) -> None:
+    """Test that the daemon runs commands in the client's directory, with its stdin."""
+    socket_path = tmp_path / "pbip-tools.sock"
+    report = tmp_path / "report.json"
+    report.write_text(json.dumps(REPORT), encoding="UTF-8")
+    daemon_command: list[str | Path] = [SCRIPTS / "pbip-tools", "daemon"]
+    daemon_command += ["--socket", socket_path]
+
+    with subprocess.Popen(  # noqa: S603
+        [*daemon_command, "--workers", "1"], stderr=subprocess.PIPE, text=True
+    ) as daemon:
+        try:
+            assert daemon.stderr is not None
+            assert "Listening" in daemon.stderr.readline()
+            # Only the user who started the daemon may connect to it.
+            assert oct(socket_path.stat().st_mode & 0o777) == "0o600"
+
+            result = _client(["clean", "-", "--no-cache"], socket_path, "[1, 2]")
+            assert (result.returncode, result.stdout) == (0, clean_json([1, 2]))
+
+            result = _client(
+                ["clean", "report.json", "--no-cache"], socket_path, cwd=tmp_path
+            )
+            assert (result.returncode, "1 file rewritten" in result.stderr) == (0, True)
+            assert report.read_text(encoding="UTF-8") == clean_json(REPORT)
+
+            # Options that read stdin forward it, too.
+            for arguments, names in [
+                (["smudge", "--files-from=-"], "report.json\n"),
+                (["clean", "-0", "--files-from=-"], "report.json\0"),
+            ]:
+                result = _client(
+                    [*arguments, "--no-cache"], socket_path, names, cwd=tmp_path
+                )
+                assert (result.returncode, "1 file rewritten" in result.stderr) == (
+                    0,
+                    True,
+                )
+            assert report.read_text(encoding="UTF-8") == clean_json(REPORT)
+
+            result = _client(["clean"], socket_path)
+            assert (result.returncode, "required" in result.stderr) == (2, True)
+
+            # Output of several chunks arrives whole, and each command shows its
+            # warnings, even though both run in the same worker.
+            large: JSONType = [{"config": json.dumps({"name": "a" * 100})}] * 1000
+            result = _client(
+                ["clean", "-", "--no-cache"], socket_path, json.dumps(large)
+            )
+            assert (result.returncode, result.stdout) == (0, clean_json(large))
+            comments = tmp_path / "comments.json"
+            comments.write_text('{\n  // comment\n  "a": 1\n}', encoding="UTF-8")
+            for _ in range(2):
+                result = _client(["clean", "comments.json"], socket_path, cwd=tmp_path)
+                assert "Skipping file with comments" in result.stderr
+
+            second_daemon = subprocess.run(  # noqa: S603
+                daemon_command, capture_output=True, text=True, check=False
+            )
+            assert "already listening" in second_daemon.stderr
+        finally:
+            daemon.send_signal(signal.SIGTERM)
+    assert daemon.returncode == 0
+    assert not socket_path.exists()
@@ -0,0 +1,145 @@
+"""Tests for finding the files of Power BI projects and directories."""
+
+import glob
+import json
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from pbip_tools import clean_json, smudge_json
+from pbip_tools.discovery import filter_files, find_files
+
+from .conftest import tests_directory
+
+PROJECT_DIRECTORY = (
+    tests_directory / "Sample PBIP Reports" / "Employee Hiring and History"
+)
+
+
+def _copy_project(tmp_path: Path) -> Path:
+    """Copy the sample project to `tmp_path`, and return its `.pbip` file."""
+    shutil.copytree(PROJECT_DIRECTORY, tmp_path / PROJECT_DIRECTORY.name)
+    return tmp_path / PROJECT_DIRECTORY.name / f"{PROJECT_DIRECTORY.name}.pbip"
+
+
+def test_project_files(tmp_path: Path) -> None:
+    """Test that a `.pbip` file stands for its artifacts, and its semantic model."""
+    pbip_file = _copy_project(tmp_path)
+    files = [
+        Path(file).relative_to(pbip_file.parent)
+        for file in find_files([str(pbip_file)])
+    ]
+
+    assert {file.name for file in files} == {
+        pbip_file.name,
+        ".platform",
+        "definition.pbir",
+        "report.json",
+        "definition.pbism",
+        "diagramLayout.json",
+        "model.bim",
+        "editorSettings.json",
+    }
+    assert not any("StaticResources" in file.parts for file in files)
+    assert files[0] == Path(pbip_file.name)
+    assert Path(f"{PROJECT_DIRECTORY.name}.SemanticModel", "model.bim") in files
+
+
+def test_files_are_found_once(tmp_path: Path) -> None:
+    """Test that overlapping arguments don't give the same file twice."""
+    pbip_file = _copy_project(tmp_path)
+    report_json = next(pbip_file.parent.glob("*.Report/report.json"))
+    arguments = [
+        str(report_json),
+        str(tmp_path),
+        str(pbip_file),
+        str(tmp_path / "**" / "*.json"),
+        str(report_json.parent / ".." / report_json.parent.name / "report.json"),
+    ]
+
+    files = list(find_files(arguments))
+    assert files[0] == str(report_json)
+    assert len({Path(file).resolve() for file in files}) == len(files)
+    assert set(files) >= set(find_files([str(pbip_file)])) - {str(report_json)}
+
+
+def test_cli_project(tmp_path: Path) -> None:
+    """Test cleaning and smudging a project, which leaves plain JSON files as is."""
+    pbip_file = _copy_project(tmp_path)
+    report_json = next(pbip_file.parent.glob("*.Report/report.json"))
+    platform = next(pbip_file.parent.glob("*.Report/.platform"))
+    original_report = json.loads(report_json.read_text(encoding="UTF-8"))
+    original_platform = json.loads(platform.read_text(encoding="UTF-8"))
+    executable = Path(sys.executable).parent / "pbip-tools"
+
+    subprocess.run(  # noqa: S603
+        [executable, "clean", "--no-cache", pbip_file], check=True
+    )
+    assert report_json.read_text(encoding="UTF-8") == clean_json(original_report)
+
+    subprocess.run(  # noqa: S603
+        [executable, "smudge", "--no-cache", pbip_file], check=True
+    )
+    cleaned_report = json.loads(clean_json(original_report))
+    assert report_json.read_text(encoding="UTF-8") == smudge_json(cleaned_report)
+    # Its `config` would be turned into a string by `smudge_json`.
+    assert json.loads(platform.read_text(encoding="UTF-8")) == original_platform
+
+
+def test_filter_files_matches_like_glob(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that `filter_files` finds the files that globs and directories stand for."""
+    for file in ["a/b.json", "a/c/d.json", "a/.e/f.json", ".g.json", "h.bim", "i.json"]:
+        (tmp_path / file).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / file).write_text("{}", encoding="UTF-8")
+    all_files = sorted(str(path) for path in tmp_path.rglob("*") if path.is_file())
+    monkeypatch.chdir(tmp_path)
+
+    for pattern in ["**/*.json", "a/*.json", "**", "*/*/d.json", "a/**/*.json", ".*"]:
+        globbed = glob.glob(pattern, recursive=True)
+        assert list(filter_files(all_files, [pattern])) == sorted(
+            file for file in globbed if Path(file).is_file()
+        ), pattern
+    assert list(filter_files(all_files, ["a"])) == sorted(find_files(["a"]))
+
+
+@pytest.mark.skipif(shutil.which("git") is None, reason="Needs git.")
+def test_cli_changed_since(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that only the files that git says changed are processed."""
+    pbip_file = _copy_project(tmp_path)
+    monkeypatch.chdir(tmp_path)
+    for arguments in [
+        ["init", "--quiet"],
+        ["add", "."],
+        ["-c", "user.name=a", "-c", "user.email=a@b", "commit", "--quiet", "-m", "a"],
+    ]:
+        subprocess.run(["git", *arguments], check=True)  # noqa: S603, S607
+    model = next(pbip_file.parent.glob("*.SemanticModel/model.bim"))
+    model.write_text(smudge_json(json.loads(model.read_text(encoding="UTF-8"))))
+    new_file = tmp_path / "new.json"
+    new_file.write_text('{"a": "[1]"}', encoding="UTF-8")
+    executable = Path(sys.executable).parent / "pbip-tools"
+
+    def check(*arguments: str | Path) -> list[str]:
+        result = subprocess.run(  # noqa: S603
+            [executable, "check", "--no-cache", *arguments],
+            capture_output=True,
+            text=True,
+            check=False,
+        )
+        return result.stdout.splitlines()
+
+    assert check("--changed-since", "HEAD", ".") == [
+        str(model.relative_to(tmp_path)),
+        new_file.name,
+    ]
+    assert check("--changed-since", "HEAD", pbip_file) == [
+        str(model.relative_to(tmp_path))
+    ]
+    assert check("--staged", ".") == []
+    subprocess.run(["git", "add", new_file], check=True)  # noqa: S603, S607
+    assert check("--staged", "*.json") == [new_file.name]
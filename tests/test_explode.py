@@ -0,0 +1,177 @@
+"""Tests for exploding reports into one file per page and visual, and imploding them."""
+
+import json
+import shutil
+import subprocess
+import sys
+from functools import partial
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from pbip_tools import clean_json, clean_json_to, smudge_json, smudge_json_to
+from pbip_tools.discovery import find_exploded_reports, find_files
+from pbip_tools.explode import explode_json_file, implode_json_file
+from pbip_tools.json_utils import FileStatus, _process_and_save_json_file
+from pbip_tools.type_aliases import JSONType
+
+from .conftest import json_files_list
+
+REPORTS = [file for file in json_files_list if file.name == "report.json"]
+REPORT: JSONType = {
+    "config": '{"version": "5.43"}',
+    "sections": [
+        {
+            "name": "ReportSection1",
+            "visualContainers": [
+                {"config": '{"name": "table", "layouts": []}', "x": 1.5},
+                {"config": '{"name": "chart"}', "filters": "[]"},
+            ],
+        },
+        {"name": "ReportSection2", "config": "{}"},
+    ],
+}
+
+save_clean_file = partial(_process_and_save_json_file, process_func=clean_json_to)
+save_smudged_file = partial(_process_and_save_json_file, process_func=smudge_json_to)
+
+
+def _shards(file: Path) -> dict[Path, int]:
+    """Return the inode number of each shard of the report `file`, by relative path."""
+    directory = file.with_name("report.shards")
+    return {
+        shard.relative_to(directory): shard.stat().st_ino
+        for shard in directory.rglob("*")
+        if shard.is_file()
+    }
+
+
+@pytest.mark.parametrize(
+    "options",
+    [{}, {"schema_aware": True}, {"sort_lists": True}, {"indent": 4}],
+    ids=["default", "schema_aware", "sort_lists", "indent"],
+)
+@pytest.mark.parametrize("file", REPORTS, ids=lambda file: file.parts[-3])
+def test_implode_exploded_report(
+    file: Path, options: dict[str, Any], tmp_path: Path
+) -> None:
+    """Test that imploding gives the smudged cleaned report, byte for byte."""
+    report = tmp_path / "report.json"
+    shutil.copy(file, report)
+    json_data = json.loads(file.read_text(encoding="UTF-8"), parse_constant=str)
+
+    status = explode_json_file(report, save_clean_file, **options)
+    assert (status, report.read_bytes()) == (FileStatus.REWRITTEN, file.read_bytes())
+    assert explode_json_file(report, save_clean_file, **options) == (
+        FileStatus.UNCHANGED
+    )
+
+    report.unlink()
+    status = implode_json_file(report, save_smudged_file, process_func=smudge_json_to)
+    expected = smudge_json(json.loads(clean_json(json_data, **options)))
+    assert (status, report.read_text(encoding="UTF-8")) == (
+        FileStatus.REWRITTEN,
+        expected,
+    )
+    status = implode_json_file(report, save_smudged_file, process_func=smudge_json_to)
+    assert status == FileStatus.UNCHANGED
+
+
+def test_explode_layout(tmp_path: Path) -> None:
+    """Test that pages and visuals get a file each, named after them."""
+    report = tmp_path / "report.json"
+    report.write_text(json.dumps(REPORT), encoding="UTF-8")
+    explode_json_file(report, save_clean_file)
+
+    page = Path("pages", "ReportSection1")
+    assert set(_shards(report)) == {
+        Path("index.json"),
+        Path("report.json"),
+        page / "page.json",
+        page / "visuals" / "table.json",
+        page / "visuals" / "chart.json",
+        Path("pages", "ReportSection2", "page.json"),
+    }
+    directory = tmp_path / "report.shards"
+    visual = json.loads((directory / page / "visuals" / "table.json").read_text())
+    assert visual == {"config": {"layouts": [], "name": "table"}, "x": 1.5}
+    assert "visualContainers" not in json.loads(
+        (directory / page / "page.json").read_text()
+    )
+    index = json.loads((directory / "index.json").read_text())
+    assert index["pages"][0] == {
+        "directory": "ReportSection1",
+        "visuals": ["table.json", "chart.json"],
+    }
+
+
+def test_explode_rewrites_changed_shards(tmp_path: Path) -> None:
+    """Test that only the shards that changed are rewritten, and stale ones removed."""
+    report = tmp_path / "report.json"
+    report.write_text(json.dumps(REPORT), encoding="UTF-8")
+    explode_json_file(report, save_clean_file)
+    before = _shards(report)
+
+    changed = json.loads(json.dumps(REPORT))
+    changed["sections"][0]["visualContainers"][0]["x"] = 2.5
+    del changed["sections"][1]
+    report.write_text(json.dumps(changed), encoding="UTF-8")
+    assert explode_json_file(report, save_clean_file) == FileStatus.REWRITTEN
+    after = _shards(report)
+
+    table = Path("pages", "ReportSection1", "visuals", "table.json")
+    rewritten = {shard for shard in after if after[shard] != before[shard]}
+    assert rewritten == {table, Path("index.json")}  # Without the second page.
+    assert set(before) - set(after) == {Path("pages", "ReportSection2", "page.json")}
+    assert not (tmp_path / "report.shards" / "pages" / "ReportSection2").exists()
+
+
+def test_explode_falls_back_for_other_files(tmp_path: Path) -> None:
+    """Test that a file without a list of pages is cleaned in-place instead."""
+    report = tmp_path / "report.json"
+    report.write_text('{"config": "{}"}', encoding="UTF-8")
+    assert explode_json_file(report, save_clean_file) == FileStatus.REWRITTEN
+    assert report.read_text(encoding="UTF-8") == clean_json({"config": "{}"})
+    assert not (tmp_path / "report.shards").exists()
+
+
+def test_find_exploded_reports(tmp_path: Path) -> None:
+    """Test that shards directories are found, but never walked into for files."""
+    report = tmp_path / "project.Report" / "report.json"
+    report.parent.mkdir()
+    report.write_text(json.dumps(REPORT), encoding="UTF-8")
+    explode_json_file(report, save_clean_file)
+    report.unlink()
+
+    for argument in [tmp_path, report.with_name("report.shards"), tmp_path / "*/*"]:
+        assert list(find_exploded_reports([str(argument)])) == [str(report)]
+        assert list(find_files([str(argument)])) == []
+
+
+def test_cli_explode_and_implode(tmp_path: Path) -> None:
+    """Test `clean --explode` and `smudge --implode` on a directory."""
+    report = tmp_path / "project.Report" / "report.json"
+    report.parent.mkdir()
+    report.write_text(json.dumps(REPORT), encoding="UTF-8")
+    executable = Path(sys.executable).parent / "pbip-tools"
+
+    subprocess.run(  # noqa: S603
+        [executable, "clean", "--explode", "--no-cache", tmp_path], check=True
+    )
+    assert report.read_text(encoding="UTF-8") == json.dumps(REPORT)
+    report.unlink()
+    subprocess.run(  # noqa: S603
+        [executable, "smudge", "--implode", "--no-cache", tmp_path], check=True
+    )
+    assert report.read_text(encoding="UTF-8") == smudge_json(
+        json.loads(clean_json(REPORT))
+    )
+
+    result = subprocess.run(  # noqa: S603
+        [executable, "smudge", "--implode", "-"],
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    assert (result.returncode, "only applies to files" in result.stderr) == (2, True)
@@ -0,0 +1,73 @@
+"""Tests for `--files-from` and `--ndjson`, which read their input in bulk."""
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from pbip_tools import clean_json, smudge_json
+from pbip_tools.discovery import filter_files, find_files
+from pbip_tools.type_aliases import JSONType
+
+REPORT: JSONType = {"sections": [{"config": '{"name": "a"}', "x": 1}]}
+EXECUTABLE = Path(sys.executable).parent / "pbip-tools"
+
+
+def _run(
+    arguments: list[str], stdin: bytes, cwd: Path
+) -> subprocess.CompletedProcess[bytes]:
+    """Run `pbip-tools` with `arguments` in `cwd`, with `stdin` as its stdin."""
+    return subprocess.run(  # noqa: S603
+        [EXECUTABLE, *arguments], input=stdin, capture_output=True, cwd=cwd, check=False
+    )
+
+
+def test_find_literal_files(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that listed files aren't glob patterns, and are found once."""
+    monkeypatch.chdir(tmp_path)
+    for name in ["a[1].json", "a1.json"]:
+        Path(name).write_text("{}", encoding="UTF-8")
+
+    assert list(find_files([], ["a[1].json", "missing.json"])) == ["a[1].json"]
+    assert list(find_files(["a*.json"], ["a[1].json"])) == sorted(
+        find_files(["a*.json"])
+    )
+    changed = [str(tmp_path / "a1.json"), str(tmp_path / "a[1].json")]
+    assert list(filter_files(changed, [], ["a[1].json"])) == ["a[1].json"]
+
+
+@pytest.mark.parametrize("null", [False, True], ids=["newlines", "nul"])
+def test_cli_files_from(null: bool, tmp_path: Path) -> None:  # noqa: FBT001
+    """Test that `--files-from -` processes the files listed on stdin."""
+    names = ["report.json", "with space.json", "not listed.json"]
+    for name in names:
+        (tmp_path / name).write_text(json.dumps(REPORT), encoding="UTF-8")
+    separator = "\0" if null else "\n"
+    listed = separator.join(names[:2]).encode("UTF-8")
+
+    options = ["--files-from", "-", "--no-cache", *(["-0"] if null else [])]
+    result = _run(["clean", *options], listed, tmp_path)
+    assert (result.returncode, b"2 files rewritten" in result.stderr) == (0, True)
+    contents = [(tmp_path / name).read_text(encoding="UTF-8") for name in names]
+    assert contents == [clean_json(REPORT), clean_json(REPORT), json.dumps(REPORT)]
+
+
+def test_cli_ndjson(tmp_path: Path) -> None:
+    """Test that `--ndjson` filters each line of stdin to a line of stdout."""
+    documents: list[JSONType] = [REPORT, [1, "a\nb"], {}]
+    stdin = "\n".join(json.dumps(document) for document in documents) + "\n\n"
+
+    result = _run(["clean", "--ndjson", "-"], stdin.encode("UTF-8"), tmp_path)
+    assert result.returncode == 0
+    cleaned = [json.loads(clean_json(document)) for document in documents]
+    assert [json.loads(line) for line in result.stdout.splitlines()] == cleaned
+
+    result = _run(["smudge", "--ndjson", "-"], result.stdout, tmp_path)
+    assert [json.loads(line) for line in result.stdout.splitlines()] == [
+        json.loads(smudge_json(document)) for document in cleaned
+    ]
+
+    result = _run(["clean", "--ndjson", "report.json"], b"", tmp_path)
+    assert (result.returncode, b"only applies to stdin" in result.stderr) == (2, True)
@@ -0,0 +1,171 @@
+"""Tests for the git long-running filter process, `pbip-tools filter-process`."""
+
+import io
+import json
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import pytest
+
+from pbip_tools import clean_json, clean_json_to, smudge_json, smudge_json_to
+from pbip_tools.filter_process import (
+    PKT_LINE_MAX_DATA_SIZE,
+    _read_pkt_content,
+    _read_pkt_text_list,
+    _write_pkt_content,
+    _write_pkt_text_list,
+    run_filter_process,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from pbip_tools.type_aliases import JSONType, SupportsWrite
+
+
+def _git_request(command: str, pathname: str, content: bytes) -> bytes:
+    """Encode a single filter request the way git sends it."""
+    stream = io.BytesIO()
+    _write_pkt_text_list(stream, [f"command={command}", f"pathname={pathname}"])
+    _write_pkt_content(stream, content)
+    return stream.getvalue()
+
+
+def _git_session(*requests: bytes) -> io.BytesIO:
+    """Encode the handshake followed by `requests`, as git would send them."""
+    stream = io.BytesIO()
+    _write_pkt_text_list(stream, ["git-filter-client", "version=2"])
+    _write_pkt_text_list(
+        stream, ["capability=clean", "capability=smudge", "capability=delay"]
+    )
+    stream.write(b"".join(requests))
+    stream.seek(0)
+    return stream
+
+
+def test_filter_process_session(json_from_file_str: str) -> None:
+    """Test a clean and a smudge request over a single filter process session."""
+    content = json_from_file_str.encode("UTF-8")
+    stdin = _git_session(
+        _git_request("clean", "report.json", content),
+        _git_request("smudge", "report.json", content),
+    )
+    stdout = io.BytesIO()
+
+    filters: dict[str, Callable[[JSONType, SupportsWrite[str]], None]] = {
+        "clean": clean_json_to,
+        "smudge": smudge_json_to,
+    }
+    assert run_filter_process(filters, stdin, stdout) == 0
+    stdout.seek(0)
+
+    assert _read_pkt_text_list(stdout) == ["git-filter-server", "version=2"]
+    assert _read_pkt_text_list(stdout) == ["capability=clean", "capability=smudge"]
+    for expected in [
+        clean_json(json.loads(json_from_file_str)),
+        smudge_json(json.loads(json_from_file_str)),
+    ]:
+        assert _read_pkt_text_list(stdout) == ["status=success"]
+        assert _read_pkt_content(stdout).decode("UTF-8") == expected
+        assert _read_pkt_text_list(stdout) == []
+    assert stdout.read() == b""
+
+
+def test_filter_process_reports_errors() -> None:
+    """Test that a bad file gets `status=error` without ending the session."""
+    stdin = _git_session(
+        _git_request("clean", "bad.json", b"{not json"),
+        _git_request("clean", "good.json", b'{"b": 1, "a": 2}'),
+    )
+    stdout = io.BytesIO()
+
+    run_filter_process({"clean": clean_json_to}, stdin, stdout)
+    stdout.seek(0)
+
+    _read_pkt_text_list(stdout), _read_pkt_text_list(stdout)  # Skip the handshake.
+    assert _read_pkt_text_list(stdout) == ["status=error"]
+    assert _read_pkt_text_list(stdout) == ["status=success"]
+    assert _read_pkt_content(stdout) == b'{\n  "a": 2,\n  "b": 1\n}'
+
+
+def test_filter_process_loads_files_like_the_cli(
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    """Test that constants stay strings, and files with comments are passed through."""
+    with_comments = b'{\n  // comment\n  "a": 1\n}'
+    stdin = _git_session(
+        _git_request("clean", "comments.json", with_comments),
+        _git_request("clean", "nan.json", b'{"a": NaN}'),
+    )
+    stdout = io.BytesIO()
+
+    run_filter_process({"clean": clean_json_to}, stdin, stdout)
+    stdout.seek(0)
+
+    _read_pkt_text_list(stdout), _read_pkt_text_list(stdout)  # Skip the handshake.
+    assert _read_pkt_text_list(stdout) == ["status=success"]
+    assert _read_pkt_content(stdout) == with_comments
+    assert _read_pkt_text_list(stdout) == []
+    assert _read_pkt_text_list(stdout) == ["status=success"]
+    expected = clean_json(json.loads('{"a": NaN}', parse_constant=str))
+    assert _read_pkt_content(stdout).decode("UTF-8") == expected
+    assert 'Skipping file with comments: "comments.json"' in capsys.readouterr().err
+
+
+def test_pkt_content_is_split() -> None:
+    """Test that content larger than a single pkt-line round-trips."""
+    content = b"x" * (2 * PKT_LINE_MAX_DATA_SIZE + 1)
+    stream = io.BytesIO()
+    _write_pkt_content(stream, content)
+    stream.seek(0)
+
+    assert _read_pkt_content(stream) == content
+
+
+@pytest.mark.skipif(shutil.which("git") is None, reason="requires git")
+def test_filter_process_with_git(json_file: Path, tmp_path: Path) -> None:
+    """Test `pbip-tools filter-process` as a real git filter driver."""
+    pbip_tools = Path(sys.executable).parent / "pbip-tools"
+
+    def git(*args: str) -> bytes:
+        return subprocess.run(  # noqa: S603
+            ["git", "-C", str(tmp_path), *args],  # noqa: S607
+            check=True,
+            capture_output=True,
+        ).stdout
+
+    git("init", "--quiet")
+    git("config", "filter.pbip.process", f'"{pbip_tools}" filter-process --indent=4')
+    git("config", "filter.pbip.required", "true")
+    (tmp_path / ".gitattributes").write_text("*.json filter=pbip\n")
+    shutil.copy2(json_file, tmp_path / "file.json")
+    git("add", "file.json")
+
+    original = json.loads(json_file.read_text(encoding="UTF-8"))
+    assert git("show", ":file.json").decode("UTF-8") == clean_json(original, indent=4)
+
+    (tmp_path / "file.json").unlink()
+    git("checkout", "--", "file.json")
+    smudged = (tmp_path / "file.json").read_text(encoding="UTF-8")
+    assert smudged == smudge_json(json.loads(clean_json(original, indent=4)))
+
+
+def test_filter_process_reports_errors_after_content() -> None:
+    """Test that a filter failing mid-output sends partial content, then an error."""
+    stdin = _git_session(_git_request("smudge", "file.json", b"[1, 2]"))
+    stdout = io.BytesIO()
+
+    def failing_filter(json_data: "JSONType", stream: "SupportsWrite[str]") -> None:
+        stream.write(json.dumps(json_data))
+        raise RuntimeError
+
+    run_filter_process({"smudge": failing_filter}, stdin, stdout)
+    stdout.seek(0)
+
+    _read_pkt_text_list(stdout), _read_pkt_text_list(stdout)  # Skip the handshake.
+    assert _read_pkt_text_list(stdout) == ["status=success"]
+    assert _read_pkt_content(stdout) == b"[1, 2]"
+    assert _read_pkt_text_list(stdout) == ["status=error"]
@@ -0,0 +1,64 @@
+"""Tests for processing files in parallel with `--jobs`."""
+
+import json
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from pbip_tools import clean_json, clean_json_to
+from pbip_tools.json_utils import _process_and_save_json_files
+
+from .conftest import json_files_list
+
+
+@pytest.mark.parametrize("jobs", ["0", "2"])
+def test_parallel_matches_serial(jobs: str, tmp_path: Path) -> None:
+    """Test that `pbip-tools clean --jobs` gives the same files as `clean_json`."""
+    temp_files = []
+    for i, file in enumerate(json_files_list):
+        temp_files.append(tmp_path / f"{i}_{file.name}")
+        shutil.copy2(file, temp_files[-1])
+
+    executable = Path(sys.executable).parent / "pbip-tools"
+    subprocess.run(  # noqa: S603
+        [executable, "clean", "--jobs", jobs, *temp_files], check=True
+    )
+
+    for file, temp_file in zip(json_files_list, temp_files, strict=True):
+        original = json.loads(file.read_text(encoding="UTF-8"), parse_constant=str)
+        assert temp_file.read_text(encoding="UTF-8") == clean_json(original)
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_errors_are_collected_in_order(
+    jobs: int, tmp_path: Path, capsys: pytest.CaptureFixture[str]
+) -> None:
+    """Test that every failure is reported, in input order, after all files ran."""
+    files = [tmp_path / "b_bad.json", tmp_path / "good.json", tmp_path / "a_bad.json"]
+    files[0].write_text("{not json", encoding="UTF-8")
+    files[1].write_text('{"b": 1, "a": 2}', encoding="UTF-8")
+    files[2].write_text("[1, 2", encoding="UTF-8")
+
+    with pytest.raises(ValueError, match="b_bad.json(.|\n)*a_bad.json"):
+        _process_and_save_json_files(files, clean_json_to, jobs=jobs)
+
+    assert files[1].read_text(encoding="UTF-8") == '{\n  "a": 2,\n  "b": 1\n}'
+    assert "1 file rewritten" in capsys.readouterr().err
+
+
+def test_parallel_warnings(tmp_path: Path) -> None:
+    """Test that files with comments are skipped with a warning in parallel mode."""
+    file = tmp_path / "comments.json"
+    file.write_text('{\n  // comment\n  "a": 1\n}', encoding="UTF-8")
+
+    with pytest.warns(UserWarning, match="Skipping file with comments"):
+        _process_and_save_json_files([file], clean_json_to, jobs=2)
+
+
+def test_negative_jobs() -> None:
+    """Test that a negative number of jobs is rejected."""
+    with pytest.raises(ValueError, match="non-negative"):
+        _process_and_save_json_files([], clean_json_to, jobs=-1)
@@ -0,0 +1,78 @@
+"""Tests that the fast indented encoder matches the standard library byte for byte."""
+
+import json
+import sys
+
+import pytest
+
+from pbip_tools import clean_json, smudge_json
+from pbip_tools.json_encoder import dumps_indented, dumps_reference
+from pbip_tools.type_aliases import JSONType
+
+
+@pytest.mark.parametrize("indent", [0, 2, 5])
+def test_encoder_matches_reference_on_corpus(
+    json_from_file_str: str, indent: int
+) -> None:
+    """Test both encoders on the raw, cleaned and smudged sample reports."""
+    raw = json.loads(json_from_file_str, parse_constant=str)
+    cleaned = json.loads(clean_json(json.loads(json_from_file_str)))
+    smudged = json.loads(smudge_json(json.loads(json_from_file_str)))
+
+    for json_data in [raw, cleaned, smudged]:
+        assert dumps_indented(json_data, indent) == dumps_reference(json_data, indent)
+
+
+@pytest.mark.parametrize(
+    "json_data",
+    [
+        {"floats": [0.1, 1e300, -2.5e-7, 3.0, float("nan"), float("inf"), -1e999]},
+        {"ints_and_bools": [0, -1, 2**100, True, False, None]},
+        {"strings": ["", "é", "\u2028", '"quoted"', "back\\slash", "\n\t\x00"]},
+        {"empty": [{}, [], [[]], {"a": {}}]},
+        {2: "int keys", 10: "sort numerically"},
+        {1.5: "float keys", -0.5: "too"},
+        {True: "bool keys", False: "too"},
+        [("tuple", "items")],
+        "just a string",
+        None,
+    ],
+    ids=repr,
+)
+@pytest.mark.parametrize("indent", [None, -1, 0, 3])
+def test_encoder_matches_reference(json_data: JSONType, indent: int | None) -> None:
+    """Test both encoders on edge cases of the JSON data types."""
+    assert dumps_indented(json_data, indent) == dumps_reference(json_data, indent)
+
+
+def test_encoder_rejects_unserializable() -> None:
+    """Test that objects that aren't JSON raise `TypeError` like `json.dumps`."""
+    with pytest.raises(TypeError, match="not JSON serializable"):
+        dumps_indented({"a": {1, 2}})  # type: ignore[dict-item]
+    with pytest.raises(TypeError, match="keys must be"):
+        dumps_indented({(1, 2): "tuple key"})  # type: ignore[dict-item]
+
+
+def test_encoder_handles_deep_nesting() -> None:
+    """Test nesting far beyond the recursion limit, which `json.dumps` can't handle."""
+    depth = 10 * sys.getrecursionlimit()
+    json_data: JSONType = ["[2]"]
+    for _ in range(depth):
+        json_data = [json_data]
+    expected = "[\n" * (depth + 1) + '"[2]"' + "\n]" * (depth + 1)
+    expected_clean = "[\n" * (depth + 2) + "2" + "\n]" * (depth + 2)
+
+    assert dumps_indented(json_data, 0) == expected
+    assert smudge_json(json_data) == dumps_indented(json_data)
+    assert clean_json(json_data, 0) == expected_clean
+    assert clean_json(json_data, 0, sort_lists=True) == expected_clean
+
+
+def test_encoder_rejects_circular_references() -> None:
+    """Test that circular references raise `ValueError` like `json.dumps`."""
+    inner: list[JSONType] = []
+    json_data: JSONType = [{"a": inner}]
+    inner.append(json_data)
+
+    with pytest.raises(ValueError, match="Circular reference"):
+        dumps_indented(json_data)
@@ -56,3 +56,34 @@ def test_roundtrip_idempotence_with_flag() -> None:
     smudged = smudge_json(json.loads(first))
     second = clean_json(json.loads(smudged), sort_lists=True)
     assert first == second
+
+
+def _reference_sort_lists(json_data: "JSONType") -> "JSONType":
+    """Sort every list bottom-up by its items' `json.dumps`, as `clean_json` used to."""
+    if isinstance(json_data, dict):
+        return {key: _reference_sort_lists(value) for key, value in json_data.items()}
+    if isinstance(json_data, list):
+        return sorted(
+            map(_reference_sort_lists, json_data),
+            key=lambda item: json.dumps(item, ensure_ascii=False, sort_keys=True),
+        )
+    return json_data
+
+
+def test_sort_order_matches_reference(json_from_file_str: str) -> None:
+    """Test that the bottom-up sort keys give the order of a full `json.dumps`."""
+    cleaned = clean_json(json.loads(json_from_file_str), sort_lists=True)
+    unsorted = json.loads(clean_json(json.loads(json_from_file_str)))
+
+    assert cleaned == clean_json(_reference_sort_lists(unsorted))
+
+
+def test_sort_deeply_nested_strings() -> None:
+    """Test sorting lists nested inside of JSON strings inside of lists."""
+    inner = json.dumps({"z": [3, 1, {"b": [True, None, "x"]}], "a": ["é", "e"]})
+    data: JSONType = {"config": json.dumps([inner, {"k": inner}, 2.5, -1, inner])}
+    cleaned = json.loads(clean_json(data, sort_lists=True))
+
+    assert cleaned == _reference_sort_lists(json.loads(clean_json(data)))
+    assert cleaned["config"][0] == -1
+    assert cleaned["config"][-1]["k"]["z"] == [1, 3, {"b": ["x", None, True]}]
@@ -0,0 +1,94 @@
+"""Tests for the memo of the nested JSON strings that `clean_json` parses."""
+
+import contextlib
+import json
+
+import pytest
+
+from pbip_tools import clean_json
+from pbip_tools.json_encoder import dumps_reference
+from pbip_tools.memo import NestedJSONMemo, nested_json_memo
+
+SHARED_FILTER = json.dumps(
+    [{"name": "Filter", "values": ["b", "a"], "config": '{"x": 1}', "type": "Basic"}]
+)
+REPORT = {
+    "sections": [
+        {"filters": SHARED_FILTER, "visualContainers": [{"filters": SHARED_FILTER}]},
+        {"filters": SHARED_FILTER},
+    ]
+}
+
+
+def test_eviction() -> None:
+    """Test that strings are kept once they repeat, least recently used first out."""
+    values = [json.dumps(f"{i:062}") for i in range(17)]  # Of 64 characters each.
+    memo = NestedJSONMemo(max_chars=16 * 64)
+    for value in [*values[:16], *values[:16], values[0]]:
+        memo.loads(value, json.loads)
+    assert (memo.hits, memo.misses, len(memo)) == (1, 32, 16)
+
+    # `values[0]` was used again, so `values[16]` evicts `values[1]`.
+    for value in [values[16], values[16], values[0], values[1]]:
+        memo.loads(value, json.loads)
+    assert (memo.hits, memo.misses, len(memo)) == (2, 35, 16)
+
+    too_long = json.dumps("x" * 100)
+    for value in [too_long, too_long, "[" * 100]:
+        with contextlib.suppress(json.JSONDecodeError):
+            memo.loads(value, json.loads)
+    assert (memo.misses, len(memo)) == (38, 16)
+
+
+@pytest.mark.parametrize("sort_lists", [False, True])
+def test_repeated_strings(sort_lists: bool) -> None:  # noqa: FBT001
+    """Test that strings are parsed once (unless sorted), and the output is the same."""
+    nested_json_memo.clear()
+    expected_data = json.loads(json.dumps(REPORT))
+    for section in expected_data["sections"]:
+        for container in [section, *section.get("visualContainers", [])]:
+            container["filters"] = json.loads(SHARED_FILTER)
+            container["filters"][0]["config"] = {"x": 1}
+            if sort_lists:
+                container["filters"][0]["values"].sort()
+    expected = dumps_reference(expected_data)
+
+    for _ in range(2):
+        assert clean_json(json.loads(json.dumps(REPORT)), sort_lists=sort_lists) == (
+            expected
+        )
+    # The string is parsed twice, and then found every other time. With `sort_lists`,
+    # it's parsed every time, without looking it up.
+    expected_counts = (0, 0) if sort_lists else (4, 2)
+    assert (nested_json_memo.hits, nested_json_memo.misses) == expected_counts
+
+
+def test_sort_lists_is_kept_apart() -> None:
+    """Test that data sorted by `sort_lists=True` is never used without it."""
+    clean_json({"filters": SHARED_FILTER}, sort_lists=True)
+    cleaned = json.loads(clean_json({"filters": SHARED_FILTER}))
+    assert cleaned["filters"][0]["values"] == ["b", "a"]
+
+
+def test_schema_aware_is_kept_apart() -> None:
+    """Test that data cleaned by the default `sort_lists` is never schema-aware."""
+    config = json.dumps({"v": "null", "n": "12 ", "name": "x" * 60})
+    report = json.dumps({"sections": [{"config": config}]})
+    expected = clean_json(json.loads(report), sort_lists=True, schema_aware=True)
+
+    for _ in range(3):
+        clean_json(json.loads(report), sort_lists=True)
+    cleaned = clean_json(json.loads(report), sort_lists=True, schema_aware=True)
+
+    assert cleaned == expected
+    assert json.loads(cleaned)["sections"][0]["config"]["v"] == "null"
+
+
+def test_sort_lists_cleans_strings_once() -> None:
+    """Test that strings in a repeated string are de-nested only once with sorting."""
+    inner = json.dumps(json.dumps({"a": 1, "pad": "x" * 80}))  # A JSON string's JSON.
+    document = json.dumps({"v": [json.dumps([inner, "y" * 70])] * 4})
+
+    for _ in range(2):
+        cleaned = json.loads(clean_json(json.loads(document), sort_lists=True))
+        assert cleaned["v"] == [["y" * 70, json.loads(inner)]] * 4
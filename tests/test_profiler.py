@@ -0,0 +1,76 @@
+"""Tests for the key-path profiler of `pbip-tools profile`."""
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+from pbip_tools import clean_json, smudge_json
+from pbip_tools.profiler import ROOT, format_profile, profile_json
+from pbip_tools.type_aliases import JSONType
+
+REPORT: JSONType = {
+    "sections": [
+        {
+            "config": '{"visibility": 1}',
+            "visualContainers": [
+                {"config": '{"name": "a", "layouts": [{"id": 0}]}', "x": 1.5},
+                {"config": '{"name": "b"}', "filters": "[]", "x": 2.5},
+            ],
+        }
+    ]
+}
+
+
+def test_bytes_add_up_to_the_output(json_from_file_str: str) -> None:
+    """Test that the bytes of the document are exactly those of the outputs."""
+    profiles = profile_json(json.loads(json_from_file_str, parse_constant=str))
+
+    cleaned = clean_json(json.loads(json_from_file_str, parse_constant=str))
+    smudged = smudge_json(json.loads(cleaned))
+    assert profiles[ROOT].clean_bytes == len(cleaned.encode("UTF-8"))
+    assert profiles[ROOT].smudge_bytes == len(smudged.encode("UTF-8"))
+
+
+def test_key_paths() -> None:
+    """Test that list indices are collapsed, and paths continue into nested JSON."""
+    profiles = profile_json(json.loads(json.dumps(REPORT)), indent=4)
+
+    config = profiles["sections[*].visualContainers[*].config"]
+    assert (config.values, config.nested_decoded, config.nested_encoded) == (2, 2, 2)
+    assert profiles["sections[*].visualContainers[*].config.layouts[*].id"].values == 1
+    containers = profiles["sections[*].visualContainers[*]"]
+    assert (containers.values, containers.nested_decoded) == (2, 3)
+    document = profiles[ROOT]
+    assert (document.nested_decoded, document.nested_encoded) == (4, 4)
+    assert profiles[ROOT].clean_bytes == len(clean_json(REPORT, indent=4))
+
+
+def test_format_profile() -> None:
+    """Test that the key paths are sorted from the largest down, and cut at `top`."""
+    profiles = profile_json(REPORT)
+
+    formatted = json.loads(format_profile(profiles, "json", sort="bytes", top=3))
+    assert list(formatted) == [ROOT, "sections", "sections[*]"]
+
+    table = format_profile(profiles, sort="nested", top=None).splitlines()
+    assert table[0].split()[:2] == ["key", "path"]
+    assert len(table) == len(profiles) + 1
+
+
+def test_cli_profile(tmp_path: Path) -> None:
+    """Test `pbip-tools profile` on a file."""
+    file = tmp_path / "report.json"
+    file.write_text(json.dumps(REPORT), encoding="UTF-8")
+    executable = Path(sys.executable).parent / "pbip-tools"
+
+    result = subprocess.run(  # noqa: S603
+        [executable, "profile", "--json", "--top", "0", file],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    profiles = json.loads(result.stdout)
+    assert profiles["sections[*].visualContainers[*].filters"]["nested_decoded"] == 1
+    assert file.read_text(encoding="UTF-8") == json.dumps(REPORT)
@@ -0,0 +1,75 @@
+"""Tests for saving processed files in-place."""
+
+import os
+import stat
+import sys
+from pathlib import Path
+
+import pytest
+
+from pbip_tools import clean_json_to
+from pbip_tools.json_utils import (
+    FileStatus,
+    _process_and_save_json_file,
+    _process_and_save_json_files,
+)
+
+example_json = '{"b": 1, "a": [2, 3]}'
+
+
+def test_unchanged_file_is_not_rewritten(tmp_path: Path) -> None:
+    """Test that a file whose output equals its contents is left untouched."""
+    file = tmp_path / "file.json"
+    file.write_text(example_json, encoding="UTF-8")
+
+    assert _process_and_save_json_file(file, clean_json_to) is FileStatus.REWRITTEN
+    before = file.stat()
+    assert _process_and_save_json_file(file, clean_json_to) is FileStatus.UNCHANGED
+    after = file.stat()
+
+    assert (before.st_ino, before.st_mtime_ns) == (after.st_ino, after.st_mtime_ns)
+
+
+def test_run_reports_rewritten_and_unchanged(
+    tmp_path: Path, capsys: pytest.CaptureFixture[str]
+) -> None:
+    """Test that the summary counts rewritten and unchanged files."""
+    files = [tmp_path / "1.json", tmp_path / "2.json", tmp_path / "3.json"]
+    for file in files:
+        file.write_text(example_json, encoding="UTF-8")
+    _process_and_save_json_file(files[0], clean_json_to)
+
+    _process_and_save_json_files(files, clean_json_to)
+
+    assert capsys.readouterr().err == "2 files rewritten, 1 file left unchanged.\n"
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="POSIX permissions")
+def test_rewrite_preserves_permissions(tmp_path: Path) -> None:
+    """Test that the atomic rewrite keeps the file mode and leaves no temp files."""
+    file = tmp_path / "file.json"
+    file.write_text(example_json, encoding="UTF-8")
+    file.chmod(0o640)
+
+    _process_and_save_json_file(file, clean_json_to)
+
+    assert stat.S_IMODE(file.stat().st_mode) == 0o640  # noqa: PLR2004
+    assert list(tmp_path.iterdir()) == [file]
+
+
+def test_interrupted_write_keeps_original(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that a failure while writing leaves the original file intact."""
+    file = tmp_path / "file.json"
+    file.write_text(example_json, encoding="UTF-8")
+
+    def interrupted_replace(*_: object) -> None:
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(os, "replace", interrupted_replace)
+    with pytest.raises(KeyboardInterrupt):
+        _process_and_save_json_file(file, clean_json_to)
+
+    assert file.read_text(encoding="UTF-8") == example_json
+    assert list(tmp_path.iterdir()) == [file]
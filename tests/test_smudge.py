@@ -0,0 +1,59 @@
+"""Tests that the single-pass `smudge_json` matches the previous two-pass smudge."""
+
+import json
+
+import pytest
+
+from pbip_tools import clean_json, smudge_json
+from pbip_tools.type_aliases import JSONType
+
+
+def _reference_smudge_json(json_data: JSONType) -> str:
+    """Smudge by rewriting the values into JSON strings, then dumping the document."""
+
+    def recursively_smudge_json(json_data_subset: JSONType) -> JSONType:
+        if isinstance(json_data_subset, dict):
+            for key, value in json_data_subset.items():
+                if key in {"config", "filters", "value", "parameters"} and isinstance(
+                    value, dict | list
+                ):
+                    json_data_subset[key] = json.dumps(
+                        value,
+                        ensure_ascii=False,
+                        indent=0,
+                        separators=(",", ":"),
+                        sort_keys=True,
+                    ).replace("\n", "")
+                else:
+                    json_data_subset[key] = recursively_smudge_json(value)
+        elif isinstance(json_data_subset, list):
+            json_data_subset = [
+                recursively_smudge_json(item) for item in json_data_subset
+            ]
+        return json_data_subset
+
+    return json.dumps(
+        recursively_smudge_json(json_data), ensure_ascii=False, indent=2, sort_keys=True
+    )
+
+
+def test_smudge_matches_reference_on_corpus(json_from_file_str: str) -> None:
+    """Test both smudge implementations on the raw and cleaned sample reports."""
+    cleaned = clean_json(json.loads(json_from_file_str))
+    for text in [json_from_file_str, cleaned]:
+        assert smudge_json(json.loads(text)) == _reference_smudge_json(json.loads(text))
+
+
+@pytest.mark.parametrize(
+    "json_data",
+    [
+        [{"config": {"filters": [{"value": {"é": "\n"}}]}}, {"value": "already"}],
+        {"filters": [], "value": {}, "parameters": [[1.5, None]], "other": {"a": 1}},
+        {"nested": {"config": {"b": 2, "a": [True, "x\\y"]}}, "value": 3},
+    ],
+    ids=repr,
+)
+def test_smudge_matches_reference(json_data: JSONType) -> None:
+    """Test nested, empty and non-string values of the smudged keys."""
+    expected = _reference_smudge_json(json.loads(json.dumps(json_data)))
+    assert smudge_json(json_data) == expected
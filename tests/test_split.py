@@ -0,0 +1,103 @@
+"""Tests for splitting a single document across worker processes."""
+
+import io
+import json
+import shutil
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from pbip_tools import clean_json, clean_json_to, smudge_json, smudge_json_to
+from pbip_tools.json_utils import _process_and_save_json_files
+from pbip_tools.split import find_parts
+from pbip_tools.type_aliases import JSONType
+
+from .conftest import json_files_list
+
+REPORTS = [file for file in json_files_list if file.name == "report.json"]
+
+
+@pytest.fixture(scope="module")
+def executor() -> Iterator[ProcessPoolExecutor]:
+    """Yield a pool of two worker processes, shared by the tests of this module."""
+    with ProcessPoolExecutor(2) as executor:
+        yield executor
+
+
+def _load(file: Path) -> JSONType:
+    """Load `file` like the CLI does."""
+    return json.loads(file.read_text(encoding="UTF-8"), parse_constant=str)
+
+
+@pytest.mark.parametrize(
+    "options",
+    [{}, {"schema_aware": True}, {"low_memory": True}, {"sort_lists": True}],
+    ids=["default", "schema_aware", "low_memory", "sort_lists"],
+)
+@pytest.mark.parametrize("file", REPORTS, ids=lambda file: file.parts[-3])
+def test_clean_split(
+    file: Path, options: dict[str, bool], executor: ProcessPoolExecutor
+) -> None:
+    """Test that cleaning the parts of a report in workers gives the same output."""
+    output = io.BytesIO()
+    clean_json_to(_load(file), output, indent=4, executor=executor, **options)
+    assert output.getvalue().decode("UTF-8") == clean_json(
+        _load(file), indent=4, **options
+    )
+
+
+@pytest.mark.parametrize("file", REPORTS, ids=lambda file: file.parts[-3])
+def test_smudge_split(file: Path, executor: ProcessPoolExecutor) -> None:
+    """Test that smudging the parts of a report in workers gives the same output."""
+    cleaned = json.loads(clean_json(_load(file)))
+    output = io.StringIO()
+    smudge_json_to(cleaned, output, executor=executor)
+    assert output.getvalue() == smudge_json(cleaned)
+
+
+def test_find_parts() -> None:
+    """Test that parts are split further when there are too few of them."""
+    report: JSONType = {
+        "config": '{"a": [{"b": 1}]}',
+        "pods": [{"config": [{"x": 1}]}],
+        "sections": [{"visualContainers": [{"x": 1}, {"x": 2}]}, {"y": [[]]}],
+    }
+    assert find_parts(report, 3) == [("pods", 0), ("sections", 0), ("sections", 1)]
+    assert find_parts(report, 4) == [
+        ("pods", 0, "config", 0),
+        ("sections", 0, "visualContainers", 0),
+        ("sections", 0, "visualContainers", 1),
+        ("sections", 1),
+    ]
+    # The values of keys that are embedded as JSON strings are never split.
+    assert find_parts(report, 4, {"config"}) == [
+        ("pods", 0),
+        ("sections", 0, "visualContainers", 0),
+        ("sections", 0, "visualContainers", 1),
+        ("sections", 1),
+    ]
+    assert find_parts([1, "a", []], 10) == [()]
+
+
+def test_jobs_split_large_files(tmp_path: Path) -> None:
+    """Test that files of `split_size` are split across the workers, and reported."""
+    files = [tmp_path / f"{i}_{file.name}" for i, file in enumerate(json_files_list)]
+    for file, temp_file in zip(json_files_list, files, strict=True):
+        shutil.copy2(file, temp_file)
+    files.append(tmp_path / "bad.json")
+    files[-1].write_text("[1, 2", encoding="UTF-8")
+
+    with pytest.raises(ValueError, match="bad.json") as error:
+        _process_and_save_json_files(files, clean_json_to, jobs=2, split_size=0)
+    assert str(error.value).count("Error processing") == 1
+
+    for file, temp_file in zip(json_files_list, files[:-1], strict=True):
+        assert temp_file.read_text(encoding="UTF-8") == clean_json(_load(file))
+    assert (
+        _process_and_save_json_files(
+            files[:-1], clean_json_to, jobs=2, split_size=0, check=True
+        )
+        == 0
+    )
@@ -0,0 +1,119 @@
+"""Tests for the per-file statistics of `--stats`."""
+
+import json
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from pbip_tools import clean_json, clean_json_to, smudge_json_to
+from pbip_tools.json_utils import (
+    _process_and_save_json_files,
+    _stream_and_save_json_files,
+)
+from pbip_tools.stats import nested_json
+from pbip_tools.streaming import clean_json_stream
+
+from .conftest import json_files_list
+
+PHASES = ["read", "parse", "transform", "serialize", "write"]
+
+
+def _copy_sample_files(tmp_path: Path) -> list[Path]:
+    """Copy the sample JSON files to `tmp_path`, under unique names."""
+    temp_files = []
+    for i, file in enumerate(json_files_list):
+        temp_files.append(tmp_path / f"{i}_{file.name}")
+        shutil.copy2(file, temp_files[-1])
+    return temp_files
+
+
+def _read_stats(capsys: pytest.CaptureFixture[str]) -> dict[str, Any]:
+    """Return the JSON statistics printed to stderr, after the summary line."""
+    summary, _, stats = capsys.readouterr().err.partition("\n")
+    assert "rewritten" in summary
+    return json.loads(stats)
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_stats(jobs: int, tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    """Test that the statistics of every file add up, and don't change the output."""
+    temp_files = _copy_sample_files(tmp_path)
+    sizes = [file.stat().st_size for file in temp_files]
+
+    _process_and_save_json_files(temp_files, clean_json_to, jobs, stats_format="json")
+
+    stats = _read_stats(capsys)
+    assert [file_stats["file"] for file_stats in stats["files"]] == list(
+        map(str, temp_files)
+    )
+    for file_stats, file, size in zip(stats["files"], temp_files, sizes, strict=True):
+        assert file_stats["bytes_in"] == size
+        assert file_stats["bytes_out"] == len(file.read_bytes())
+        assert all(file_stats[phase] >= 0 for phase in PHASES)
+    assert stats["totals"]["bytes_in"] == sum(sizes)
+    assert sum(file_stats["nested_strings"] for file_stats in stats["files"]) > 0
+    assert stats["totals"]["memo_hits"] + stats["totals"]["memo_misses"] > 0
+    # The counts of the `--jobs` workers make it back, too.
+    assert stats["totals"]["parses_avoided"] == sum(
+        file_stats["parses_avoided"] for file_stats in stats["files"]
+    )
+    assert stats["totals"]["parses_avoided"] > 0
+    assert len(stats["slowest"]) == min(5, len(temp_files))
+
+    for file, original in zip(temp_files, json_files_list, strict=True):
+        json_data = json.loads(original.read_text(encoding="UTF-8"), parse_constant=str)
+        assert file.read_text(encoding="UTF-8") == clean_json(json_data)
+    assert not nested_json.enabled
+
+
+def test_smudge_and_stream_stats(
+    tmp_path: Path, capsys: pytest.CaptureFixture[str]
+) -> None:
+    """Test that smudging encodes nested JSON, and that streaming counts it too."""
+    temp_files = _copy_sample_files(tmp_path)
+    _process_and_save_json_files(temp_files, clean_json_to)
+    capsys.readouterr()
+
+    _process_and_save_json_files(temp_files, smudge_json_to, stats_format="json")
+    smudged = _read_stats(capsys)["files"]
+    _stream_and_save_json_files(temp_files, clean_json_stream, stats_format="json")
+    streamed = _read_stats(capsys)["files"]
+
+    assert sum(file_stats["nested_strings"] for file_stats in smudged) > 0
+    for smudge_stats, stream_stats in zip(smudged, streamed, strict=True):
+        assert stream_stats["nested_strings"] >= smudge_stats["nested_strings"]
+        assert stream_stats["parse"] == 0
+        assert stream_stats["max_depth"] > 0
+
+
+def test_cli_stats(tmp_path: Path) -> None:
+    """Test that `--stats` prints a table to stderr, and leaves stdout alone."""
+    executable = Path(sys.executable).parent / "pbip-tools"
+    file = _copy_sample_files(tmp_path)[0]
+
+    result = subprocess.run(  # noqa: S603
+        [executable, "clean", "--stats", "--no-cache", file],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert not result.stdout
+    assert "transform ms" in result.stderr
+    assert "MB/s" in result.stderr
+    assert "Nested JSON parses: " in result.stderr
+
+    result = subprocess.run(  # noqa: S603
+        [executable, "smudge", "--stats-json", "-"],
+        input='{"config": {"a": 1}}',
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert json.loads(result.stdout) == {"config": '{"a":1}'}
+    stats = json.loads(result.stderr)
+    assert stats["files"][0]["file"] == "<stdin>"
+    assert stats["files"][0]["nested_strings"] == 1
@@ -0,0 +1,175 @@
+"""Tests for the bounded-memory streaming mode, `--stream`."""
+
+import io
+import json
+import subprocess
+import sys
+import tracemalloc
+from collections.abc import Callable
+from functools import partial
+from pathlib import Path
+
+import pytest
+
+from pbip_tools import clean_json, smudge_json, streaming
+from pbip_tools.json_utils import _stream_and_save_json_files
+from pbip_tools.streaming import clean_json_stream, smudge_json_stream
+
+executable = Path(sys.executable).parent / "pbip-tools"
+
+
+@pytest.fixture(params=[0, 200, streaming.LOAD_SIZE], ids=lambda size: f"load{size}")
+def load_size(request: pytest.FixtureRequest, monkeypatch: pytest.MonkeyPatch) -> int:
+    """Scan every container (0), only some of them, or (for small files) none."""
+    monkeypatch.setattr(streaming, "LOAD_SIZE", request.param)
+    return request.param
+
+
+@pytest.mark.usefixtures("load_size")
+def test_clean_stream_matches_clean_json(json_from_file_str: str) -> None:
+    """Test that `clean_json_stream` writes exactly what `clean_json` returns."""
+    expected = clean_json(json.loads(json_from_file_str, parse_constant=str), indent=3)
+
+    stream = io.StringIO()
+    clean_json_stream(
+        json_from_file_str.encode("UTF-8"), stream, indent=3, parse_constant=str
+    )
+
+    assert stream.getvalue() == expected
+
+
+@pytest.mark.usefixtures("load_size")
+def test_smudge_stream_matches_smudge_json(json_from_file_str: str) -> None:
+    """Test that `smudge_json_stream` writes exactly what `smudge_json` returns."""
+    cleaned = clean_json(json.loads(json_from_file_str)).encode("UTF-8")
+    expected = smudge_json(json.loads(cleaned))
+
+    stream = io.BytesIO()
+    smudge_json_stream(cleaned, stream)
+
+    assert stream.getvalue().decode("UTF-8") == expected
+
+
+@pytest.mark.usefixtures("load_size")
+@pytest.mark.parametrize(
+    "source",
+    [
+        b' { "b" : [ ] , "a" : { } , "b" : "{\\"x\\": [1, \\"2\\"]}" } \n',
+        b'[{"config": {"z": 1, "a": [true]}, "value": "3.0"}, "NaN", NaN, -1.5e3]',
+        b'"{\\"a\\": 1}"',
+        b"12",
+    ],
+)
+def test_stream_edge_cases(source: bytes) -> None:
+    """Test duplicate keys, empty containers, embedded keys and top-level scalars."""
+    json_data = json.loads(source)
+    cleaned, smudged = io.StringIO(), io.StringIO()
+
+    clean_json_stream(source, cleaned)
+    smudge_json_stream(source, smudged)
+
+    assert cleaned.getvalue() == clean_json(json_data)
+    assert smudged.getvalue() == smudge_json(json.loads(source))
+
+
+@pytest.mark.usefixtures("load_size")
+@pytest.mark.parametrize(
+    "source",
+    [b"", b"[1, 2", b"[1 2]", b'{"a" 1}', b'{"a": 1,}', b"[}", b'["a]', b"[1] 2"],
+)
+def test_stream_rejects_invalid_json(source: bytes) -> None:
+    """Test that malformed JSON raises a `ValueError`, like `json.loads`."""
+    with pytest.raises(ValueError):  # noqa: PT011
+        clean_json_stream(source, io.StringIO())
+
+
+def test_stream_memory_is_bounded(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that streaming takes a fraction of the memory of `clean_json`."""
+    monkeypatch.setattr(streaming, "LOAD_SIZE", 16 * 1024)
+    visual = {"config": json.dumps({"name": "x" * 40, "filters": list(range(20))})}
+    source = json.dumps({"sections": [{"visuals": [visual] * 2000}] * 10}).encode()
+
+    class Discard:
+        def write(self, text: str) -> int:
+            return len(text)
+
+    def peak_memory(filter_source: Callable[[], object]) -> int:
+        tracemalloc.start()
+        try:
+            filter_source()
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    in_memory_peak = peak_memory(lambda: clean_json(json.loads(source)))
+    streaming_peak = peak_memory(lambda: clean_json_stream(source, Discard()))
+
+    assert streaming_peak < in_memory_peak / 20
+
+
+def test_smudge_stream_large_embedded_values(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that large values written as JSON strings are never loaded whole."""
+    monkeypatch.setattr(streaming, "LOAD_SIZE", 64)
+    config = {"visuals": [{"name": f"é{i}", "size": i / 2} for i in range(50)]}
+    source = json.dumps({"config": config, "filters": [config]}).encode()
+    loaded = []
+
+    def load(piece: bytes) -> object:
+        loaded.append(len(piece))
+        return json.loads(piece)
+
+    monkeypatch.setattr(streaming, "partial", lambda *_args, **_kwargs: load)
+    stream = io.StringIO()
+    smudge_json_stream(source, stream)
+
+    assert stream.getvalue() == smudge_json(json.loads(source))
+    assert max(loaded) <= streaming.LOAD_SIZE
+
+
+def test_stream_files(temp_json_files: list[Path]) -> None:
+    """Test that streaming files in-place gives the same files as `clean_json`."""
+    temp_json_files = list(temp_json_files)
+    expected = [
+        clean_json(json.loads(file.read_bytes(), parse_constant=str))
+        for file in temp_json_files
+    ]
+
+    _stream_and_save_json_files(
+        temp_json_files, partial(clean_json_stream, parse_constant=str)
+    )
+
+    assert [file.read_text(encoding="UTF-8") for file in temp_json_files] == expected
+
+
+def test_cli_stream(tmp_path: Path) -> None:
+    """Test `pbip-tools clean --stream` and `smudge --stream` on a file and stdin."""
+    file = tmp_path / "file.json"
+    file.write_text('{"b": "[1, 2]", "a": 3}', encoding="UTF-8")
+
+    subprocess.run([executable, "clean", "--stream", file], check=True)  # noqa: S603
+    assert file.read_text(encoding="UTF-8") == clean_json({"b": [1, 2], "a": 3})
+
+    smudged = subprocess.run(  # noqa: S603
+        [executable, "smudge", "--stream", "-"],
+        input=file.read_bytes(),
+        capture_output=True,
+        check=True,
+    ).stdout
+    assert smudged.decode("UTF-8").replace("\r\n", "\n") == smudge_json(
+        {"b": [1, 2], "a": 3}
+    )
+
+
+def test_cli_stream_rejects_sort_lists(tmp_path: Path) -> None:
+    """Test that lists can't be sorted in bounded memory."""
+    file = tmp_path / "file.json"
+    file.write_text("[2, 1]", encoding="UTF-8")
+
+    result = subprocess.run(  # noqa: S603
+        [executable, "clean", "--stream", "--sort-lists", file],
+        capture_output=True,
+        check=False,
+    )
+
+    assert result.returncode != 0
+    assert file.read_text(encoding="UTF-8") == "[2, 1]"
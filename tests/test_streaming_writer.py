@@ -0,0 +1,82 @@
+"""Tests for the streaming writers `clean_json_to` and `smudge_json_to`."""
+
+import io
+import json
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import pytest
+
+from pbip_tools import clean_json, clean_json_to, smudge_json, smudge_json_to
+from pbip_tools.json_encoder import _CHUNKS_PER_WRITE, dump_indented, dumps_indented
+from pbip_tools.json_utils import FileStatus, _FileRewriter
+
+if TYPE_CHECKING:
+    from pbip_tools.type_aliases import JSONType
+
+
+def test_clean_json_to_matches_clean_json(json_from_file_str: str) -> None:
+    """Test that `clean_json_to` writes exactly what `clean_json` returns."""
+    expected = clean_json(json.loads(json_from_file_str), indent=3, sort_lists=True)
+
+    text_stream, binary_stream = io.StringIO(), io.BytesIO()
+    for stream in [text_stream, binary_stream]:
+        clean_json_to(json.loads(json_from_file_str), stream, indent=3, sort_lists=True)
+
+    assert text_stream.getvalue() == expected
+    assert binary_stream.getvalue() == expected.encode("UTF-8")
+
+
+def test_smudge_json_to_matches_smudge_json(json_from_file_str: str) -> None:
+    """Test that `smudge_json_to` writes exactly what `smudge_json` returns."""
+    cleaned = clean_json(json.loads(json_from_file_str))
+    expected = smudge_json(json.loads(cleaned))
+
+    text_stream, binary_stream = io.StringIO(), io.BytesIO()
+    for stream in [text_stream, binary_stream]:
+        smudge_json_to(json.loads(cleaned), stream)
+
+    assert text_stream.getvalue() == expected
+    assert binary_stream.getvalue() == expected.encode("UTF-8")
+
+
+def test_large_output_is_written_in_batches() -> None:
+    """Test that a large output reaches the stream in several bounded writes."""
+    json_data: JSONType = [{"key": [i, str(i)]} for i in range(10 * _CHUNKS_PER_WRITE)]
+    writes: list[str] = []
+
+    class Stream:
+        def write(self, text: str) -> int:
+            writes.append(text)
+            return len(text)
+
+    dump_indented(json_data, Stream())
+
+    assert len(writes) > 1
+    assert "".join(writes) == dumps_indented(json_data)
+    assert max(map(len, writes)) < len("".join(writes)) / 2
+
+
+@pytest.mark.parametrize(
+    ("output", "expected_status"),
+    [
+        ("same", FileStatus.UNCHANGED),
+        ("same plus more", FileStatus.REWRITTEN),
+        ("sam", FileStatus.REWRITTEN),
+        ("different", FileStatus.REWRITTEN),
+    ],
+)
+def test_file_rewriter(
+    output: str, expected_status: FileStatus, tmp_path: Path
+) -> None:
+    """Test that the file is only replaced when the streamed output differs."""
+    file = tmp_path / "file.json"
+    file.write_bytes(b"same")
+    rewriter = _FileRewriter(file, file.read_bytes())
+
+    for start in range(0, len(output), 3):
+        rewriter.write(output[start : start + 3])
+
+    assert rewriter.commit() is expected_status
+    assert file.read_text(encoding="UTF-8") == output
+    assert list(tmp_path.iterdir()) == [file]
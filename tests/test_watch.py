@@ -0,0 +1,131 @@
+"""Tests for cleaning the files of a project whenever they change."""
+
+import json
+import shutil
+import signal
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from pbip_tools import clean_json, clean_json_to, watch
+from pbip_tools.json_utils import FileStatus, _process_and_save_json_file
+from pbip_tools.type_aliases import JSONType, PathLike
+from pbip_tools.watch import _InotifyMonitor, watch_files
+
+REPORT: JSONType = {"sections": [{"config": '{"name": "a"}', "x": 1}]}
+POLLING = [True, *([False] if sys.platform.startswith("linux") else [])]
+
+
+def _write_json(file: Path, json_data: object) -> None:
+    """Write `json_data` to `file` like Power BI would, i.e. smudged."""
+    file.write_text(json.dumps(json_data), encoding="UTF-8")
+
+
+@pytest.mark.parametrize("polling", POLLING, ids=lambda polling: f"{polling=}")
+def test_watch_files(polling: bool, tmp_path: Path) -> None:  # noqa: FBT001
+    """Test that only the files that changed are cleaned, and never our own writes."""
+    report = tmp_path / "Sales.Report" / "report.json"
+    report.parent.mkdir()
+    _write_json(report, REPORT)
+    model = tmp_path / "Sales.SemanticModel" / "model.bim"
+    model.parent.mkdir()
+    _write_json(model, {"model": {"tables": []}})
+    (tmp_path / "image.png").write_bytes(b"\x89PNG")
+
+    batches = watch_files(
+        [str(tmp_path)], clean_json_to, debounce=0.05, polling=polling, interval=0.05
+    )
+    first_batch = next(batches)
+    assert [Path(file).name for file, _ in first_batch] == ["report.json", "model.bim"]
+    assert report.read_text(encoding="UTF-8") == clean_json(REPORT)
+
+    # Saving the model again rewrites both files, but only the model changed. The
+    # events of rewriting the model are ignored on the next batch.
+    time.sleep(0.05)  # Make sure the modification times differ, when polling.
+    _write_json(model, {"model": {"tables": [{"name": "Sales"}]}})
+    report.write_text(report.read_text(encoding="UTF-8"), encoding="UTF-8")
+    assert next(batches) == [(str(model), FileStatus.REWRITTEN)]
+
+    # A new directory is watched, too.
+    time.sleep(0.05)
+    new_report = tmp_path / "Returns.Report" / "report.json"
+    new_report.parent.mkdir()
+    _write_json(new_report, REPORT)
+    assert next(batches) == [(str(new_report), FileStatus.REWRITTEN)]
+    batches.close()
+
+
+@pytest.mark.parametrize("polling", POLLING, ids=lambda polling: f"{polling=}")
+def test_watch_files_after_own_write(
+    polling: bool,  # noqa: FBT001
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Test that a save right after our own write isn't taken for it."""
+    report = tmp_path / "Sales.Report" / "report.json"
+    report.parent.mkdir()
+    _write_json(report, REPORT)
+    changed: JSONType = {"sections": [{"config": '{"name": "b"}', "x": 2}]}
+    statuses = []
+
+    def save_file_then_save_again(file: PathLike, **kwargs: Any) -> FileStatus:  # noqa: ANN401
+        statuses.append(_process_and_save_json_file(file, **kwargs))
+        if len(statuses) == 1:  # Power BI saves the report again, just then.
+            time.sleep(0.05)  # Make sure the modification times differ, when polling.
+            _write_json(report, changed)
+        return statuses[-1]
+
+    monkeypatch.setattr(watch, "_process_and_save_json_file", save_file_then_save_again)
+    batches = watch_files(
+        [str(tmp_path)], clean_json_to, debounce=0.05, polling=polling, interval=0.05
+    )
+    assert next(batches) == [(str(report), FileStatus.REWRITTEN)]
+    assert next(batches) == [(str(report), FileStatus.REWRITTEN)]
+    assert report.read_text(encoding="UTF-8") == clean_json(changed)
+    batches.close()
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="Needs inotify.")
+def test_inotify_skips_removed_directories(tmp_path: Path) -> None:
+    """Test that a directory removed before it is watched doesn't stop watching."""
+    monitor = _InotifyMonitor([str(tmp_path)])
+    try:
+        temporary = tmp_path / "temp"
+        temporary.mkdir()
+        (temporary / "report.json").write_text("{}", encoding="UTF-8")
+        shutil.rmtree(temporary)
+        report = tmp_path / "report.json"
+        report.write_text("{}", encoding="UTF-8")
+
+        changed = set()
+        while str(report) not in changed:
+            changed |= monitor.changes(1.0)
+    finally:
+        monitor.close()
+
+
+def test_cli_watch(tmp_path: Path) -> None:
+    """Test that `pbip-tools watch` cleans a file that is saved, until interrupted."""
+    report = tmp_path / "report.json"
+    _write_json(report, {})
+    executable = Path(sys.executable).parent / "pbip-tools"
+    arguments = ["watch", "--poll", "--interval", "0.05", "--debounce", "0.05"]
+
+    with subprocess.Popen(  # noqa: S603
+        [executable, *arguments, "--no-cache", tmp_path],
+        stderr=subprocess.PIPE,
+        text=True,
+    ) as process:
+        try:
+            assert process.stderr is not None
+            assert "rewritten" in process.stderr.readline()
+            _write_json(report, REPORT)
+            assert "1 file rewritten" in process.stderr.readline()
+            assert report.read_text(encoding="UTF-8") == clean_json(REPORT)
+        finally:
+            process.send_signal(signal.SIGINT)
+    assert process.returncode == 0